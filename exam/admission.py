@@ -0,0 +1,108 @@
+from dataclasses import dataclass
+from datetime import datetime, timezone as dt_timezone
+from typing import Optional
+
+from django.core import signing
+from django.core.cache import cache
+from django.utils import timezone
+
+
+TICKET_SALT = "exam.admission.ticket"
+TICKET_MAX_AGE = 60 * 60 * 6
+SLOT_TIMEOUT = 60 * 60 * 6
+MAX_SLOT_SCAN = 3600
+
+WINDOW_NOT_OPEN = "not_open"
+WINDOW_OPEN = "open"
+WINDOW_CLOSED = "closed"
+
+
+@dataclass
+class AdmissionTicket:
+    course_id: int
+    user_id: int
+    admit_at: datetime
+
+    def seconds_to_wait(self, now=None):
+        now = now or timezone.now()
+        return max((self.admit_at - now).total_seconds(), 0.0)
+
+
+def window_state(course, now=None):
+    now = now or timezone.now()
+    if course.window_opens_at and now < course.window_opens_at:
+        return WINDOW_NOT_OPEN
+    if course.window_closes_at and now >= course.window_closes_at:
+        return WINDOW_CLOSED
+    return WINDOW_OPEN
+
+
+def needs_admission(course):
+    return bool(course.admission_rate or course.window_opens_at or course.window_closes_at)
+
+
+def _slot_key(course_id, second):
+    return f"admission:{course_id}:slot:{second}"
+
+
+def _hint_key(course_id):
+    return f"admission:{course_id}:next"
+
+
+def reserve_slot(course, now=None) -> datetime:
+    """Reserve the earliest free admission slot for one candidate.
+
+    Slots are one second wide and hold ``course.admission_rate`` candidates,
+    which behaves like a token bucket refilled at that rate. Candidates who
+    arrive before the window opens queue from the opening time. A shared
+    hint key skips slots that are already full.
+    """
+    now = now or timezone.now()
+    start = max(now, course.window_opens_at or now)
+    rate = course.admission_rate
+    if not rate:
+        return start
+
+    first_second = int(start.timestamp())
+    second = max(first_second, cache.get(_hint_key(course.id), first_second))
+    for _ in range(MAX_SLOT_SCAN):
+        key = _slot_key(course.id, second)
+        cache.add(key, 0, timeout=SLOT_TIMEOUT)
+        try:
+            taken = cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, timeout=SLOT_TIMEOUT)
+            taken = 1
+        if taken <= rate:
+            # Spread admissions evenly inside the second instead of bursting at its start.
+            offset = (taken - 1) / rate
+            return max(start, datetime.fromtimestamp(second + offset, tz=dt_timezone.utc))
+        cache.set(_hint_key(course.id), second + 1, timeout=SLOT_TIMEOUT)
+        second += 1
+    return datetime.fromtimestamp(second, tz=dt_timezone.utc)
+
+
+def issue_ticket(course, user, now=None) -> str:
+    admit_at = reserve_slot(course, now=now)
+    return signing.dumps(
+        {"c": course.id, "u": user.pk, "a": admit_at.timestamp()},
+        salt=TICKET_SALT,
+        compress=True,
+    )
+
+
+def read_ticket(token, course_id, user_id=None) -> Optional[AdmissionTicket]:
+    """Decode a ticket; ``None`` when it is forged, expired or for another course/user."""
+    if not token:
+        return None
+    try:
+        payload = signing.loads(token, salt=TICKET_SALT, max_age=TICKET_MAX_AGE)
+    except signing.BadSignature:
+        return None
+    if payload.get("c") != course_id or (user_id is not None and payload.get("u") != user_id):
+        return None
+    return AdmissionTicket(
+        course_id=payload["c"],
+        user_id=payload["u"],
+        admit_at=datetime.fromtimestamp(payload["a"], tz=dt_timezone.utc),
+    )
@@ -0,0 +1,101 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, Count, IntegerField, Sum, When
+
+from .models import Result, ResultRollup
+
+
+ROLLUP_DIMENSIONS = {
+    "faculty": "faculty",
+    "department": "department",
+    "level": "level",
+    "course": "course__course_name",
+}
+
+DEFAULT_GROUPING = ("faculty", "department", "level", "course")
+
+
+def rebuild_result_rollups():
+    """Recompute every rollup bucket from the Result table in one grouped query."""
+    grouped = (
+        Result.objects.values("exam_id", "faculty", "department", "level")
+        .annotate(
+            attempt_total=Count("id"),
+            passed_total=Sum(Case(When(passed=True, then=1), default=0, output_field=IntegerField())),
+            percentage_sum=Sum("percentage"),
+        )
+        .order_by()
+    )
+
+    rollups = [
+        ResultRollup(
+            course_id=row["exam_id"],
+            faculty=row["faculty"],
+            department=row["department"],
+            level=row["level"],
+            attempts=row["attempt_total"],
+            passed=row["passed_total"] or 0,
+            percentage_total=row["percentage_sum"] or Decimal("0.00"),
+        )
+        for row in grouped
+    ]
+
+    with transaction.atomic():
+        ResultRollup.objects.all().delete()
+        ResultRollup.objects.bulk_create(rollups, batch_size=500)
+    return len(rollups)
+
+
+def rollup_breakdown(filters=None, group_by=DEFAULT_GROUPING):
+    """Aggregate rollup buckets along ``group_by`` after applying ``filters``.
+
+    ``filters`` maps dimension names (faculty, department, level, course) to
+    the value selected on the analytics page; empty values are ignored.
+    """
+    group_by = [dim for dim in group_by if dim in ROLLUP_DIMENSIONS] or list(DEFAULT_GROUPING)
+    queryset = ResultRollup.objects.all()
+
+    for dimension, value in (filters or {}).items():
+        if not value:
+            continue
+        if dimension == "course":
+            queryset = queryset.filter(course_id=value)
+        elif dimension in ROLLUP_DIMENSIONS:
+            queryset = queryset.filter(**{dimension: value})
+
+    fields = [ROLLUP_DIMENSIONS[dim] for dim in group_by]
+    rows = (
+        queryset.values(*fields)
+        .annotate(
+            attempt_total=Sum("attempts"),
+            passed_total=Sum("passed"),
+            percentage_sum=Sum("percentage_total"),
+        )
+        .filter(attempt_total__gt=0)
+        .order_by(*fields)
+    )
+
+    breakdown = []
+    for row in rows:
+        attempts = row["attempt_total"]
+        breakdown.append(
+            {
+                **{dim: row[ROLLUP_DIMENSIONS[dim]] for dim in group_by},
+                "attempts": attempts,
+                "passed": row["passed_total"],
+                "mean_percentage": (row["percentage_sum"] / attempts).quantize(Decimal("0.01")),
+                "pass_rate": (Decimal(row["passed_total"] * 100) / attempts).quantize(Decimal("0.01")),
+            }
+        )
+    return breakdown
+
+
+def rollup_filter_options():
+    """Distinct values for the analytics filter dropdowns."""
+    buckets = ResultRollup.objects.filter(attempts__gt=0)
+    return {
+        "faculties": list(buckets.order_by("faculty").values_list("faculty", flat=True).distinct()),
+        "departments": list(buckets.order_by("department").values_list("department", flat=True).distinct()),
+        "levels": list(buckets.order_by("level").values_list("level", flat=True).distinct()),
+    }
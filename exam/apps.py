@@ -3,3 +3,12 @@ from django.apps import AppConfig
 
 class examConfig(AppConfig):
     name = 'exam'
+
+    def ready(self):
+        from onlinexam.dbconnections import instrument_connections
+        from onlinexam.metrics import instrument_queries
+        from onlinexam.slowqueries import instrument_slow_queries
+
+        instrument_connections()
+        instrument_queries()
+        instrument_slow_queries()
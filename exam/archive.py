@@ -0,0 +1,214 @@
+import base64
+import gzip
+import io
+import json
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import ExamSession, ProctorEvent, SessionArchive, SessionTimeline, StudentAnswer
+
+
+ARCHIVE_ROOT = "archives/exam-sessions"
+ARCHIVE_BATCH_SIZE = 500
+
+
+@dataclass
+class ArchivedSession:
+    session_id: int
+    course_id: int
+    student_id: int
+    attempt_number: int
+    started_at: datetime
+    end_time: datetime
+    tab_switch_count: int
+    suspicious_event_count: int
+    # (question id, selected option, is correct)
+    answers: List[Tuple[int, Optional[str], bool]] = field(default_factory=list)
+    # (event type, occurred at)
+    proctor_events: List[Tuple[str, datetime]] = field(default_factory=list)
+    # Unsaved, so exam.timeline.decode_events() reads it like a live one.
+    timeline: Optional[SessionTimeline] = None
+
+
+@dataclass
+class ArchiveReport:
+    sessions: int = 0
+    answers: int = 0
+    files: int = 0
+
+
+def semester_of(moment) -> str:
+    """Half-year label: ``2025-1`` for January to June, ``2025-2`` for July to December."""
+    moment = timezone.localtime(moment)
+    return f"{moment.year}-{1 if moment.month <= 6 else 2}"
+
+
+def archive_path(course_id, semester, part):
+    return f"{ARCHIVE_ROOT}/course-{course_id}/{semester}-{part:04d}.jsonl.gz"
+
+
+def archivable_sessions(cutoff):
+    """Completed sessions that ended before ``cutoff``; served by exam_session_expiry_idx."""
+    return ExamSession.objects.filter(is_completed=True, end_time__lt=cutoff)
+
+
+def _to_record(session, answers, events, timeline) -> dict:
+    return {
+        "session_id": session.id,
+        "student_id": session.student_id,
+        "attempt_number": session.attempt_number,
+        "started_at": session.started_at.isoformat(),
+        "end_time": session.end_time.isoformat(),
+        "tab_switch_count": session.tab_switch_count,
+        "suspicious_event_count": session.suspicious_event_count,
+        "answers": answers,
+        "proctor_events": [[event_type, occurred_at.isoformat()] for event_type, occurred_at in events],
+        "timeline": timeline and {
+            "anchor_ms": timeline.anchor_ms,
+            "last_event_ms": timeline.last_event_ms,
+            "event_count": timeline.event_count,
+            "events": base64.b64encode(bytes(timeline.events)).decode("ascii"),
+        },
+    }
+
+
+def _from_record(course_id, record) -> ArchivedSession:
+    timeline = record["timeline"]
+    return ArchivedSession(
+        session_id=record["session_id"],
+        course_id=course_id,
+        student_id=record["student_id"],
+        attempt_number=record["attempt_number"],
+        started_at=datetime.fromisoformat(record["started_at"]),
+        end_time=datetime.fromisoformat(record["end_time"]),
+        tab_switch_count=record["tab_switch_count"],
+        suspicious_event_count=record["suspicious_event_count"],
+        answers=[tuple(answer) for answer in record["answers"]],
+        proctor_events=[(event_type, datetime.fromisoformat(at)) for event_type, at in record["proctor_events"]],
+        timeline=timeline and SessionTimeline(
+            anchor_ms=timeline["anchor_ms"],
+            last_event_ms=timeline["last_event_ms"],
+            event_count=timeline["event_count"],
+            events=base64.b64decode(timeline["events"]),
+        ),
+    )
+
+
+def _iter_records(path) -> Iterator[dict]:
+    with default_storage.open(path, "rb") as handle:
+        with gzip.open(handle, "rt", encoding="utf-8") as lines:
+            for line in lines:
+                yield json.loads(line)
+
+
+def _write_records(path, records) -> str:
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode="wb", mtime=0) as compressed:
+        for record in records:
+            compressed.write(json.dumps(record, separators=(",", ":")).encode("utf-8") + b"\n")
+    # The storage picks a fresh name when ``path`` exists, e.g. a file left by
+    # a run that failed before it could index it.
+    return default_storage.save(path, ContentFile(buffer.getvalue()))
+
+
+def iter_archived_sessions(course, semester=None) -> Iterator[ArchivedSession]:
+    """Stream the archived sessions of ``course``, optionally for one semester only."""
+    archives = SessionArchive.objects.filter(course=course)
+    if semester:
+        archives = archives.filter(semester=semester)
+    for archive in archives:
+        for record in _iter_records(archive.path):
+            yield _from_record(archive.course_id, record)
+
+
+def _collect(sessions) -> Dict[Tuple[int, str], List[dict]]:
+    session_ids = [session.id for session in sessions]
+    answers = defaultdict(list)
+    rows = (
+        StudentAnswer.objects.filter(session_id__in=session_ids)
+        .order_by("session_id", "question_id")
+        .values_list("session_id", "question_id", "selected_option", "is_correct")
+    )
+    for session_id, question_id, selected, is_correct in rows:
+        answers[session_id].append([question_id, selected, is_correct])
+
+    events = defaultdict(list)
+    rows = (
+        ProctorEvent.objects.filter(session_id__in=session_ids)
+        .order_by("session_id", "occurred_at")
+        .values_list("session_id", "event_type", "occurred_at")
+    )
+    for session_id, event_type, occurred_at in rows:
+        events[session_id].append((event_type, occurred_at))
+
+    timelines = {timeline.session_id: timeline for timeline in SessionTimeline.objects.filter(session_id__in=session_ids)}
+
+    groups = defaultdict(list)
+    for session in sessions:
+        record = _to_record(session, answers[session.id], events[session.id], timelines.get(session.id))
+        groups[(session.course_id, semester_of(session.started_at))].append(record)
+    return groups
+
+
+def archive_sessions(older_than_days=None, batch_size=ARCHIVE_BATCH_SIZE, now=None) -> ArchiveReport:
+    """Move completed sessions older than ``older_than_days`` out of the live tables.
+
+    Each batch is written as a new gzipped JSON Lines part per course and
+    semester in the default storage; earlier parts are never read or
+    rewritten, so a run costs I/O in proportion to what it archives. The
+    sessions, with their answers, proctor events and timelines, are deleted
+    in the transaction that adds the parts to the archive index. Results are
+    never archived.
+    """
+    now = now or timezone.now()
+    if older_than_days is None:
+        older_than_days = settings.EXAM_ARCHIVE_AFTER_DAYS
+    cutoff = now - timedelta(days=older_than_days)
+    report = ArchiveReport()
+
+    while True:
+        sessions = list(archivable_sessions(cutoff).order_by("id")[:batch_size])
+        if not sessions:
+            return report
+
+        groups = _collect(sessions)
+        last_parts = {
+            (course_id, semester): last
+            for course_id, semester, last in SessionArchive.objects.filter(
+                course_id__in={course_id for course_id, _ in groups}
+            )
+            .values("course_id", "semester")
+            .annotate(last=Max("part"))
+            .order_by()
+            .values_list("course_id", "semester", "last")
+        }
+        parts = []
+        for (course_id, semester), records in groups.items():
+            part = last_parts.get((course_id, semester), 0) + 1
+            parts.append(
+                SessionArchive(
+                    course_id=course_id,
+                    semester=semester,
+                    part=part,
+                    path=_write_records(archive_path(course_id, semester, part), records),
+                    session_count=len(records),
+                    answer_count=sum(len(record["answers"]) for record in records),
+                )
+            )
+
+        with transaction.atomic():
+            SessionArchive.objects.bulk_create(parts)
+            ExamSession.objects.filter(id__in=[session.id for session in sessions]).delete()
+
+        report.sessions += len(sessions)
+        report.answers += sum(part.answer_count for part in parts)
+        report.files += len(parts)
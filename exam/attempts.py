@@ -0,0 +1,68 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F, Max
+
+from .admission import WINDOW_OPEN, window_state
+from .models import AttemptCounter, ExamSession, Result
+
+
+class AttemptLimitReached(Exception):
+    pass
+
+
+class ExamWindowClosed(Exception):
+    """No new sitting may start outside the course's exam window."""
+
+    def __init__(self, course, state):
+        super().__init__(course)
+        self.state = state
+
+
+def _initial_issued(student, course):
+    """Attempts already used before the counter row existed (legacy results and sessions)."""
+    results = Result.objects.filter(student=student, exam=course).aggregate(top=Max("attempt_number"))["top"] or 0
+    sessions = ExamSession.objects.filter(student=student, course=course).aggregate(top=Max("attempt_number"))["top"] or 0
+    return max(results, sessions)
+
+
+def open_session(student, course):
+    """Return ``(session, created)`` for the student's open sitting, reserving a new attempt if needed.
+
+    The attempt number is taken from a per-(student, course) counter row, so
+    the only contention is a student racing themselves; a duplicate start
+    loses on the open-session constraint and resumes the winner's session.
+    An open sitting can always be resumed; a new one needs an open window.
+    """
+    session = ExamSession.objects.filter(student=student, course=course, is_completed=False).first()
+    if session:
+        return session, False
+
+    state = window_state(course)
+    if state != WINDOW_OPEN:
+        raise ExamWindowClosed(course, state)
+
+    try:
+        with transaction.atomic():
+            # Writing before reading takes the row lock on PostgreSQL and the
+            # database write lock on SQLite up front, so racing starts queue
+            # behind each other instead of failing a read-to-write lock upgrade.
+            counters = AttemptCounter.objects.filter(student=student, course=course)
+            if not counters.filter(issued__lt=course.max_attempts).update(issued=F("issued") + 1):
+                counter, _ = AttemptCounter.objects.get_or_create(
+                    student=student,
+                    course=course,
+                    defaults={"issued": _initial_issued(student, course)},
+                )
+                if counter.issued >= course.max_attempts:
+                    raise AttemptLimitReached(course)
+                counters.update(issued=F("issued") + 1)
+            session = ExamSession.objects.create(
+                student=student,
+                course=course,
+                attempt_number=counters.values_list("issued", flat=True).get(),
+            )
+    except IntegrityError:
+        session = ExamSession.objects.filter(student=student, course=course, is_completed=False).first()
+        if session is None:
+            raise
+        return session, False
+    return session, True
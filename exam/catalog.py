@@ -0,0 +1,42 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+
+CATALOG_VERSION_KEY = "exam:catalog:version"
+
+
+def catalog_version():
+    """Current course-catalogue version, part of every cached course-list fragment key."""
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        # Seed from the clock rather than 1: if the key is ever evicted, the new
+        # version must not collide with fragments cached under an older one.
+        cache.add(CATALOG_VERSION_KEY, time.time_ns() // 1_000_000, timeout=None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def _bump():
+    try:
+        cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        catalog_version()
+
+
+def bump_catalog_version():
+    """Invalidate every cached course list, now and again once the transaction commits."""
+    # The second bump discards lists that a concurrent request cached from the
+    # pre-commit rows under the first one.
+    _bump()
+    transaction.on_commit(_bump)
+
+
+def catalog_context(courses):
+    return {
+        "courses": courses,
+        "catalog_version": catalog_version(),
+        "catalog_timeout": settings.CATALOG_FRAGMENT_TIMEOUT,
+    }
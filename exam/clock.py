@@ -0,0 +1,88 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.core.cache import cache
+from django.utils import timezone
+
+from student.models import Student
+
+from .models import ExamSession
+
+
+CLOCK_KEY = "exam:clock:{session_id}"
+CLOCK_TIMEOUT = 60 * 60 * 12
+# The candidate's Student id, kept in the login session so ownership is checked
+# against ExamSession.student_id without joining through to the user.
+STUDENT_SESSION_KEY = "exam:student"
+
+
+def _clock_key(session_id):
+    return CLOCK_KEY.format(session_id=session_id)
+
+
+def deadline_grace():
+    """Seconds an autosave may arrive after ``end_time`` (request latency, clock skew)."""
+    return getattr(settings, "EXAM_DEADLINE_GRACE_SECONDS", 5)
+
+
+def _record(end_time, is_completed, owner_id):
+    return {"end": end_time.timestamp(), "done": is_completed, "owner": owner_id}
+
+
+def remember_student(request, student_id):
+    if request.session.get(STUDENT_SESSION_KEY) != student_id:
+        request.session[STUDENT_SESSION_KEY] = student_id
+
+
+async def arequest_student_id(request):
+    """The Student id remembered for this login; looked up once if take-exam has not stored it."""
+    student_id = await sync_to_async(request.session.get)(STUDENT_SESSION_KEY)
+    if student_id is None:
+        user_id = request.session.get(SESSION_KEY)
+        if user_id is None:
+            return None
+        student_id = await Student.objects.filter(user_id=user_id).values_list("pk", flat=True).afirst()
+        if student_id is not None:
+            remember_student(request, student_id)
+    return student_id
+
+
+def remember_session(session, owner_id):
+    """Cache the fields the clock and autosave need, keyed by session id."""
+    record = _record(session.end_time, session.is_completed, owner_id)
+    if settings.EXAM_CLOCK_CACHE:
+        cache.set(_clock_key(session.pk), record, CLOCK_TIMEOUT)
+    return record
+
+
+def forget_sessions(session_ids):
+    cache.delete_many([_clock_key(session_id) for session_id in session_ids])
+
+
+async def aclock_record(session_id):
+    """``{"end", "done", "owner"}`` for a session, or ``None`` if it does not exist.
+
+    ``owner`` is the Student id; compare it with :func:`arequest_student_id`.
+    Normally a single cache read; a miss costs one narrow query and re-seeds the cache.
+    Without EXAM_CLOCK_CACHE every call is that query, so a session graded by
+    another worker is seen as completed at once.
+    """
+    key = _clock_key(session_id)
+    record = await cache.aget(key) if settings.EXAM_CLOCK_CACHE else None
+    if record is None:
+        row = await (
+            ExamSession.objects.filter(pk=session_id)
+            .values("end_time", "is_completed", "student_id")
+            .afirst()
+        )
+        if row is None:
+            return None
+        record = _record(row["end_time"], row["is_completed"], row["student_id"])
+        if settings.EXAM_CLOCK_CACHE:
+            await cache.aset(key, record, CLOCK_TIMEOUT)
+    return record
+
+
+def accepts_answers(record, now=None):
+    now = (now or timezone.now()).timestamp()
+    return not record["done"] and now <= record["end"] + deadline_grace()
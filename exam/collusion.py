@@ -0,0 +1,158 @@
+import random
+from collections import defaultdict
+from dataclasses import dataclass
+from decimal import Decimal
+from itertools import chain, combinations
+from typing import Iterable, List, Tuple
+
+from django.db import transaction
+
+from .archive import iter_archived_sessions
+from .models import CollusionFlag, StudentAnswer
+
+
+# Below this many candidate sessions every pair is compared directly; above it
+# MinHash/LSH bucketing keeps the comparison count roughly linear.
+EXACT_COMPARISON_LIMIT = 2000
+MINHASH_BANDS = 16
+MINHASH_ROWS = 4
+_HASH_PRIME = (1 << 61) - 1
+
+
+@dataclass
+class AnswerVector:
+    session_id: int
+    student_id: int
+    # One bit per distinct (question, wrong answer) token seen in the course.
+    wrong_mask: int
+
+    @property
+    def wrong_count(self):
+        return self.wrong_mask.bit_count()
+
+
+@dataclass
+class SuspiciousPair:
+    first: AnswerVector
+    second: AnswerVector
+    shared_wrong: int
+    similarity: float
+
+
+def build_answer_vectors(course, include_open=False, include_archived=True) -> List[AnswerVector]:
+    answers = (
+        StudentAnswer.objects.filter(session__course=course, is_correct=False)
+        .exclude(selected_option__isnull=True)
+        .exclude(selected_option="")
+    )
+    if not include_open:
+        answers = answers.filter(session__is_completed=True)
+
+    token_bits = {}
+    masks = defaultdict(int)
+    owners = {}
+    rows = answers.order_by().values_list("session_id", "session__student_id", "question_id", "selected_option")
+    rows = rows.iterator(chunk_size=5000)
+    if include_archived:
+        rows = chain(rows, _archived_wrong_answers(course))
+    for session_id, student_id, question_id, selected in rows:
+        token = (question_id, selected.strip().lower())
+        bit = token_bits.setdefault(token, len(token_bits))
+        masks[session_id] |= 1 << bit
+        owners[session_id] = student_id
+
+    return [AnswerVector(session_id, owners[session_id], mask) for session_id, mask in masks.items()]
+
+
+def _archived_wrong_answers(course):
+    for session in iter_archived_sessions(course):
+        for question_id, selected, is_correct in session.answers:
+            if not is_correct and selected:
+                yield session.session_id, session.student_id, question_id, selected
+
+
+def _set_bits(mask: int) -> Iterable[int]:
+    while mask:
+        lowest = mask & -mask
+        yield lowest.bit_length() - 1
+        mask ^= lowest
+
+
+def _compare(first: AnswerVector, second: AnswerVector) -> Tuple[int, float]:
+    shared = (first.wrong_mask & second.wrong_mask).bit_count()
+    union = (first.wrong_mask | second.wrong_mask).bit_count()
+    return shared, (shared / union if union else 0.0)
+
+
+def _lsh_candidates(vectors: List[AnswerVector], bands=MINHASH_BANDS, rows=MINHASH_ROWS, seed=2027):
+    rng = random.Random(seed)
+    hashers = [(rng.randrange(1, _HASH_PRIME), rng.randrange(0, _HASH_PRIME)) for _ in range(bands * rows)]
+
+    buckets = defaultdict(list)
+    for index, vector in enumerate(vectors):
+        bits = list(_set_bits(vector.wrong_mask))
+        signature = [min((a * bit + b) % _HASH_PRIME for bit in bits) for a, b in hashers]
+        for band in range(bands):
+            buckets[(band, tuple(signature[band * rows:(band + 1) * rows]))].append(index)
+
+    candidates = set()
+    for members in buckets.values():
+        if len(members) > 1:
+            candidates.update(combinations(members, 2))
+    return candidates
+
+
+def detect_collusion(
+    course,
+    min_shared=3,
+    min_similarity=0.6,
+    include_open=False,
+    exact_limit=EXACT_COMPARISON_LIMIT,
+    include_archived=True,
+) -> List[SuspiciousPair]:
+    """Score session pairs in ``course`` by the identical wrong answers they share.
+
+    A pair is flagged when it shares at least ``min_shared`` wrong answers and
+    the Jaccard similarity of the two wrong-answer sets reaches ``min_similarity``.
+    """
+    vectors = [
+        vector
+        for vector in build_answer_vectors(course, include_open=include_open, include_archived=include_archived)
+        if vector.wrong_count >= min_shared
+    ]
+
+    if len(vectors) <= exact_limit:
+        candidates = combinations(range(len(vectors)), 2)
+    else:
+        candidates = _lsh_candidates(vectors)
+
+    flagged = []
+    for first_index, second_index in candidates:
+        first, second = vectors[first_index], vectors[second_index]
+        if first.student_id == second.student_id:
+            continue
+        shared, similarity = _compare(first, second)
+        if shared >= min_shared and similarity >= min_similarity:
+            flagged.append(SuspiciousPair(first, second, shared, similarity))
+
+    flagged.sort(key=lambda pair: (pair.shared_wrong, pair.similarity), reverse=True)
+    return flagged
+
+
+def record_collusion_flags(course, pairs: List[SuspiciousPair]) -> int:
+    flags = [
+        CollusionFlag(
+            course=course,
+            student_a_id=pair.first.student_id,
+            student_b_id=pair.second.student_id,
+            session_a_id=pair.first.session_id,
+            session_b_id=pair.second.session_id,
+            shared_wrong=pair.shared_wrong,
+            similarity=Decimal(str(round(pair.similarity, 4))),
+        )
+        for pair in pairs
+    ]
+    with transaction.atomic():
+        CollusionFlag.objects.filter(course=course).delete()
+        CollusionFlag.objects.bulk_create(flags, batch_size=500)
+    return len(flags)
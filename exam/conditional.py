@@ -0,0 +1,97 @@
+import hashlib
+from functools import wraps
+
+from django.db.models import Count, Max, Q
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from .catalog import catalog_version
+from .models import Course, Result
+
+
+def _fingerprint(request, *parts):
+    """Hash ``parts`` with what every page embeds about the viewer.
+
+    Returns ``None``, which disables the conditional response, while flash
+    messages are waiting: a 304 would swallow them.
+    """
+    if len(getattr(request, "_messages", ())):
+        return None
+    user = request.user
+    identity = (user.pk, user.get_full_name(), request.META.get("CSRF_COOKIE", ""))
+    return hashlib.blake2b(repr((identity, parts)).encode(), digest_size=16).hexdigest()
+
+
+def conditional_page(etag_func, last_modified_func=None):
+    """``condition()`` plus headers that make browsers revalidate instead of refetching.
+
+    Apply it below the login and permission decorators so a 304 is never
+    sent to someone who may not see the page.
+    """
+
+    def decorator(view_func):
+        conditional_view = condition(etag_func=etag_func, last_modified_func=last_modified_func)(view_func)
+
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if response.has_header("ETag"):
+                patch_cache_control(response, private=True, no_cache=True)
+            return response
+
+        return _wrapped_view
+
+    return decorator
+
+
+def catalog_etag(request, *args, **kwargs):
+    """Course and question lists change only when the catalogue version is bumped."""
+    return _fingerprint(request, "catalog", catalog_version(), args, kwargs)
+
+
+def _marks_state(course_id, results_filter):
+    return (
+        Course.objects.filter(id=course_id)
+        .annotate(
+            result_count=Count("result", filter=results_filter),
+            latest_result=Max("result__date", filter=results_filter),
+        )
+        .values("updated_at", "result_count", "latest_result")
+        .first()
+    )
+
+
+def student_marks_etag(request, pk):
+    state = _marks_state(pk, Q(result__student__user_id=request.user.id))
+    return state and _fingerprint(request, "marks", pk, tuple(state.values()))
+
+
+def admin_marks_etag(request, student_id, course_id):
+    state = _marks_state(course_id, Q(result__student_id=student_id))
+    return state and _fingerprint(request, "admin-marks", student_id, course_id, tuple(state.values()))
+
+
+def _result_state(request, pk):
+    # Shared by the ETag and Last-Modified functions, so query once per request.
+    if not hasattr(request, "_result_state"):
+        request._result_state = (
+            Result.objects.filter(pk=pk)
+            .values("date", "student__user_id", "student__updated_at", "exam__updated_at")
+            .first()
+        )
+    state = request._result_state
+    user = request.user
+    if not state or not (user.is_staff or user.is_superuser or state["student__user_id"] == user.id):
+        # Leave access control and the 404 to the view itself.
+        return None
+    return state
+
+
+def result_pdf_etag(request, pk):
+    state = _result_state(request, pk)
+    return state and _fingerprint(request, "result-pdf", pk, tuple(state.values()))
+
+
+def result_pdf_last_modified(request, pk):
+    state = _result_state(request, pk)
+    return state and max(state["date"], state["student__updated_at"], state["exam__updated_at"])
@@ -25,18 +25,38 @@ class CourseForm(forms.ModelForm):
             "allow_navigation",
             "show_explanation_after_exam",
             "is_published",
+            "window_opens_at",
+            "window_closes_at",
+            "admission_rate",
             "instructions",
         ]
         widgets = {
             "instructions": forms.Textarea(attrs={"rows": 4}),
+            "window_opens_at": forms.DateTimeInput(attrs={"type": "datetime-local"}, format="%Y-%m-%dT%H:%M"),
+            "window_closes_at": forms.DateTimeInput(attrs={"type": "datetime-local"}, format="%Y-%m-%dT%H:%M"),
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields["admission_rate"].required = False
+
+    def clean_admission_rate(self):
+        return self.cleaned_data.get("admission_rate") or 0
+
     def clean_duration_minutes(self):
         duration = self.cleaned_data["duration_minutes"]
         if duration <= 0:
             raise forms.ValidationError("Duration must be greater than 0 minutes.")
         return duration
 
+    def clean(self):
+        cleaned_data = super().clean()
+        opens_at = cleaned_data.get("window_opens_at")
+        closes_at = cleaned_data.get("window_closes_at")
+        if opens_at and closes_at and closes_at <= opens_at:
+            self.add_error("window_closes_at", "The exam window must close after it opens.")
+        return cleaned_data
+
 class QuestionForm(forms.ModelForm):
     courseID = forms.ModelChoiceField(
         queryset=models.Course.objects.all().order_by("course_name"),
@@ -0,0 +1,158 @@
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from onlinexam.routers import note_write
+
+from .clock import forget_sessions
+from .models import ExamSession, Result, ResultRollup, StudentAnswer
+from .outbox import enqueue_results
+from .proctoring import finalized_counts
+from .timeline import forget_dwell_stats
+
+
+TWO_PLACES = Decimal("0.01")
+SWEEP_BATCH_SIZE = 200
+
+_TALLY = {
+    "correct": Count("id", filter=Q(is_correct=True)),
+    "wrong": Count("id", filter=Q(is_correct=False)),
+    "raw_marks": Sum("question__marks", filter=Q(is_correct=True)),
+}
+
+
+def score_answers(course, correct, wrong, raw_marks):
+    """Apply negative marking and percentage rules to aggregated answer counts."""
+    total_questions = course.question_number
+    total_possible = course.total_marks
+
+    final_marks = Decimal(raw_marks or 0) - Decimal(wrong) * course.negative_mark_per_wrong
+    final_marks = max(final_marks, Decimal("0.00")).quantize(TWO_PLACES, rounding=ROUND_HALF_UP)
+
+    percentage = Decimal("0.00")
+    if total_possible > 0:
+        percentage = (final_marks / Decimal(total_possible) * 100).quantize(TWO_PLACES, rounding=ROUND_HALF_UP)
+
+    return {
+        "marks": final_marks,
+        "total_possible_marks": total_possible,
+        "total_questions": total_questions,
+        "correct_answers": correct,
+        "wrong_answers": wrong,
+        "unanswered": max(total_questions - correct - wrong, 0),
+        "percentage": percentage,
+        "passed": percentage >= Decimal(course.pass_mark),
+    }
+
+
+def grade_session(session):
+    """Close ``session`` and write its Result; safe to call any number of times.
+
+    The attempt number was reserved when the session started, so concurrent
+    or repeated submissions converge on the same Result row. A session that
+    is already closed is not graded again: its Result is returned, or
+    ``None`` if an admin has since deleted it.
+    """
+    course = session.course
+
+    with transaction.atomic():
+        # Close the session before counting. The UPDATE locks the row until
+        # commit, like select_for_update, and a concurrent grader waits and
+        # then closes nothing; SQLite cannot upgrade a read lock, so there is
+        # no separate locking read.
+        if ExamSession.objects.filter(pk=session.pk, is_completed=False).update(is_completed=True):
+            tally = session.answers.aggregate(**_TALLY)
+            tab_switches, suspicious_count = finalized_counts(session)
+            result, created = Result.objects.get_or_create(
+                student_id=session.student_id,
+                exam=course,
+                attempt_number=session.attempt_number,
+                defaults={
+                    **score_answers(course, tally["correct"], tally["wrong"], tally["raw_marks"]),
+                    "tab_switches": tab_switches,
+                    "suspicious_activity_count": suspicious_count,
+                },
+            )
+        else:
+            result = Result.objects.filter(
+                student_id=session.student_id, exam=course, attempt_number=session.attempt_number
+            ).first()
+            created = False
+        if created:
+            # Queued in the same transaction, so a result never loses its email.
+            enqueue_results([result])
+    forget_sessions([session.pk])
+    forget_dwell_stats([session.course_id])
+    # Submitting is a GET from the exam page; the marks page it redirects to
+    # must not read from a replica that has not seen this Result yet.
+    note_write()
+    return result, created
+
+
+def expired_sessions(now=None):
+    return ExamSession.objects.filter(is_completed=False, end_time__lte=now or timezone.now())
+
+
+def sweep_expired_sessions(batch_size=SWEEP_BATCH_SIZE, now=None) -> int:
+    """Grade and close one batch of sessions whose time ran out; returns the batch size.
+
+    The batch is scored with one grouped query and its Results are written
+    with one bulk insert. Rows are locked with SKIP LOCKED, so several
+    sweepers can run side by side and a student submitting at the same
+    moment simply waits for the batch to commit.
+    """
+    with transaction.atomic():
+        sessions = list(
+            expired_sessions(now)
+            .select_related("course", "student__user")
+            .select_for_update(skip_locked=True, of=("self",))
+            .order_by("end_time")[:batch_size]
+        )
+        if not sessions:
+            return 0
+
+        session_ids = [session.pk for session in sessions]
+        tallies = {
+            row["session_id"]: row
+            for row in StudentAnswer.objects.filter(session_id__in=session_ids)
+            .values("session_id")
+            .annotate(**_TALLY)
+            .order_by()
+        }
+        already_graded = set(
+            Result.objects.filter(
+                student_id__in={session.student_id for session in sessions},
+                exam_id__in={session.course_id for session in sessions},
+            )
+            .order_by()
+            .values_list("student_id", "exam_id", "attempt_number")
+        )
+
+        results = []
+        for session in sessions:
+            if (session.student_id, session.course_id, session.attempt_number) in already_graded:
+                continue
+            tally = tallies.get(session.pk, {})
+            results.append(
+                Result(
+                    student=session.student,
+                    exam=session.course,
+                    attempt_number=session.attempt_number,
+                    tab_switches=session.tab_switch_count,
+                    suspicious_activity_count=session.suspicious_event_count,
+                    **score_answers(session.course, tally.get("correct", 0), tally.get("wrong", 0), tally.get("raw_marks")),
+                )
+            )
+
+        # bulk_create skips the save signals, so stamp and roll up the results here.
+        for result in results:
+            result.stamp_bucket()
+        Result.objects.bulk_create(results, batch_size=batch_size)
+        ResultRollup.apply_results(results)
+        enqueue_results(results)
+        ExamSession.objects.filter(pk__in=session_ids).update(is_completed=True)
+    forget_sessions(session_ids)
+    forget_dwell_stats({session.course_id for session in sessions})
+    return len(sessions)
@@ -0,0 +1,195 @@
+import io
+import logging
+import posixpath
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+
+logger = logging.getLogger(__name__)
+
+# Square edge lengths, in pixels, rendered for every profile picture: the
+# 44px list avatars at 1x and 2x density, plus a larger one for profile cards.
+AVATAR_SIZES = (48, 96, 192)
+
+# Every size is written in each format; WebP is preferred and JPEG is the
+# fallback for browsers without WebP support.
+THUMBNAIL_FORMATS = {
+    "webp": ("WEBP", {"quality": 80, "method": 6}),
+    "jpeg": ("JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+# Widths, in pixels, of the copies of each question image; the exam canvas is
+# about 760px wide on desktop, so this covers 1x to 2x density and phones.
+QUESTION_IMAGE_WIDTHS = (480, 960, 1440)
+
+_UNREADABLE_IMAGE = (OSError, UnidentifiedImageError, Image.DecompressionBombError)
+
+
+def _open_rgb(name):
+    with default_storage.open(name, "rb") as handle:
+        image = Image.open(handle)
+        # Phones store the orientation in EXIF instead of rotating the pixels.
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    if image.mode in ("RGBA", "LA", "P"):
+        image = image.convert("RGBA")
+        # JPEG has no alpha channel, so flatten transparent pictures onto white.
+        background = Image.new("RGB", image.size, "white")
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+def _encode(image, extension):
+    image_format, options = THUMBNAIL_FORMATS[extension]
+    buffer = io.BytesIO()
+    image.save(buffer, image_format, **options)
+    return buffer.getvalue()
+
+
+def thumbnail_name(name, size, extension):
+    """``profile_pic/Student/ada.png`` becomes ``profile_pic/Student/thumbs/ada-96.webp``."""
+    directory, filename = posixpath.split(name)
+    stem = posixpath.splitext(filename)[0]
+    return posixpath.join(directory, "thumbs", f"{stem}-{size}.{extension}")
+
+
+def render_square_thumbnails(name, sizes=AVATAR_SIZES):
+    """Write centre-cropped square thumbnails of the stored image ``name``.
+
+    Returns the variants mapping kept on the profile, e.g.
+    ``{"source": name, "48": {"webp": path, "jpeg": path}, ...}``. Sizes
+    larger than the original are skipped rather than upscaled, except the
+    smallest one so every picture has at least one thumbnail.
+    """
+    image = _open_rgb(name)
+    variants = {"source": name}
+    edge = min(image.size)
+    for size in sorted(sizes):
+        if size > edge and len(variants) > 1:
+            break
+        thumbnail = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+        variants[str(size)] = {
+            extension: default_storage.save(
+                thumbnail_name(name, size, extension), ContentFile(_encode(thumbnail, extension))
+            )
+            for extension in THUMBNAIL_FORMATS
+        }
+    return variants
+
+
+def render_width_variants(name, widths=QUESTION_IMAGE_WIDTHS):
+    """Write aspect-preserving copies of the stored image ``name`` for ``srcset``.
+
+    Keys are the actual pixel widths: every width in ``widths`` narrower than
+    the original, plus the original width itself capped at the widest one.
+    ``width`` and ``height`` give the intrinsic size of the widest copy, so
+    the page can reserve its box before the image arrives.
+    """
+    image = _open_rgb(name)
+    targets = sorted({width for width in widths if width < image.width} | {min(image.width, max(widths))})
+    variants = {"source": name}
+    for width in targets:
+        height = max(1, round(image.height * width / image.width))
+        resized = image.resize((width, height), Image.Resampling.LANCZOS) if width != image.width else image
+        variants[str(width)] = {
+            extension: default_storage.save(
+                thumbnail_name(name, width, extension), ContentFile(_encode(resized, extension))
+            )
+            for extension in THUMBNAIL_FORMATS
+        }
+        variants["width"], variants["height"] = width, height
+    return variants
+
+
+def delete_thumbnails(variants):
+    for key, paths in (variants or {}).items():
+        if key.isdigit():
+            for path in paths.values():
+                default_storage.delete(path)
+
+
+def variants_stale(instance, field_name):
+    """Whether ``<field_name>_variants`` was built from another file than the current one."""
+    file = getattr(instance, field_name)
+    name = file.name if file else ""
+    return (getattr(instance, f"{field_name}_variants") or {}).get("source", "") != name
+
+
+def build_variants(name, render):
+    """``render(name)``, or ``{"source": name}`` when the file is missing or not an image.
+
+    Instances without variants fall back to the original upload, so a broken
+    file must never fail the save that stored it.
+    """
+    if not name:
+        return {}
+    try:
+        return render(name)
+    except _UNREADABLE_IMAGE:
+        logger.warning("Could not build image variants for %s.", name, exc_info=True)
+        return {"source": name}
+
+
+def store_variants(instance, field_name, variants):
+    variants_field = f"{field_name}_variants"
+    previous = getattr(instance, variants_field)
+    # update() skips the post_save signal that triggered this build.
+    type(instance).objects.filter(pk=instance.pk).update(**{variants_field: variants})
+    setattr(instance, variants_field, variants)
+    delete_thumbnails(previous)
+
+
+def refresh_variants(instance, field_name, render):
+    """Rebuild ``<field_name>_variants`` if the file changed since the last build."""
+    if not variants_stale(instance, field_name):
+        return False
+    file = getattr(instance, field_name)
+    store_variants(instance, field_name, build_variants(file.name if file else "", render))
+    return True
+
+
+def profile_thumbnails_stale(profile):
+    return variants_stale(profile, "profile_pic")
+
+
+def build_profile_thumbnails(name):
+    return build_variants(name, render_square_thumbnails)
+
+
+def store_profile_thumbnails(profile, variants):
+    store_variants(profile, "profile_pic", variants)
+
+
+def refresh_profile_thumbnails(profile):
+    return refresh_variants(profile, "profile_pic", render_square_thumbnails)
+
+
+def refresh_question_image(question):
+    return refresh_variants(question, "image", render_width_variants)
+
+
+def _variant_sizes(variants):
+    return sorted(int(key) for key in (variants or {}) if key.isdigit())
+
+
+def pick_thumbnail(variants, size, extension):
+    """Path of the smallest ``extension`` thumbnail at least ``size`` pixels wide.
+
+    Falls back to the largest one when none is big enough, and to ``None``
+    when the picture has no thumbnails.
+    """
+    available = _variant_sizes(variants)
+    if not available:
+        return None
+    chosen = next((edge for edge in available if edge >= size), available[-1])
+    return variants[str(chosen)].get(extension)
+
+
+def variant_srcset(variants, extension):
+    """``srcset`` value with width descriptors, e.g. ``a-480.webp 480w, a-960.webp 960w``."""
+    return ", ".join(
+        f"{default_storage.url(variants[str(width)][extension])} {width}w" for width in _variant_sizes(variants)
+    )
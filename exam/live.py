@@ -0,0 +1,180 @@
+import asyncio
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+from django.utils import timezone
+
+from .models import ExamSession, StudentAnswer
+
+
+ANSWERED_KEY = "live:answered:{session_id}"
+COUNTER_TIMEOUT = 60 * 60 * 12
+
+
+def _answered_key(session_id):
+    return ANSWERED_KEY.format(session_id=session_id)
+
+
+def note_answer(session_id):
+    """Count a newly answered question for the live monitor."""
+    if not settings.LIVE_MONITOR_CACHE:
+        return
+    key = _answered_key(session_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Counter expired or never seeded: rebuild it from the database once.
+        cache.set(key, StudentAnswer.objects.filter(session_id=session_id).count(), COUNTER_TIMEOUT)
+
+
+async def anote_answer(session_id):
+    if not settings.LIVE_MONITOR_CACHE:
+        return
+    key = _answered_key(session_id)
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        total = await StudentAnswer.objects.filter(session_id=session_id).acount()
+        await cache.aset(key, total, COUNTER_TIMEOUT)
+
+
+def _seed_query(session_ids):
+    return (
+        StudentAnswer.objects.filter(session_id__in=session_ids)
+        .values_list("session_id")
+        .annotate(total=Count("id"))
+        .order_by()
+    )
+
+
+def _answered_counts(session_ids):
+    if not settings.LIVE_MONITOR_CACHE:
+        # Each worker would only see its own increments; count the answers instead.
+        return dict(_seed_query(session_ids))
+    keys = {_answered_key(session_id): session_id for session_id in session_ids}
+    cached = cache.get_many(list(keys))
+    counts = {keys[key]: value for key, value in cached.items()}
+
+    missing = [session_id for session_id in session_ids if session_id not in counts]
+    if missing:
+        seeded = dict(_seed_query(missing))
+        seeded = {session_id: seeded.get(session_id, 0) for session_id in missing}
+        cache.set_many({_answered_key(session_id): total for session_id, total in seeded.items()}, COUNTER_TIMEOUT)
+        counts.update(seeded)
+    return counts
+
+
+async def _aanswered_counts(session_ids):
+    if not settings.LIVE_MONITOR_CACHE:
+        return {session_id: total async for session_id, total in _seed_query(session_ids)}
+    keys = {_answered_key(session_id): session_id for session_id in session_ids}
+    cached = await cache.aget_many(list(keys))
+    counts = {keys[key]: value for key, value in cached.items()}
+
+    missing = [session_id for session_id in session_ids if session_id not in counts]
+    if missing:
+        seeded = {session_id: total async for session_id, total in _seed_query(missing)}
+        seeded = {session_id: seeded.get(session_id, 0) for session_id in missing}
+        await cache.aset_many({_answered_key(session_id): total for session_id, total in seeded.items()}, COUNTER_TIMEOUT)
+        counts.update(seeded)
+    return counts
+
+
+def _roster_query(course):
+    return (
+        ExamSession.objects.filter(course=course, is_completed=False)
+        .order_by("started_at")
+        .values(
+            "id",
+            "started_at",
+            "end_time",
+            "tab_switch_count",
+            "suspicious_event_count",
+            "student__matric_number",
+            "student__user__first_name",
+            "student__user__last_name",
+        )
+    )
+
+
+def course_snapshot(course):
+    """Aggregated state of every open session in ``course``.
+
+    One query reads the roster and proctoring counters; answered-question
+    counts come from the cache in a single ``get_many`` round trip, or from
+    one grouped count without LIVE_MONITOR_CACHE.
+    """
+    sessions = list(_roster_query(course))
+    answered = _answered_counts([session["id"] for session in sessions]) if sessions else {}
+    return _build_snapshot(course, sessions, answered)
+
+
+async def acourse_snapshot(course):
+    sessions = [session async for session in _roster_query(course)]
+    answered = await _aanswered_counts([session["id"] for session in sessions]) if sessions else {}
+    return _build_snapshot(course, sessions, answered)
+
+
+def _build_snapshot(course, sessions, answered):
+    now = timezone.now()
+    candidates = []
+    for session in sessions:
+        candidates.append(
+            {
+                "session": session["id"],
+                "name": f'{session["student__user__first_name"]} {session["student__user__last_name"]}'.strip(),
+                "matric": session["student__matric_number"] or "",
+                "started_at": session["started_at"].isoformat(),
+                "seconds_left": max(int((session["end_time"] - now).total_seconds()), 0),
+                "answered": answered.get(session["id"], 0),
+                "tab_switches": session["tab_switch_count"],
+                "flags": session["suspicious_event_count"],
+            }
+        )
+
+    return {
+        "course": course.id,
+        "generated_at": now.isoformat(),
+        "question_total": course.question_number,
+        "active": len(candidates),
+        "flagged": sum(1 for candidate in candidates if candidate["tab_switches"] or candidate["flags"]),
+        "candidates": candidates,
+    }
+
+
+def _stream_settings():
+    return (
+        getattr(settings, "LIVE_MONITOR_INTERVAL", 5),
+        getattr(settings, "LIVE_MONITOR_MAX_TICKS", 120),
+    )
+
+
+def snapshot_event(snapshot):
+    return f"event: snapshot\ndata: {json.dumps(snapshot)}\n\n"
+
+
+def snapshot_stream(course):
+    """Server-sent event generator; ends after a bounded number of ticks so the browser reconnects.
+
+    WSGI servers need a sync iterator: Django 4.2 would collect an async one
+    in full before sending the first byte.
+    """
+    interval, max_ticks = _stream_settings()
+    yield f"retry: {interval * 1000}\n\n"
+    for tick in range(max_ticks):
+        if tick:
+            time.sleep(interval)
+        yield snapshot_event(course_snapshot(course))
+
+
+async def asnapshot_stream(course):
+    """``snapshot_stream`` for ASGI; it awaits between ticks, so an open monitor tab holds no thread."""
+    interval, max_ticks = _stream_settings()
+    yield f"retry: {interval * 1000}\n\n"
+    for tick in range(max_ticks):
+        if tick:
+            await asyncio.sleep(interval)
+        yield snapshot_event(await acourse_snapshot(course))
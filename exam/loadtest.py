@@ -0,0 +1,179 @@
+import random
+import secrets
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from django.contrib.auth.models import Group, User
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from student.models import Student
+
+from .models import Course, ExamSession, Question
+
+
+# The three requests of the exam lifecycle, in the order a candidate makes them.
+ENDPOINTS = ("start-exam", "submit-answer", "calculate-marks")
+
+
+def _percentile(ordered, fraction):
+    # Nearest rank, as in the benchmark_connections report.
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+
+@dataclass
+class EndpointStats:
+    latencies_ms: List[float] = field(default_factory=list)
+    queries: List[int] = field(default_factory=list)
+    errors: int = 0
+
+    def record(self, elapsed_ms, query_count, ok):
+        self.latencies_ms.append(elapsed_ms)
+        self.queries.append(query_count)
+        self.errors += int(not ok)
+
+    def as_dict(self, wall_seconds) -> dict:
+        ordered = sorted(self.latencies_ms)
+        count = len(ordered)
+        return {
+            "requests": count,
+            "errors": self.errors,
+            "p50_ms": round(_percentile(ordered, 0.50), 2),
+            "p95_ms": round(_percentile(ordered, 0.95), 2),
+            "p99_ms": round(_percentile(ordered, 0.99), 2),
+            "max_ms": round(ordered[-1], 2) if ordered else 0.0,
+            "mean_queries": round(sum(self.queries) / count, 2) if count else 0.0,
+            "max_queries": max(self.queries, default=0),
+            "throughput_rps": round(count / wall_seconds, 2) if wall_seconds else 0.0,
+        }
+
+
+@dataclass
+class LoadTestFixture:
+    course: Course
+    users: List[User]
+    questions: List[Question]
+
+    def delete(self):
+        # Sessions, answers and results go with the course, profiles with the users.
+        self.course.delete()
+        User.objects.filter(id__in=[user.id for user in self.users]).delete()
+
+
+def seed_load_test(students, questions) -> LoadTestFixture:
+    """A throwaway published course with ``questions`` questions and ``students`` candidates."""
+    tag = secrets.token_hex(3)
+    course = Course.objects.create(
+        course_name=f"Load test {tag}",
+        is_published=True,
+        max_attempts=1,
+        duration_minutes=180,
+    )
+    created = [
+        Question(course=course, question=f"Load test question {index + 1}", option1="A", option2="B",
+                 option3="C", option4="D", answer="Option1")
+        for index in range(questions)
+    ]
+    Question.objects.bulk_create(created)
+    course.refresh_assessment_totals()
+
+    group, _ = Group.objects.get_or_create(name="STUDENT")
+    User.objects.bulk_create(
+        [User(username=f"loadtest-{tag}-{index}", first_name="Load", last_name=f"Test {index}") for index in range(students)]
+    )
+    users = list(User.objects.filter(username__startswith=f"loadtest-{tag}-").order_by("id"))
+    group.user_set.add(*users)
+    # No institutional email, so grading does not queue result notifications.
+    Student.objects.bulk_create([Student(user=user, mobile="08030000000") for user in users])
+    return LoadTestFixture(course=course, users=users, questions=list(course.question_set.order_by("id")))
+
+
+def _think(rng, mean_seconds):
+    # Exponential pauses model candidates reading at very different speeds;
+    # the cap keeps one outlier from stretching the whole run.
+    if mean_seconds > 0:
+        time.sleep(min(rng.expovariate(1 / mean_seconds), mean_seconds * 5))
+
+
+def _candidate(fixture, user, client, stats, lock, think_time, seed):
+    rng = random.Random(seed)
+
+    def timed(endpoint, method, path, data=None, ok_statuses=(200,)):
+        # ``connection`` is per thread, so this counts this candidate's queries only.
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = getattr(client, method)(path, data or {})
+            elapsed_ms = (time.perf_counter() - started) * 1000
+        with lock:
+            stats[endpoint].record(elapsed_ms, len(queries), response.status_code in ok_statuses)
+        return response
+
+    try:
+        course = fixture.course
+        timed("start-exam", "get", reverse("start-exam", args=[course.id]))
+        session = ExamSession.objects.filter(course=course, student__user=user, is_completed=False).first()
+        if session is None:
+            return
+        for question in fixture.questions:
+            _think(rng, think_time)
+            timed(
+                "submit-answer",
+                "post",
+                reverse("submit-answer-htmx"),
+                {"session_id": session.id, "question_id": question.id, "option": str(rng.randint(1, 4))},
+                ok_statuses=(204,),
+            )
+        _think(rng, think_time)
+        timed("calculate-marks", "get", reverse("calculate-marks", args=[course.id]), ok_statuses=(302,))
+    finally:
+        connection.close()
+
+
+def run_load_test(fixture, think_time=1.0, ramp_up=0.0, seed=0) -> dict:
+    """Walk every candidate of ``fixture`` through one exam, one thread each.
+
+    Requests go through Django's test client, so the full middleware stack
+    and the configured database and cache are exercised without a web
+    server. Starts are spread evenly over ``ramp_up`` seconds.
+    """
+    stats: Dict[str, EndpointStats] = {endpoint: EndpointStats() for endpoint in ENDPOINTS}
+    lock = threading.Lock()
+    users = fixture.users
+    clients = []
+    for user in users:
+        # Logging in is setup, not part of the measured lifecycle.
+        client = Client(raise_request_exception=False)
+        client.force_login(user)
+        clients.append(client)
+    threads = [
+        threading.Thread(target=_candidate, args=(fixture, user, client, stats, lock, think_time, seed + index))
+        for index, (user, client) in enumerate(zip(users, clients))
+    ]
+
+    started_at = timezone.now()
+    started = time.perf_counter()
+    for index, thread in enumerate(threads):
+        thread.start()
+        if ramp_up and index < len(threads) - 1:
+            time.sleep(ramp_up / len(threads))
+    for thread in threads:
+        thread.join()
+    wall_seconds = time.perf_counter() - started
+
+    total = sum(len(endpoint.latencies_ms) for endpoint in stats.values())
+    return {
+        "started_at": started_at.isoformat(),
+        "database": connection.vendor,
+        "students": len(users),
+        "questions": len(fixture.questions),
+        "think_time": think_time,
+        "ramp_up": ramp_up,
+        "wall_seconds": round(wall_seconds, 3),
+        "throughput_rps": round(total / wall_seconds, 2) if wall_seconds else 0.0,
+        "endpoints": {endpoint: endpoint_stats.as_dict(wall_seconds) for endpoint, endpoint_stats in stats.items()},
+    }
@@ -0,0 +1,35 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from exam.archive import ARCHIVE_BATCH_SIZE, archivable_sessions, archive_sessions
+
+
+class Command(BaseCommand):
+    help = 'Move old completed exam sessions and their answers into compressed per-course archive files'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than-days',
+            type=int,
+            default=settings.EXAM_ARCHIVE_AFTER_DAYS,
+            help='Archive sessions that ended more than this many days ago',
+        )
+        parser.add_argument('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help='Only count the sessions that would be archived')
+
+    def handle(self, *args, **options):
+        days = options['older_than_days']
+        if options['dry_run']:
+            count = archivable_sessions(timezone.now() - timedelta(days=days)).count()
+            self.stdout.write(f'{count} sessions ended more than {days} days ago.')
+            return
+
+        report = archive_sessions(older_than_days=days, batch_size=options['batch_size'])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Archived {report.sessions} sessions ({report.answers} answers) into {report.files} new archive parts.'
+            )
+        )
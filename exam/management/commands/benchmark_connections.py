@@ -0,0 +1,94 @@
+import statistics
+import threading
+import time
+
+import dj_database_url
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.utils import load_backend
+
+from onlinexam.dbconnections import ConnectionStats
+
+
+STRATEGIES = {
+    # Long-lived gunicorn/uvicorn workers.
+    'persistent': {'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': True, 'DISABLE_SERVER_SIDE_CURSORS': False},
+    # Serverless functions, usually behind a transaction pooler.
+    'serverless': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False, 'DISABLE_SERVER_SIDE_CURSORS': True},
+}
+
+
+class Command(BaseCommand):
+    help = 'Compare connect time, reuse rate and request latency of the database connection strategies'
+
+    # Each worker thread owns one connection and replays Django's request cycle:
+    # close_old_connections() on request start and finish around a small query.
+    # Point --database-url at a local Postgres (or its PgBouncer port) for real
+    # numbers; without it the configured database, e.g. SQLite, stands in.
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Requests per worker')
+        parser.add_argument('--workers', type=int, default=4, help='Concurrent workers, one connection each')
+        parser.add_argument('--database-url', default='', help='Benchmark this database instead of the default one')
+        parser.add_argument('--query', default='SELECT 1', help='Statement each request runs')
+
+    def handle(self, *args, **options):
+        if options['database_url']:
+            # Fill in Django's defaults (AUTOCOMMIT, TIME_ZONE, ...) for the parsed URL.
+            base = connections.configure_settings({'default': dj_database_url.parse(options['database_url'])})['default']
+        else:
+            base = dict(connections['default'].settings_dict)
+
+        self.stdout.write(
+            f"{'strategy':<12}{'requests':>10}{'connects':>10}{'connect ms':>12}{'reuse':>8}{'p50 ms':>10}{'p95 ms':>10}"
+        )
+        for name, overrides in STRATEGIES.items():
+            stats, latencies = self._run(
+                {**base, **overrides}, options['workers'], options['requests'], options['query']
+            )
+            ordered = sorted(latencies) or [0.0]
+            self.stdout.write(
+                f"{name:<12}{stats.requests:>10}{stats.connects:>10}{stats.mean_connect_ms:>12.2f}"
+                f"{stats.reuse_rate:>8.0%}{statistics.median(ordered):>10.2f}"
+                f"{ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]:>10.2f}"
+            )
+        self.stdout.write(self.style.SUCCESS('Benchmark complete.'))
+
+    def _run(self, settings_dict, workers, requests, query):
+        stats = ConnectionStats()
+        latencies = []
+        lock = threading.Lock()
+
+        def worker():
+            connection = load_backend(settings_dict['ENGINE']).DatabaseWrapper(dict(settings_dict), 'benchmark')
+            try:
+                for _ in range(requests):
+                    started = time.perf_counter()
+                    connection.close_if_unusable_or_obsolete()
+                    reused = connection.connection is not None
+                    if not reused:
+                        connect_started = time.perf_counter()
+                        connection.ensure_connection()
+                        connect_seconds = time.perf_counter() - connect_started
+                    with connection.cursor() as cursor:
+                        cursor.execute(query)
+                        cursor.fetchall()
+                    connection.close_if_unusable_or_obsolete()
+                    elapsed = time.perf_counter() - started
+
+                    with lock:
+                        stats.requests += 1
+                        stats.reused += int(reused)
+                        if not reused:
+                            stats.connects += 1
+                            stats.connect_seconds += connect_seconds
+                        latencies.append(elapsed * 1000)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return stats, latencies
@@ -0,0 +1,268 @@
+import asyncio
+import io
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.auth.models import Group, User
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils.crypto import get_random_string
+
+from exam.models import Course, ExamSession, Question
+from student.models import Student
+
+
+PREFIX = "bench-entrypoint"
+
+
+class _InFlight:
+    """Counts requests the application is executing at the same moment."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.current = 0
+        self.peak = 0
+
+    def __enter__(self):
+        with self._lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+
+    def __exit__(self, *exc):
+        with self._lock:
+            self.current -= 1
+
+
+STATIC_FILES_MIDDLEWARE = 'onlinexam.middleware.StaticFilesMiddleware'
+
+
+class Command(BaseCommand):
+    help = 'Compare concurrent autosave capacity of the WSGI (app.py) and ASGI entrypoints in-process'
+
+    # Both entrypoints are driven in this process with synthetic tabs: a thread
+    # pool of --wsgi-workers stands in for gunicorn sync workers, and every tab
+    # is its own coroutine against the ASGI handler. Run it against PostgreSQL;
+    # SQLite serialises writers and reports most concurrent autosaves as errors.
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=100, help='Concurrent exam tabs')
+        parser.add_argument('--requests', type=int, default=5, help='Autosaves sent by each tab')
+        parser.add_argument('--wsgi-workers', type=int, default=4, help='Sync worker threads, like gunicorn --workers')
+        parser.add_argument('--streams', type=int, default=0, help='Live-monitor streams held open during the run')
+        parser.add_argument('--stream-seconds', type=int, default=3, help='How long each live-monitor stream stays open')
+
+    def handle(self, *args, **options):
+        fixture = self._create_fixture(options['clients'])
+        try:
+            stream_settings = {'LIVE_MONITOR_INTERVAL': 1, 'LIVE_MONITOR_MAX_TICKS': options['stream_seconds']}
+            with override_settings(**stream_settings):
+                wsgi = self._run_wsgi(fixture, options)
+            # The ASGI run leaves the static files middleware out, matched by its dotted path.
+            asgi_middleware = [name for name in settings.MIDDLEWARE if name != STATIC_FILES_MIDDLEWARE]
+            with override_settings(MIDDLEWARE=asgi_middleware, **stream_settings):
+                asgi = asyncio.run(self._run_asgi(fixture, options))
+        finally:
+            self._delete_fixture()
+
+        self.stdout.write(f"{'entrypoint':<12}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'peak in-flight':>16}{'errors':>8}")
+        for name, report in (('wsgi', wsgi), ('asgi', asgi)):
+            self.stdout.write(
+                f"{name:<12}{report['throughput']:>10.1f}{report['p50']:>10.1f}{report['p95']:>10.1f}"
+                f"{report['peak']:>16}{report['errors']:>8}"
+            )
+        self.stdout.write(self.style.SUCCESS('Benchmark complete.'))
+
+    # Fixture -------------------------------------------------------------
+
+    def _create_fixture(self, clients):
+        self._delete_fixture()
+        student_group, _ = Group.objects.get_or_create(name='STUDENT')
+        admin = User.objects.create(username=f'{PREFIX}-admin', is_staff=True)
+        course = Course.objects.create(course_name=f'{PREFIX} course', duration_minutes=60)
+        questions = [
+            Question.objects.create(course=course, question=f'{PREFIX} Q{index}', answer='Option1') for index in range(5)
+        ]
+
+        csrf = get_random_string(32)
+        tabs = []
+        for index in range(clients):
+            user = User.objects.create(username=f'{PREFIX}-{index}')
+            student_group.user_set.add(user)
+            student = Student.objects.create(user=user, matric_number=f'BENCH/{index:05d}', mobile='0')
+            session = ExamSession.objects.create(student=student, course=course)
+            tabs.append({'cookie': self._cookie_for(user, csrf), 'session': session.id})
+
+        return {
+            'csrf': csrf,
+            'tabs': tabs,
+            'questions': [question.id for question in questions],
+            'admin_cookie': self._cookie_for(admin, csrf),
+            'stream_path': reverse('admin-live-monitor-stream', args=[course.id]),
+            'submit_path': reverse('submit-answer-htmx'),
+        }
+
+    def _cookie_for(self, user, csrf):
+        client = Client()
+        client.force_login(user)
+        session_cookie = client.cookies[settings.SESSION_COOKIE_NAME].value
+        return f'{settings.SESSION_COOKIE_NAME}={session_cookie}; {settings.CSRF_COOKIE_NAME}={csrf}'
+
+    def _delete_fixture(self):
+        Course.objects.filter(course_name__startswith=PREFIX).delete()
+        User.objects.filter(username__startswith=PREFIX).delete()
+
+    def _autosave_bodies(self, fixture, tab, count):
+        questions = fixture['questions']
+        for number in range(count):
+            yield urlencode(
+                {'session_id': tab['session'], 'question_id': questions[number % len(questions)], 'option': str(number % 4 + 1)}
+            ).encode()
+
+    # WSGI ----------------------------------------------------------------
+
+    def _run_wsgi(self, fixture, options):
+        from app import app
+
+        host = self._host()
+        in_flight = _InFlight()
+        latencies, errors = [], []
+
+        def call(path, method, cookie, body=b''):
+            environ = {
+                'REQUEST_METHOD': method,
+                'PATH_INFO': path,
+                'QUERY_STRING': '',
+                'SERVER_NAME': host,
+                'SERVER_PORT': '80',
+                'SERVER_PROTOCOL': 'HTTP/1.1',
+                'HTTP_HOST': host,
+                'HTTP_COOKIE': cookie,
+                'HTTP_X_CSRFTOKEN': fixture['csrf'],
+                'CONTENT_TYPE': 'application/x-www-form-urlencoded',
+                'CONTENT_LENGTH': str(len(body)),
+                'wsgi.input': io.BytesIO(body),
+                'wsgi.errors': sys.stderr,
+                'wsgi.url_scheme': 'http',
+                'wsgi.version': (1, 0),
+                'wsgi.multithread': True,
+                'wsgi.multiprocess': False,
+                'wsgi.run_once': False,
+            }
+            status = []
+            with in_flight:
+                response = app(environ, lambda line, headers, exc_info=None: status.append(line))
+                try:
+                    for _chunk in response:
+                        pass
+                finally:
+                    response.close()
+            return int(status[0].split()[0])
+
+        def stream():
+            call(fixture['stream_path'], 'GET', fixture['admin_cookie'])
+            close_old_connections()
+
+        def tab_worker(tab):
+            for body in self._autosave_bodies(fixture, tab, options['requests']):
+                started = time.perf_counter()
+                status = call(fixture['submit_path'], 'POST', tab['cookie'], body)
+                latencies.append((time.perf_counter() - started) * 1000)
+                if status != 204:
+                    errors.append(status)
+            close_old_connections()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['wsgi_workers']) as pool:
+            futures = [pool.submit(stream) for _ in range(options['streams'])]
+            futures += [pool.submit(tab_worker, tab) for tab in fixture['tabs']]
+            for future in futures:
+                future.result()
+        return self._report(latencies, errors, time.perf_counter() - started, in_flight.peak)
+
+    # ASGI ----------------------------------------------------------------
+
+    async def _run_asgi(self, fixture, options):
+        handler = ASGIHandler()
+        host = self._host()
+        in_flight = _InFlight()
+        latencies, errors = [], []
+
+        async def call(path, method, cookie, body=b''):
+            scope = {
+                'type': 'http',
+                'asgi': {'version': '3.0'},
+                'http_version': '1.1',
+                'method': method,
+                'scheme': 'http',
+                'path': path,
+                'raw_path': path.encode(),
+                'query_string': b'',
+                'server': (host, 80),
+                'client': ('127.0.0.1', 0),
+                'headers': [
+                    (b'host', host.encode()),
+                    (b'cookie', cookie.encode()),
+                    (b'x-csrftoken', fixture['csrf'].encode()),
+                    (b'content-type', b'application/x-www-form-urlencoded'),
+                    (b'content-length', str(len(body)).encode()),
+                ],
+            }
+            request_sent = False
+            disconnected = asyncio.Event()
+            status = []
+
+            async def receive():
+                nonlocal request_sent
+                if not request_sent:
+                    request_sent = True
+                    return {'type': 'http.request', 'body': body, 'more_body': False}
+                await disconnected.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    status.append(message['status'])
+
+            with in_flight:
+                await handler(scope, receive, send)
+            disconnected.set()
+            return status[0]
+
+        async def tab_worker(tab):
+            for body in self._autosave_bodies(fixture, tab, options['requests']):
+                started = time.perf_counter()
+                status = await call(fixture['submit_path'], 'POST', tab['cookie'], body)
+                latencies.append((time.perf_counter() - started) * 1000)
+                if status != 204:
+                    errors.append(status)
+
+        started = time.perf_counter()
+        await asyncio.gather(
+            *[call(fixture['stream_path'], 'GET', fixture['admin_cookie']) for _ in range(options['streams'])],
+            *[tab_worker(tab) for tab in fixture['tabs']],
+        )
+        return self._report(latencies, errors, time.perf_counter() - started, in_flight.peak)
+
+    # Helpers -------------------------------------------------------------
+
+    def _host(self):
+        hosts = [host for host in settings.ALLOWED_HOSTS if host not in ('*', '') and not host.startswith('.')]
+        return hosts[0] if hosts else 'localhost'
+
+    def _report(self, latencies, errors, elapsed, peak):
+        ordered = sorted(latencies) or [0.0]
+        return {
+            'throughput': len(latencies) / elapsed if elapsed else 0.0,
+            'p50': statistics.median(ordered),
+            'p95': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+            'peak': peak,
+            'errors': len(errors),
+        }
@@ -0,0 +1,54 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from exam.images import build_profile_thumbnails, profile_thumbnails_stale, store_profile_thumbnails
+from student.models import Student
+from teacher.models import Teacher
+
+
+def _init_worker():
+    # Spawned (non-forked) workers start without the app registry.
+    django.setup()
+
+
+def _render(name):
+    # Workers only touch the storage; the parent process writes the rows.
+    return name, build_profile_thumbnails(name)
+
+
+class Command(BaseCommand):
+    help = 'Build missing or stale profile picture thumbnails across a pool of worker processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Worker processes')
+        parser.add_argument('--force', action='store_true', help='Rebuild thumbnails that are already up to date')
+
+    def handle(self, *args, **options):
+        pending = {}
+        for model in (Student, Teacher):
+            for profile in model.objects.exclude(profile_pic='').exclude(profile_pic__isnull=True).iterator():
+                if options['force'] or profile_thumbnails_stale(profile):
+                    pending.setdefault(profile.profile_pic.name, []).append(profile)
+
+        if not pending:
+            self.stdout.write(self.style.SUCCESS('All profile thumbnails are up to date.'))
+            return
+
+        # Forked workers must not inherit open database connections.
+        connections.close_all()
+        built = failed = 0
+        with ProcessPoolExecutor(max_workers=max(1, options['workers']), initializer=_init_worker) as pool:
+            for name, variants in pool.map(_render, list(pending), chunksize=8):
+                for profile in pending[name]:
+                    store_profile_thumbnails(profile, variants)
+                if len(variants) > 1:
+                    built += 1
+                else:
+                    failed += 1
+                    self.stderr.write(f'Could not read {name}; it will be served as uploaded.')
+
+        self.stdout.write(self.style.SUCCESS(f'Built thumbnails for {built} picture(s); {failed} unreadable.'))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from exam.images import refresh_question_image, variants_stale
+from exam.models import Question
+
+
+class Command(BaseCommand):
+    help = 'Build responsive variants for question images uploaded before they were generated on save'
+
+    def handle(self, *args, **options):
+        built = 0
+        for question in Question.objects.exclude(image='').exclude(image__isnull=True).iterator():
+            if variants_stale(question, 'image'):
+                refresh_question_image(question)
+                built += 1
+        self.stdout.write(self.style.SUCCESS(f'Built variants for {built} question image(s).'))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from exam.collusion import detect_collusion, record_collusion_flags
+from exam.models import Course
+
+
+class Command(BaseCommand):
+    help = 'Flag candidate pairs with near-identical wrong answers in a course'
+
+    def add_arguments(self, parser):
+        parser.add_argument('course_ids', nargs='*', type=int, help='Courses to scan (default: all published courses)')
+        parser.add_argument('--min-shared', type=int, default=3, help='Minimum identical wrong answers to flag a pair')
+        parser.add_argument('--min-similarity', type=float, default=0.6, help='Minimum Jaccard similarity of wrong answers')
+        parser.add_argument('--include-open', action='store_true', help='Also scan sessions that are still in progress')
+
+    def handle(self, *args, **options):
+        courses = Course.objects.filter(is_published=True)
+        if options['course_ids']:
+            courses = Course.objects.filter(id__in=options['course_ids'])
+            if not courses.exists():
+                raise CommandError('No matching courses found.')
+
+        for course in courses.order_by('course_name'):
+            pairs = detect_collusion(
+                course,
+                min_shared=options['min_shared'],
+                min_similarity=options['min_similarity'],
+                include_open=options['include_open'],
+            )
+            flagged = record_collusion_flags(course, pairs)
+            style = self.style.WARNING if flagged else self.style.SUCCESS
+            self.stdout.write(style(f'{course.course_name}: {flagged} flagged pairs'))
@@ -0,0 +1,50 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from exam.loadtest import ENDPOINTS, run_load_test, seed_load_test
+
+
+class Command(BaseCommand):
+    help = 'Simulate concurrent candidates taking an exam and report latency, queries and throughput per endpoint'
+
+    # Each candidate is a thread with its own test client: start the exam,
+    # answer every question with think time in between, then submit. The run
+    # uses the configured database and cache, so point it at a staging copy
+    # rather than production; the seeded course and users are removed after.
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=20, help='Concurrent candidates')
+        parser.add_argument('--questions', type=int, default=20, help='Questions in the seeded exam')
+        parser.add_argument('--think-time', type=float, default=1.0, help='Mean seconds between a candidate\'s requests')
+        parser.add_argument('--ramp-up', type=float, default=0.0, help='Seconds over which candidates start')
+        parser.add_argument('--seed', type=int, default=0, help='Seed for answers and think times')
+        parser.add_argument('--output', default='loadtest-report.json', help='Where to write the JSON report')
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded course, candidates and results')
+
+    def handle(self, *args, **options):
+        fixture = seed_load_test(options['students'], options['questions'])
+        try:
+            report = run_load_test(
+                fixture, think_time=options['think_time'], ramp_up=options['ramp_up'], seed=options['seed']
+            )
+        finally:
+            if not options['keep']:
+                fixture.delete()
+
+        with open(options['output'], 'w', encoding='utf-8') as handle:
+            json.dump(report, handle, indent=2)
+
+        self.stdout.write(
+            f"{'endpoint':<18}{'requests':>10}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+            f"{'queries':>9}{'req/s':>9}"
+        )
+        for endpoint in ENDPOINTS:
+            row = report['endpoints'][endpoint]
+            self.stdout.write(
+                f"{endpoint:<18}{row['requests']:>10}{row['errors']:>8}{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}"
+                f"{row['p99_ms']:>10.2f}{row['mean_queries']:>9.1f}{row['throughput_rps']:>9.2f}"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['students']} candidate(s) in {report['wall_seconds']}s; report written to {options['output']}"
+        ))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from exam.analytics import rebuild_result_rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuild faculty/department/level/course result rollups from the Result table'
+
+    def handle(self, *args, **options):
+        bucket_count = rebuild_result_rollups()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {bucket_count} rollup buckets.'))
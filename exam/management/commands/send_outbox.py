@@ -0,0 +1,35 @@
+import time
+
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+
+from exam.outbox import OUTBOX_BATCH_SIZE, DeliveryReport, deliver_batch
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued emails from the outbox over one reused SMTP connection'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=OUTBOX_BATCH_SIZE)
+        parser.add_argument('--digest', action='store_true', help='Merge queued messages for the same recipient into one email')
+        parser.add_argument('--loop', action='store_true', help='Keep running as a worker')
+        parser.add_argument('--interval', type=float, default=30, help='Seconds to idle when the outbox is empty (with --loop)')
+
+    def handle(self, *args, **options):
+        total = DeliveryReport()
+        connection = get_connection()
+        try:
+            while True:
+                report = deliver_batch(connection, batch_size=options['batch_size'], digest=options['digest'])
+                total += report
+                claimed = report.sent + report.retried + report.failed
+                if claimed == options['batch_size']:
+                    continue
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+        finally:
+            connection.close()
+
+        style = self.style.WARNING if total.failed else self.style.SUCCESS
+        self.stdout.write(style(f'Sent {total.sent} emails, {total.retried} queued for retry, {total.failed} failed.'))
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from exam.grading import SWEEP_BATCH_SIZE, sweep_expired_sessions
+
+
+class Command(BaseCommand):
+    help = 'Auto-grade and close exam sessions that ran past their end time'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=SWEEP_BATCH_SIZE)
+        parser.add_argument('--pause', type=float, default=0.5, help='Seconds to wait between batches')
+        parser.add_argument('--loop', action='store_true', help='Keep running as a worker')
+        parser.add_argument('--interval', type=float, default=30, help='Seconds to idle when nothing is expired (with --loop)')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        total = 0
+        while True:
+            swept = sweep_expired_sessions(batch_size=batch_size)
+            total += swept
+            if swept:
+                self.stdout.write(f'Graded {swept} expired sessions.')
+            if swept == batch_size:
+                # Pace full batches so a backlog drains without a load spike.
+                time.sleep(options['pause'])
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(f'Swept {total} expired sessions.'))
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:35
+
+from decimal import Decimal
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exam', '0010_reconcile_exam_schema'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResultRollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('faculty', models.CharField(blank=True, default='', max_length=120)),
+                ('department', models.CharField(blank=True, default='', max_length=120)),
+                ('level', models.CharField(blank=True, default='', max_length=10)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('passed', models.PositiveIntegerField(default=0)),
+                ('percentage_total', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='exam.course')),
+            ],
+            options={
+                'ordering': ['faculty', 'department', 'level', 'course_id'],
+                'indexes': [models.Index(fields=['faculty', 'department', 'level'], name='exam_rollup_dims_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='resultrollup',
+            constraint=models.UniqueConstraint(fields=('course', 'faculty', 'department', 'level'), name='unique_result_rollup_bucket'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:36
+
+from decimal import Decimal
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student', '0004_reconcile_student_schema'),
+        ('exam', '0011_result_rollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CollusionFlag',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('session_a_id', models.PositiveIntegerField()),
+                ('session_b_id', models.PositiveIntegerField()),
+                ('shared_wrong', models.PositiveIntegerField(default=0)),
+                ('similarity', models.DecimalField(decimal_places=4, default=Decimal('0.0000'), max_digits=5)),
+                ('detected_at', models.DateTimeField(auto_now_add=True)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='exam.course')),
+                ('student_a', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='student.student')),
+                ('student_b', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='student.student')),
+            ],
+            options={
+                'ordering': ['-shared_wrong', '-similarity'],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exam', '0012_collusion_flag'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SessionTimeline',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('anchor_ms', models.BigIntegerField(default=0, help_text='Epoch milliseconds of the first event')),
+                ('last_event_ms', models.BigIntegerField(default=0, help_text='Epoch milliseconds of the latest event')),
+                ('event_count', models.PositiveIntegerField(default=0)),
+                ('events', models.BinaryField(default=bytes)),
+                ('session', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='timeline', to='exam.examsession')),
+            ],
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:39
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exam', '0013_session_timeline'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='examsession',
+            name='suspicious_event_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='examsession',
+            name='tab_switch_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='ProctorEvent',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_type', models.CharField(choices=[('tab-switch', 'Tab switch'), ('window-blur', 'Window lost focus'), ('copy', 'Copy attempt'), ('paste', 'Paste attempt'), ('fullscreen-exit', 'Left fullscreen')], max_length=20)),
+                ('occurred_at', models.DateTimeField()),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='proctor_events', to='exam.examsession')),
+            ],
+            options={
+                'ordering': ['occurred_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exam', '0014_proctoring_pipeline'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='admission_rate',
+            field=models.PositiveIntegerField(default=0, help_text='New exam sessions admitted per second; 0 admits everyone immediately.'),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='window_closes_at',
+            field=models.DateTimeField(blank=True, help_text='No new attempts can start after this time; open sessions may still finish.', null=True),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='window_opens_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
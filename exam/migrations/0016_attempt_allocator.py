@@ -0,0 +1,76 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:45
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def number_existing_sessions(apps, schema_editor):
+    ExamSession = apps.get_model("exam", "ExamSession")
+    Result = apps.get_model("exam", "Result")
+    # Attempt numbers already taken by Results, as in exam.attempts._initial_issued.
+    results_top = {
+        (row["student_id"], row["exam_id"]): row["top"]
+        for row in Result.objects.values("student_id", "exam_id").annotate(top=models.Max("attempt_number"))
+    }
+    counters = {}
+    for session in ExamSession.objects.order_by("student_id", "course_id", "started_at", "id").iterator():
+        key = (session.student_id, session.course_id)
+        issued = counters.get(key, 0)
+        if not session.is_completed:
+            # Grading would otherwise find the Result of an earlier attempt
+            # with the same number and return it instead of a new one.
+            issued = max(issued, results_top.get(key) or 0)
+        counters[key] = issued + 1
+        if session.attempt_number != counters[key]:
+            session.attempt_number = counters[key]
+            session.save(update_fields=["attempt_number"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student', '0004_reconcile_student_schema'),
+        ('exam', '0015_course_admission_window'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttemptCounter',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('issued', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='examsession',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='examsession',
+            name='attempt_number',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.RunPython(number_existing_sessions, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='examsession',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_completed', False)), fields=('student', 'course'), name='unique_open_session_per_course'),
+        ),
+        migrations.AddConstraint(
+            model_name='examsession',
+            constraint=models.UniqueConstraint(fields=('student', 'course', 'attempt_number'), name='unique_session_attempt_per_course'),
+        ),
+        migrations.AddField(
+            model_name='attemptcounter',
+            name='course',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='exam.course'),
+        ),
+        migrations.AddField(
+            model_name='attemptcounter',
+            name='student',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='student.student'),
+        ),
+        migrations.AddConstraint(
+            model_name='attemptcounter',
+            constraint=models.UniqueConstraint(fields=('student', 'course'), name='unique_attempt_counter'),
+        ),
+    ]
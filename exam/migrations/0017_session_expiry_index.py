@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exam', '0016_attempt_allocator'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='examsession',
+            index=models.Index(fields=['is_completed', 'end_time'], name='exam_session_expiry_idx'),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 4.2.30 on 2026-10-19 10:01
+
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def drop_duplicate_answers(apps, schema_editor):
+    """Keep the latest answer where racing autosaves stored a question twice."""
+    StudentAnswer = apps.get_model("exam", "StudentAnswer")
+    duplicates = (
+        StudentAnswer.objects.values("session_id", "question_id")
+        .annotate(copies=Count("id"), keep=Max("id"))
+        .filter(copies__gt=1)
+        .order_by()
+    )
+    for row in duplicates.iterator():
+        StudentAnswer.objects.filter(session_id=row["session_id"], question_id=row["question_id"]).exclude(
+            id=row["keep"]
+        ).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exam', '0018_outbound_email'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='examsession',
+            index=models.Index(condition=models.Q(('is_completed', False)), fields=['course', 'started_at'], name='exam_session_open_course_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['course', 'id'], name='exam_question_course_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='result',
+            index=models.Index(fields=['-date', '-attempt_number'], name='exam_result_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='result',
+            index=models.Index(fields=['student', '-date'], name='exam_result_student_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='result',
+            index=models.Index(fields=['exam', 'passed'], name='exam_result_exam_passed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='result',
+            index=models.Index(condition=models.Q(('passed', True)), fields=['date'], name='exam_result_passed_idx'),
+        ),
+        migrations.RunPython(drop_duplicate_answers, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='studentanswer',
+            constraint=models.UniqueConstraint(fields=('session', 'question'), name='unique_answer_per_question'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-19 10:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exam', '0019_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SessionArchive',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('semester', models.CharField(max_length=10)),
+                ('path', models.CharField(max_length=255)),
+                ('session_count', models.PositiveIntegerField(default=0)),
+                ('answer_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='exam.course')),
+            ],
+            options={
+                'ordering': ['course', 'semester'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='sessionarchive',
+            constraint=models.UniqueConstraint(fields=('course', 'semester'), name='unique_archive_per_course_semester'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.30 on 2026-10-19 11:21
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def stamp_existing_results(apps, schema_editor):
+    Result = apps.get_model("exam", "Result")
+    Student = apps.get_model("student", "Student")
+    # The student's current values are the keys the existing rollup buckets were built with.
+    student = Student.objects.filter(pk=OuterRef("student_id"))
+    Result.objects.update(
+        **{
+            field: Coalesce(Subquery(student.values(source)[:1]), Value(""))
+            for field, source in (("faculty", "faculty"), ("department", "department"), ("level", "current_level"))
+        }
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exam', '0021_question_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='result',
+            name='department',
+            field=models.CharField(blank=True, default='', max_length=120),
+        ),
+        migrations.AddField(
+            model_name='result',
+            name='faculty',
+            field=models.CharField(blank=True, default='', max_length=120),
+        ),
+        migrations.AddField(
+            model_name='result',
+            name='level',
+            field=models.CharField(blank=True, default='', max_length=10),
+        ),
+        migrations.RunPython(stamp_existing_results, migrations.RunPython.noop),
+    ]
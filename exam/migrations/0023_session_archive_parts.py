@@ -0,0 +1,30 @@
+# Generated by Django 4.2.30 on 2026-10-19 11:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exam', '0022_result_rollup_bucket'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='sessionarchive',
+            options={'ordering': ['course', 'semester', 'part']},
+        ),
+        migrations.RemoveConstraint(
+            model_name='sessionarchive',
+            name='unique_archive_per_course_semester',
+        ),
+        migrations.AddField(
+            model_name='sessionarchive',
+            name='part',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddConstraint(
+            model_name='sessionarchive',
+            constraint=models.UniqueConstraint(fields=('course', 'semester', 'part'), name='unique_archive_part'),
+        ),
+    ]
@@ -1,11 +1,15 @@
 from decimal import Decimal
 from django.db import models
-from django.db.models import Sum
-from django.db.models.signals import post_delete, post_save
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 from django.utils import timezone
 from student.models import Student
 
+from .catalog import bump_catalog_version
+from .images import delete_thumbnails, refresh_question_image
+
 class Category(models.Model):
     name = models.CharField(max_length=100, unique=True)
     description = models.TextField(blank=True)
@@ -40,6 +44,18 @@ class Course(models.Model):
     show_explanation_after_exam = models.BooleanField(default=True)
     is_published = models.BooleanField(default=False)
     
+    # Scheduled sitting window and admission control (see exam.admission)
+    window_opens_at = models.DateTimeField(null=True, blank=True)
+    window_closes_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="No new attempts can start after this time; open sessions may still finish.",
+    )
+    admission_rate = models.PositiveIntegerField(
+        default=0,
+        help_text="New exam sessions admitted per second; 0 admits everyone immediately.",
+    )
+
     instructions = models.TextField(blank=True, default="")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -95,9 +111,14 @@ class Question(models.Model):
         default="INTERMEDIATE",
     )
     image = models.ImageField(upload_to="questions/", blank=True, null=True)
+    # Resized copies by width and format, see exam.images.render_width_variants().
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
 
     class Meta:
         ordering = ["id"]
+        indexes = [
+            models.Index(fields=["course", "id"], name="exam_question_course_idx"),
+        ]
 
     def __init__(self, *args, **kwargs):
         legacy_question = kwargs.pop("question", None)
@@ -116,6 +137,17 @@ class Question(models.Model):
     def __str__(self):
         return f"{self.course.course_name} - {self.question_text[:50]}"
 
+    def is_correct_answer(self, selected):
+        """The exam engine posts bare option numbers ("2"), answers are stored as "Option2"."""
+        selected = (selected or "").strip()
+        if not selected:
+            return False
+        if self.question_type == "SHORT_ANSWER":
+            return selected.lower() == self.answer.strip().lower()
+        if selected.isdigit():
+            selected = f"Option{selected}"
+        return selected.lower() == self.answer.lower()
+
 class ExamSession(models.Model):
     """V2.0: Persistent state for ongoing exams"""
     student = models.ForeignKey(Student, on_delete=models.CASCADE)
@@ -123,16 +155,52 @@ class ExamSession(models.Model):
     started_at = models.DateTimeField(auto_now_add=True)
     end_time = models.DateTimeField()
     is_completed = models.BooleanField(default=False)
+    attempt_number = models.PositiveIntegerField(default=1)
     current_question_index = models.PositiveIntegerField(default=0)
-    
+
+    # Proctoring counters, incremented in batches by exam.proctoring
+    tab_switch_count = models.PositiveIntegerField(default=0)
+    suspicious_event_count = models.PositiveIntegerField(default=0)
+
     class Meta:
-        unique_together = ('student', 'course', 'is_completed')
+        constraints = [
+            models.UniqueConstraint(
+                fields=["student", "course"],
+                condition=models.Q(is_completed=False),
+                name="unique_open_session_per_course",
+            ),
+            models.UniqueConstraint(
+                fields=["student", "course", "attempt_number"],
+                name="unique_session_attempt_per_course",
+            ),
+        ]
+        indexes = [
+            # Lets the expiry sweeper find open sessions past their deadline.
+            models.Index(fields=["is_completed", "end_time"], name="exam_session_expiry_idx"),
+            # Live monitor roster: open sessions of one course in start order.
+            models.Index(
+                fields=["course", "started_at"],
+                condition=models.Q(is_completed=False),
+                name="exam_session_open_course_idx",
+            ),
+        ]
 
     def save(self, *args, **kwargs):
         if not self.end_time:
             self.end_time = timezone.now() + timezone.timedelta(minutes=self.course.duration_minutes)
         super().save(*args, **kwargs)
 
+class AttemptCounter(models.Model):
+    """Attempt numbers issued so far to one student for one course (see exam.attempts)."""
+    student = models.ForeignKey(Student, on_delete=models.CASCADE)
+    course = models.ForeignKey(Course, on_delete=models.CASCADE)
+    issued = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["student", "course"], name="unique_attempt_counter"),
+        ]
+
 class StudentAnswer(models.Model):
     """V2.0: Database-level persistence for answers"""
     session = models.ForeignKey(ExamSession, related_name="answers", on_delete=models.CASCADE)
@@ -141,6 +209,50 @@ class StudentAnswer(models.Model):
     is_correct = models.BooleanField(default=False)
     timestamp = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["session", "question"], name="unique_answer_per_question"),
+        ]
+
+class ProctorEvent(models.Model):
+    """Append-only log of proctoring signals; counters live on ExamSession."""
+    EVENT_CHOICES = (
+        ("tab-switch", "Tab switch"),
+        ("window-blur", "Window lost focus"),
+        ("copy", "Copy attempt"),
+        ("paste", "Paste attempt"),
+        ("fullscreen-exit", "Left fullscreen"),
+    )
+
+    session = models.ForeignKey(ExamSession, related_name="proctor_events", on_delete=models.CASCADE)
+    event_type = models.CharField(max_length=20, choices=EVENT_CHOICES)
+    occurred_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ["occurred_at"]
+
+class SessionTimeline(models.Model):
+    """Question-enter and answer events for one session, packed by exam.timeline."""
+    session = models.OneToOneField(ExamSession, related_name="timeline", on_delete=models.CASCADE)
+    anchor_ms = models.BigIntegerField(default=0, help_text="Epoch milliseconds of the first event")
+    last_event_ms = models.BigIntegerField(default=0, help_text="Epoch milliseconds of the latest event")
+    event_count = models.PositiveIntegerField(default=0)
+    events = models.BinaryField(default=bytes)
+
+class CollusionFlag(models.Model):
+    """A pair of candidates whose wrong answers overlap suspiciously in one course."""
+    course = models.ForeignKey(Course, on_delete=models.CASCADE)
+    student_a = models.ForeignKey(Student, related_name="+", on_delete=models.CASCADE)
+    student_b = models.ForeignKey(Student, related_name="+", on_delete=models.CASCADE)
+    session_a_id = models.PositiveIntegerField()
+    session_b_id = models.PositiveIntegerField()
+    shared_wrong = models.PositiveIntegerField(default=0)
+    similarity = models.DecimalField(max_digits=5, decimal_places=4, default=Decimal("0.0000"))
+    detected_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-shared_wrong", "-similarity"]
+
 class Result(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE)
     exam = models.ForeignKey(Course, on_delete=models.CASCADE)
@@ -160,6 +272,11 @@ class Result(models.Model):
     # Proctoring feedback
     tab_switches = models.PositiveIntegerField(default=0)
     suspicious_activity_count = models.PositiveIntegerField(default=0)
+
+    # Analytics bucket: where the student stood when the attempt was recorded.
+    faculty = models.CharField(max_length=120, blank=True, default="")
+    department = models.CharField(max_length=120, blank=True, default="")
+    level = models.CharField(max_length=10, blank=True, default="")
     
     date = models.DateTimeField(auto_now_add=True)
 
@@ -171,6 +288,179 @@ class Result(models.Model):
                 name="unique_result_attempt_per_exam",
             )
         ]
+        # (student, exam) lookups are served by the unique constraint above.
+        indexes = [
+            models.Index(fields=["-date", "-attempt_number"], name="exam_result_recent_idx"),
+            models.Index(fields=["student", "-date"], name="exam_result_student_recent_idx"),
+            models.Index(fields=["exam", "passed"], name="exam_result_exam_passed_idx"),
+            models.Index(fields=["date"], condition=models.Q(passed=True), name="exam_result_passed_idx"),
+        ]
+
+    def stamp_bucket(self):
+        """Copy the student's current faculty, department and level onto a new result."""
+        self.faculty = self.student.faculty or ""
+        self.department = self.student.department or ""
+        self.level = self.student.current_level or ""
+
+class ResultRollup(models.Model):
+    """Running totals of attempts per faculty, department, level and course."""
+    course = models.ForeignKey(Course, on_delete=models.CASCADE)
+    faculty = models.CharField(max_length=120, blank=True, default="")
+    department = models.CharField(max_length=120, blank=True, default="")
+    level = models.CharField(max_length=10, blank=True, default="")
+
+    attempts = models.PositiveIntegerField(default=0)
+    passed = models.PositiveIntegerField(default=0)
+    percentage_total = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0.00"))
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["faculty", "department", "level", "course_id"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["course", "faculty", "department", "level"],
+                name="unique_result_rollup_bucket",
+            )
+        ]
+        indexes = [
+            models.Index(fields=["faculty", "department", "level"], name="exam_rollup_dims_idx"),
+        ]
+
+    @property
+    def mean_percentage(self):
+        if not self.attempts:
+            return Decimal("0.00")
+        return (self.percentage_total / self.attempts).quantize(Decimal("0.01"))
+
+    @property
+    def pass_rate(self):
+        if not self.attempts:
+            return Decimal("0.00")
+        return (Decimal(self.passed * 100) / self.attempts).quantize(Decimal("0.01"))
+
+    @staticmethod
+    def bucket_for(result):
+        return {
+            "course_id": result.exam_id,
+            "faculty": result.faculty,
+            "department": result.department,
+            "level": result.level,
+        }
+
+    @classmethod
+    def apply_result(cls, result, direction=1):
+        cls.apply_totals(
+            cls.bucket_for(result),
+            attempts=direction,
+            passed=direction if result.passed else 0,
+            percentage_total=direction * Decimal(result.percentage),
+        )
+
+    @classmethod
+    def apply_results(cls, results):
+        """Add a batch of new results with one update per bucket they touch."""
+        totals = {}
+        for result in results:
+            key = tuple(sorted(cls.bucket_for(result).items()))
+            attempts, passed, percentage_total = totals.get(key, (0, 0, Decimal("0.00")))
+            totals[key] = (attempts + 1, passed + int(result.passed), percentage_total + Decimal(result.percentage))
+        for key, (attempts, passed, percentage_total) in totals.items():
+            cls.apply_totals(dict(key), attempts=attempts, passed=passed, percentage_total=percentage_total)
+
+    @classmethod
+    def rebuild_bucket(cls, bucket):
+        """Recount one bucket from its results, after an edit moved or rescored one."""
+        results = Result.objects.filter(
+            exam_id=bucket["course_id"],
+            faculty=bucket["faculty"],
+            department=bucket["department"],
+            level=bucket["level"],
+        )
+        totals = results.aggregate(
+            attempts=Count("id"),
+            passed=Count("id", filter=Q(passed=True)),
+            percentage_total=Coalesce(Sum("percentage"), Decimal("0.00"), output_field=models.DecimalField()),
+        )
+        if totals["attempts"]:
+            cls.objects.update_or_create(**bucket, defaults=totals)
+        else:
+            cls.objects.filter(**bucket).update(
+                attempts=0, passed=0, percentage_total=Decimal("0.00"), updated_at=timezone.now()
+            )
+
+    @classmethod
+    def apply_totals(cls, bucket, attempts, passed, percentage_total):
+        # Deletes only touch an existing bucket so a cascading course delete
+        # never recreates a row that is about to be removed.
+        if attempts > 0:
+            cls.objects.get_or_create(**bucket)
+        cls.objects.filter(**bucket).update(
+            attempts=F("attempts") + attempts,
+            passed=F("passed") + passed,
+            percentage_total=F("percentage_total") + percentage_total,
+            updated_at=timezone.now(),
+        )
+
+class OutboundEmail(models.Model):
+    """One queued message per recipient; delivered by the send_outbox command (see exam.outbox)."""
+    KIND_CHOICES = (
+        ("new-exam", "New exam available"),
+        ("result", "Exam result"),
+    )
+    STATUS_CHOICES = (
+        ("pending", "Pending"),
+        # Claimed by a worker until next_attempt_at, its lease.
+        ("sending", "Sending"),
+        ("sent", "Sent"),
+        ("failed", "Failed"),
+    )
+
+    recipient = models.EmailField()
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="pending")
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["created_at"]
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"], name="exam_outbox_due_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} to {self.recipient} ({self.status})"
+
+class SessionArchive(models.Model):
+    """One compressed JSON Lines part of a course's archived sessions for a semester (see exam.archive)."""
+    course = models.ForeignKey(Course, on_delete=models.CASCADE)
+    semester = models.CharField(max_length=10)
+    part = models.PositiveIntegerField(default=1)
+    path = models.CharField(max_length=255)
+    session_count = models.PositiveIntegerField(default=0)
+    answer_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["course", "semester", "part"]
+        constraints = [
+            models.UniqueConstraint(fields=["course", "semester", "part"], name="unique_archive_part"),
+        ]
+
+    def __str__(self):
+        return f"{self.course} {self.semester} part {self.part} ({self.session_count} sessions)"
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def invalidate_course_catalog(sender, **kwargs):
+    bump_catalog_version()
 
 @receiver(post_save, sender=Question)
 def sync_course_metrics_on_save(sender, instance, **kwargs):
@@ -179,3 +469,41 @@ def sync_course_metrics_on_save(sender, instance, **kwargs):
 @receiver(post_delete, sender=Question)
 def sync_course_metrics_on_delete(sender, instance, **kwargs):
     instance.course.refresh_assessment_totals()
+
+@receiver(post_save, sender=Question)
+def build_question_image_variants(sender, instance, **kwargs):
+    refresh_question_image(instance)
+
+@receiver(post_delete, sender=Question)
+def delete_question_image_variants(sender, instance, **kwargs):
+    delete_thumbnails(instance.image_variants)
+
+@receiver(pre_save, sender=Result)
+def stamp_result_bucket(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    if instance._state.adding:
+        instance.stamp_bucket()
+    else:
+        # An edit may rescore the result or move it to another course or student.
+        previous = Result.objects.filter(pk=instance.pk).first()
+        if previous is not None and previous.student_id != instance.student_id:
+            instance.stamp_bucket()
+        instance._previous_bucket = ResultRollup.bucket_for(previous) if previous else None
+
+@receiver(post_save, sender=Result)
+def sync_rollup_on_result_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        ResultRollup.apply_result(instance)
+        return
+    bucket = ResultRollup.bucket_for(instance)
+    previous = getattr(instance, "_previous_bucket", None)
+    ResultRollup.rebuild_bucket(bucket)
+    if previous and previous != bucket:
+        ResultRollup.rebuild_bucket(previous)
+
+@receiver(post_delete, sender=Result)
+def sync_rollup_on_result_delete(sender, instance, **kwargs):
+    ResultRollup.apply_result(instance, direction=-1)
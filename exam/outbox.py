@@ -0,0 +1,174 @@
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Iterable, List
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+
+OUTBOX_BATCH_SIZE = 100
+MAX_ATTEMPTS = 5
+# Retry after 1, 2, 4, 8 ... minutes.
+BACKOFF_SECONDS = 60
+# How long a worker owns the messages it claimed before another may retry them.
+LEASE_SECONDS = 300
+
+
+@dataclass
+class DeliveryReport:
+    sent: int = 0
+    retried: int = 0
+    failed: int = 0
+
+    def __add__(self, other):
+        return DeliveryReport(self.sent + other.sent, self.retried + other.retried, self.failed + other.failed)
+
+
+def enqueue(recipients: Iterable[str], subject, body, kind) -> int:
+    """Queue one message per distinct, non-empty recipient address."""
+    addresses = sorted({address.strip() for address in recipients if address and address.strip()})
+    OutboundEmail.objects.bulk_create(
+        [OutboundEmail(recipient=address, subject=subject, body=body, kind=kind) for address in addresses],
+        batch_size=500,
+    )
+    return len(addresses)
+
+
+def result_notification(result) -> OutboundEmail:
+    """Unsaved result email for ``result``; reads ``result.student.user``."""
+    student = result.student
+    subject = f"Exam Result: {result.exam.course_name}"
+    body = (
+        f"Hello {student.user.first_name},\n\n"
+        f"You have completed your attempt #{result.attempt_number} for {result.exam.course_name}.\n\n"
+        f"Summary:\n"
+        f"- Score: {result.marks}/{result.total_possible_marks}\n"
+        f"- Percentage: {result.percentage}%\n"
+        f"- Status: {'PASSED' if result.passed else 'FAILED'}\n"
+        f"- Tab Switches: {result.tab_switches}\n\n"
+        f"Login to the portal to view the full report.\n"
+        f"Regards,\nExam System"
+    )
+    return OutboundEmail(recipient=student.institutional_email, subject=subject, body=body, kind="result")
+
+
+def enqueue_results(results) -> int:
+    messages = [result_notification(result) for result in results if result.student.institutional_email]
+    OutboundEmail.objects.bulk_create(messages, batch_size=500)
+    return len(messages)
+
+
+def _claim(batch_size, now):
+    """Lease up to ``batch_size`` due messages to this worker in a short transaction.
+
+    Claimed rows are marked ``sending`` with ``next_attempt_at`` moved to the
+    end of the lease, so no row lock is held while the mail is sent and a
+    worker that dies mid-batch leaves rows another worker picks up once the
+    lease runs out.
+    """
+    lease_until = now + timedelta(seconds=LEASE_SECONDS)
+    with transaction.atomic():
+        due = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True)
+            .filter(status__in=("pending", "sending"), next_attempt_at__lte=now)
+            .order_by("next_attempt_at")
+            .values_list("pk", flat=True)[:batch_size]
+        )
+        if not due:
+            return []
+        # The conditional UPDATE also keeps two workers apart where
+        # skip_locked is not supported (SQLite).
+        OutboundEmail.objects.filter(
+            pk__in=due, status__in=("pending", "sending"), next_attempt_at__lte=now
+        ).update(status="sending", next_attempt_at=lease_until)
+        return list(
+            OutboundEmail.objects.filter(pk__in=due, status="sending", next_attempt_at=lease_until).order_by(
+                "next_attempt_at", "pk"
+            )
+        )
+
+
+def _digest(rows: List[OutboundEmail]):
+    if len(rows) == 1:
+        return rows[0].subject, rows[0].body
+    sections = [f"{row.subject}\n{'-' * len(row.subject)}\n{row.body}" for row in rows]
+    return f"You have {len(rows)} new notifications", "\n\n".join(sections)
+
+
+def _record_failure(rows, error, now):
+    for row in rows:
+        row.attempts += 1
+        row.last_error = str(error)[:2000]
+        if row.attempts >= MAX_ATTEMPTS:
+            row.status = "failed"
+        else:
+            row.status = "pending"
+            row.next_attempt_at = now + timedelta(seconds=BACKOFF_SECONDS * 2 ** (row.attempts - 1))
+    OutboundEmail.objects.bulk_update(rows, ["attempts", "last_error", "status", "next_attempt_at"])
+
+
+def deliver_batch(connection=None, batch_size=OUTBOX_BATCH_SIZE, digest=False) -> DeliveryReport:
+    """Send one batch of due messages over a single SMTP connection.
+
+    With ``digest`` the batch's messages for the same recipient are merged
+    into one email. A message that fails is retried with exponential
+    backoff and marked failed after ``MAX_ATTEMPTS``. Messages are leased in
+    one short transaction and the outcome recorded in another; no database
+    transaction is open while talking to the SMTP server.
+    """
+    now = timezone.now()
+    report = DeliveryReport()
+    rows = _claim(batch_size, now)
+    if not rows:
+        return report
+
+    if digest:
+        grouped = defaultdict(list)
+        for row in rows:
+            grouped[row.recipient].append(row)
+        groups = list(grouped.values())
+    else:
+        groups = [[row] for row in rows]
+
+    own_connection = connection is None
+    connection = connection or get_connection()
+    try:
+        connection.open()
+    except Exception as exc:
+        # Server unreachable: push the whole batch back with backoff.
+        _record_failure(rows, exc, now)
+        report.failed = sum(1 for row in rows if row.status == "failed")
+        report.retried = len(rows) - report.failed
+        return report
+
+    delivered, failures = [], []
+    try:
+        for group in groups:
+            subject, body = _digest(group)
+            message = EmailMessage(subject, body, settings.DEFAULT_FROM_EMAIL, [group[0].recipient], connection=connection)
+            try:
+                message.send()
+            except Exception as exc:
+                failures.append((group, exc))
+            else:
+                delivered.extend(row.pk for row in group)
+    finally:
+        if own_connection:
+            connection.close()
+
+    with transaction.atomic():
+        OutboundEmail.objects.filter(pk__in=delivered, status="sending").update(
+            status="sent", sent_at=timezone.now(), last_error=""
+        )
+        for group, exc in failures:
+            _record_failure(group, exc, now)
+    report.sent = len(delivered)
+    for group, _ in failures:
+        report.failed += sum(1 for row in group if row.status == "failed")
+        report.retried += sum(1 for row in group if row.status == "pending")
+    return report
@@ -0,0 +1,128 @@
+from datetime import datetime, timezone as dt_timezone
+from typing import List, Tuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import ExamSession, ProctorEvent
+
+
+EVENT_TYPES = {choice for choice, _label in ProctorEvent.EVENT_CHOICES}
+MAX_EVENTS_PER_BATCH = 50
+
+
+class ProctoringError(Exception):
+    pass
+
+
+def _rate_limit():
+    """(events, seconds) a single session may record before further events are dropped."""
+    return (
+        getattr(settings, "PROCTOR_RATE_LIMIT_EVENTS", 30),
+        getattr(settings, "PROCTOR_RATE_LIMIT_WINDOW", 60),
+    )
+
+
+def parse_client_events(raw_events, session) -> List[Tuple[str, datetime]]:
+    """Validate ``{"e": event_type, "t": epoch_ms}`` dicts, clamping times into the session."""
+    if not isinstance(raw_events, list):
+        raise ProctoringError("Events must be a list.")
+    if len(raw_events) > MAX_EVENTS_PER_BATCH:
+        raise ProctoringError(f"At most {MAX_EVENTS_PER_BATCH} events can be sent at once.")
+
+    now = timezone.now()
+    events = []
+    for raw in raw_events:
+        try:
+            event_type = raw["e"]
+            occurred_at = datetime.fromtimestamp(int(raw.get("t", 0)) / 1000, tz=dt_timezone.utc)
+        except (KeyError, TypeError, ValueError, OverflowError, OSError) as exc:
+            raise ProctoringError(f"Malformed proctoring event: {raw!r}") from exc
+        # An unhashable type (a list or dict) would make the set lookup raise TypeError.
+        if not isinstance(event_type, str) or event_type not in EVENT_TYPES:
+            raise ProctoringError(f"Unknown proctoring event '{event_type}'.")
+        if not session.started_at <= occurred_at <= now:
+            occurred_at = now
+        events.append((event_type, occurred_at))
+    return events
+
+
+def _rate_key(session_id):
+    limit, window = _rate_limit()
+    return f"proctor:rate:{session_id}:{int(timezone.now().timestamp()) // window}", limit, window
+
+
+def _admit(session_id, requested):
+    """How many of ``requested`` events fit in the session's current rate-limit window."""
+    key, limit, window = _rate_key(session_id)
+    cache.add(key, 0, timeout=window * 2)
+    try:
+        used = cache.incr(key, requested)
+    except ValueError:
+        cache.set(key, requested, timeout=window * 2)
+        used = requested
+    return max(0, min(requested, limit - (used - requested)))
+
+
+async def _aadmit(session_id, requested):
+    key, limit, window = _rate_key(session_id)
+    await cache.aadd(key, 0, timeout=window * 2)
+    try:
+        used = await cache.aincr(key, requested)
+    except ValueError:
+        await cache.aset(key, requested, timeout=window * 2)
+        used = requested
+    return max(0, min(requested, limit - (used - requested)))
+
+
+def _event_rows(session, events):
+    return [ProctorEvent(session=session, event_type=event_type, occurred_at=occurred_at) for event_type, occurred_at in events]
+
+
+def _counter_updates(events):
+    tab_switches = sum(1 for event_type, _ in events if event_type == "tab-switch")
+    return {
+        "tab_switch_count": F("tab_switch_count") + tab_switches,
+        "suspicious_event_count": F("suspicious_event_count") + (len(events) - tab_switches),
+    }
+
+
+def _store(session, events) -> int:
+    with transaction.atomic():
+        # Bump the counters first: the UPDATE matches nothing once grading has
+        # closed the session, and then no events are stored either.
+        if not ExamSession.objects.filter(pk=session.pk, is_completed=False).update(**_counter_updates(events)):
+            return 0
+        ProctorEvent.objects.bulk_create(_event_rows(session, events))
+    return len(events)
+
+
+def record_events(session, events: List[Tuple[str, datetime]]) -> int:
+    """Append a batch of events and bump the session counters in one transaction.
+
+    Returns how many events were accepted after rate limiting; none once the
+    session is completed.
+    """
+    events = events[:_admit(session.id, len(events))] if events else []
+    if not events:
+        return 0
+    return _store(session, events)
+
+
+async def arecord_events(session, events: List[Tuple[str, datetime]]) -> int:
+    """Async twin of :func:`record_events` for the ASGI proctoring endpoint."""
+    events = events[:await _aadmit(session.id, len(events))] if events else []
+    if not events:
+        return 0
+    # Django has no async transaction.atomic; run the write on one thread.
+    return await sync_to_async(_store)(session, events)
+
+
+def finalized_counts(session) -> Tuple[int, int]:
+    """Current (tab_switches, suspicious_activity_count) for grading."""
+    session.refresh_from_db(fields=["tab_switch_count", "suspicious_event_count"])
+    return session.tab_switch_count, session.suspicious_event_count
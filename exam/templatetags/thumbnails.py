@@ -0,0 +1,81 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html
+
+from exam.images import pick_thumbnail, variant_srcset
+
+
+register = template.Library()
+
+# Rendered width of a question image: full width below Bootstrap's lg
+# breakpoint, the exam canvas beside the navigation portal above it.
+QUESTION_IMAGE_SIZES = "(max-width: 991px) 100vw, 760px"
+
+
+@register.simple_tag
+def thumbnail_url(profile, size, extension="webp"):
+    """URL of the profile picture thumbnail best suited to ``size`` CSS pixels."""
+    path = pick_thumbnail(profile.profile_pic_variants, int(size), extension)
+    if path:
+        return default_storage.url(path)
+    return profile.profile_pic.url if profile.profile_pic else ""
+
+
+@register.simple_tag
+def avatar(profile, size, css_class="thumb-sm"):
+    """``<picture>`` for a ``size`` px avatar: WebP at 1x and 2x density with a JPEG fallback.
+
+    Pictures whose thumbnails are not built yet render the original upload.
+    """
+    size = int(size)
+    variants = profile.profile_pic_variants
+    if pick_thumbnail(variants, size, "webp") is None:
+        return format_html(
+            '<img class="{}" src="{}" alt="{}" width="{}" height="{}" loading="lazy" decoding="async" />',
+            css_class, thumbnail_url(profile, size), profile.get_name, size, size,
+        )
+    return format_html(
+        '<picture><source type="image/webp" srcset="{} 1x, {} 2x" />'
+        '<img class="{}" src="{}" srcset="{} 1x, {} 2x" alt="{}" width="{}" height="{}" loading="lazy" decoding="async" />'
+        "</picture>",
+        thumbnail_url(profile, size), thumbnail_url(profile, size * 2),
+        css_class,
+        thumbnail_url(profile, size, "jpeg"), thumbnail_url(profile, size, "jpeg"), thumbnail_url(profile, size * 2, "jpeg"),
+        profile.get_name, size, size,
+    )
+
+
+@register.simple_tag
+def question_image(question, current=False):
+    """Responsive ``<picture>`` for a question image.
+
+    Only the ``current`` question is fetched eagerly; the others load lazily
+    when the engine shows them or prefetches the next one.
+    """
+    variants = question.image_variants
+    loading, priority = ("eager", "high") if current else ("lazy", "auto")
+    if pick_thumbnail(variants, 0, "webp") is None:
+        return format_html(
+            '<img src="{}" alt="Question Context" loading="{}" fetchpriority="{}" decoding="async">',
+            question.image.url, loading, priority,
+        )
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" width="{}" height="{}" alt="Question Context" '
+        'loading="{}" fetchpriority="{}" decoding="async"></picture>',
+        variant_srcset(variants, "webp"), QUESTION_IMAGE_SIZES,
+        default_storage.url(pick_thumbnail(variants, 960, "jpeg")), variant_srcset(variants, "jpeg"), QUESTION_IMAGE_SIZES,
+        variants["width"], variants["height"], loading, priority,
+    )
+
+
+@register.simple_tag
+def question_image_preload(question):
+    """``<link rel="preload">`` so the browser finds the first image before the page body."""
+    variants = question.image_variants
+    if pick_thumbnail(variants, 0, "webp") is None:
+        return format_html('<link rel="preload" as="image" href="{}">', question.image.url)
+    return format_html(
+        '<link rel="preload" as="image" type="image/webp" imagesrcset="{}" imagesizes="{}">',
+        variant_srcset(variants, "webp"), QUESTION_IMAGE_SIZES,
+    )
@@ -1,10 +1,65 @@
+import io
+import json
+import os
+import pstats
+import re
+import sys
+import tempfile
+import threading
+import time
+from unittest import mock
+from contextlib import contextmanager
 from decimal import Decimal
 
+from asgiref.sync import sync_to_async
+from django.apps import apps as django_apps
+from django.conf import settings
 from django.contrib.auth.models import Group, User
-from django.test import TestCase
-from django.urls import reverse
-
-from exam.models import Course, Question, Result
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.template import Context, Template
+from django.db import OperationalError, connection, connections, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, get_resolver, reverse
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from PIL import Image
+
+from exam.admission import issue_ticket
+from exam.analytics import rebuild_result_rollups, rollup_breakdown
+from exam.archive import archive_sessions, iter_archived_sessions, semester_of
+from exam.attempts import AttemptLimitReached, open_session
+from exam.catalog import catalog_version
+from exam.clock import CLOCK_KEY, STUDENT_SESSION_KEY, remember_session
+from exam.collusion import detect_collusion, record_collusion_flags
+from exam.grading import grade_session, sweep_expired_sessions
+from exam.live import course_snapshot
+from exam.outbox import MAX_ATTEMPTS, deliver_batch, enqueue
+from exam.models import (
+    AttemptCounter,
+    CollusionFlag,
+    Course,
+    ExamSession,
+    OutboundEmail,
+    ProctorEvent,
+    Question,
+    Result,
+    ResultRollup,
+    SessionArchive,
+    SessionTimeline,
+    StudentAnswer,
+)
+from exam.proctoring import parse_client_events as parse_proctor_events, record_events
+from exam.timeline import EVENT_FORMAT, append_events, course_dwell_stats, decode_events, dwell_times
+from onlinexam import dbconnections
+from onlinexam import metrics as request_metrics
+from onlinexam import profiling, slowqueries
+from onlinexam.dbconnections import reset_stats
+from onlinexam.routers import PIN_COOKIE, ReplicaRouter
 from student.models import Student
 from teacher.models import Teacher
 
@@ -422,3 +477,2028 @@ class AdminManagementTests(TestCase):
         self.assertEqual(response.status_code, 302)
         self.assertEqual(response.url, reverse("admin-results"))
         self.assertEqual(Result.objects.count(), 0)
+
+
+class ResultRollupTests(TestCase):
+    def setUp(self):
+        self.admin_user = User.objects.create_user(
+            username="rollup_admin",
+            password="pass12345",
+            is_staff=True,
+        )
+        self.course = Course.objects.create(course_name="Thermodynamics", pass_mark=50)
+        self.students = []
+        for index, (department, level) in enumerate(
+            [("Mechanical Engineering", "200"), ("Mechanical Engineering", "200"), ("Civil Engineering", "300")]
+        ):
+            user = User.objects.create_user(username=f"rollup_student_{index}", password="pass12345")
+            self.students.append(
+                Student.objects.create(
+                    user=user,
+                    matric_number=f"UNN/2025/3000{index}",
+                    institutional_email=f"rollup{index}@unn.edu.ng",
+                    faculty="Faculty of Engineering",
+                    department=department,
+                    current_level=level,
+                    mobile="08031234567",
+                )
+            )
+
+    def _record(self, student, percentage, attempt_number=1):
+        return Result.objects.create(
+            student=student,
+            exam=self.course,
+            attempt_number=attempt_number,
+            percentage=Decimal(percentage),
+            passed=Decimal(percentage) >= self.course.pass_mark,
+        )
+
+    def test_result_writes_maintain_rollup_incrementally(self):
+        self._record(self.students[0], "80.00")
+        self._record(self.students[1], "40.00")
+        result = self._record(self.students[2], "60.00")
+
+        bucket = ResultRollup.objects.get(department="Mechanical Engineering", level="200")
+        self.assertEqual(bucket.attempts, 2)
+        self.assertEqual(bucket.passed, 1)
+        self.assertEqual(bucket.mean_percentage, Decimal("60.00"))
+        self.assertEqual(bucket.pass_rate, Decimal("50.00"))
+
+        result.delete()
+        self.assertEqual(ResultRollup.objects.get(department="Civil Engineering").attempts, 0)
+
+    def test_buckets_follow_the_result_not_the_students_current_profile(self):
+        result = self._record(self.students[0], "80.00")
+        Student.objects.filter(pk=self.students[0].pk).update(department="Civil Engineering", current_level="300")
+        result.refresh_from_db()
+
+        result.percentage = Decimal("40.00")
+        result.passed = False
+        result.save()
+
+        bucket = ResultRollup.objects.get(department="Mechanical Engineering", level="200")
+        self.assertEqual((bucket.attempts, bucket.passed, bucket.percentage_total), (1, 0, Decimal("40.00")))
+        self.assertFalse(ResultRollup.objects.filter(department="Civil Engineering").exists())
+
+        other_course = Course.objects.create(course_name="Statics", pass_mark=50)
+        result.exam = other_course
+        result.save()
+        self.assertEqual(ResultRollup.objects.get(course=self.course).attempts, 0)
+        self.assertEqual(ResultRollup.objects.get(course=other_course).attempts, 1)
+
+        result.delete()
+        self.assertEqual(ResultRollup.objects.get(course=other_course).attempts, 0)
+        self.assertFalse(ResultRollup.objects.filter(department="Civil Engineering").exists())
+
+    def test_migration_stamps_existing_results_with_the_students_profile(self):
+        stamp_existing_results = import_string("exam.migrations.0022_result_rollup_bucket.stamp_existing_results")
+        result = self._record(self.students[2], "60.00")
+        Result.objects.filter(pk=result.pk).update(faculty="", department="", level="")
+
+        stamp_existing_results(django_apps, None)
+
+        result.refresh_from_db()
+        self.assertEqual(
+            (result.faculty, result.department, result.level), ("Faculty of Engineering", "Civil Engineering", "300")
+        )
+
+    def test_rebuild_matches_incremental_totals_and_groups_by_faculty(self):
+        self._record(self.students[0], "80.00")
+        self._record(self.students[0], "70.00", attempt_number=2)
+        self._record(self.students[2], "30.00")
+        incremental = rollup_breakdown()
+
+        rebuild_result_rollups()
+
+        self.assertEqual(rollup_breakdown(), incremental)
+        by_faculty = rollup_breakdown(group_by=["faculty"])
+        self.assertEqual(len(by_faculty), 1)
+        self.assertEqual(by_faculty[0]["attempts"], 3)
+        self.assertEqual(by_faculty[0]["mean_percentage"], Decimal("60.00"))
+
+    def test_admin_can_filter_and_export_analytics(self):
+        self._record(self.students[0], "80.00")
+        self._record(self.students[2], "30.00")
+        self.client.force_login(self.admin_user)
+
+        page = self.client.get(reverse("admin-analytics"), {"department": "Civil Engineering"})
+        export = self.client.get(reverse("admin-export-analytics-csv"), {"group": ["department"]})
+
+        self.assertEqual(page.status_code, 200)
+        self.assertEqual(page.context["total_attempts"], 1)
+        self.assertEqual(export.status_code, 200)
+        content = export.content.decode("utf-8")
+        self.assertIn("Department,Attempts,Passed,Mean Percentage,Pass Rate", content)
+        self.assertIn("Mechanical Engineering,1,1,80.00,100.00", content)
+
+    def test_analytics_ignore_a_course_that_is_not_an_id(self):
+        self._record(self.students[0], "80.00")
+        self.client.force_login(self.admin_user)
+
+        page = self.client.get(reverse("admin-analytics"), {"course": "abc"})
+        export = self.client.get(reverse("admin-export-analytics-csv"), {"course": "1 OR 1=1"})
+
+        self.assertEqual(page.status_code, 200)
+        self.assertEqual(page.context["total_attempts"], 1)
+        self.assertEqual(export.status_code, 200)
+
+
+class CollusionDetectionTests(TestCase):
+    def setUp(self):
+        self.course = Course.objects.create(course_name="Fluid Mechanics")
+        self.questions = [
+            Question.objects.create(
+                course=self.course,
+                question=f"Question {index}",
+                option1="A",
+                option2="B",
+                option3="C",
+                option4="D",
+                answer="Option1",
+            )
+            for index in range(6)
+        ]
+        self.sessions = [self._completed_session(index) for index in range(4)]
+
+    def _completed_session(self, index):
+        user = User.objects.create_user(username=f"hall_candidate_{index}", password="pass12345")
+        student = Student.objects.create(
+            user=user,
+            matric_number=f"UNN/2025/4000{index}",
+            institutional_email=f"hall{index}@unn.edu.ng",
+            mobile="08031234567",
+        )
+        return ExamSession.objects.create(student=student, course=self.course, is_completed=True)
+
+    def _answer(self, session, options):
+        for question, option in zip(self.questions, options):
+            StudentAnswer.objects.create(
+                session=session,
+                question=question,
+                selected_option=option,
+                is_correct=question.is_correct_answer(option),
+            )
+
+    def _seed_answers(self):
+        self._answer(self.sessions[0], ["2", "3", "4", "2", "1", "3"])
+        self._answer(self.sessions[1], ["2", "3", "4", "2", "1", "4"])
+        self._answer(self.sessions[2], ["1", "2", "2", "3", "4", "1"])
+        self._answer(self.sessions[3], ["1", "1", "1", "1", "1", "1"])
+
+    def test_shared_wrong_answers_flag_only_the_copying_pair(self):
+        self._seed_answers()
+
+        pairs = detect_collusion(self.course, min_shared=3, min_similarity=0.6)
+
+        self.assertEqual(len(pairs), 1)
+        flagged = {pairs[0].first.session_id, pairs[0].second.session_id}
+        self.assertEqual(flagged, {self.sessions[0].id, self.sessions[1].id})
+        self.assertEqual(pairs[0].shared_wrong, 4)
+
+    def test_lsh_bucketing_finds_identical_patterns(self):
+        self._seed_answers()
+
+        pairs = detect_collusion(self.course, min_shared=3, min_similarity=0.6, exact_limit=0)
+
+        self.assertEqual(len(pairs), 1)
+        self.assertEqual(pairs[0].shared_wrong, 4)
+
+    def test_flags_replace_previous_report_for_course(self):
+        self._seed_answers()
+        record_collusion_flags(self.course, detect_collusion(self.course))
+        record_collusion_flags(self.course, detect_collusion(self.course))
+
+        self.assertEqual(CollusionFlag.objects.filter(course=self.course).count(), 1)
+
+    def test_report_ignores_a_course_that_is_not_an_id(self):
+        self._seed_answers()
+        record_collusion_flags(self.course, detect_collusion(self.course))
+        admin_user = User.objects.create_user(username="collusion_admin", password="pass12345", is_staff=True)
+        self.client.force_login(admin_user)
+
+        page = self.client.get(reverse("admin-collusion-report"), {"course": "abc"})
+
+        self.assertEqual(page.status_code, 200)
+        self.assertEqual(page.context["selected_course"], "")
+        self.assertEqual(len(page.context["flags"]), 1)
+
+
+class TimeOnTaskTimelineTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="timeline_student", password="pass12345")
+        Group.objects.get_or_create(name="STUDENT")[0].user_set.add(self.user)
+        student = Student.objects.create(
+            user=self.user,
+            matric_number="UNN/2025/50001",
+            institutional_email="timeline@unn.edu.ng",
+            mobile="08031234567",
+        )
+        self.course = Course.objects.create(course_name="Statics")
+        self.q1 = Question.objects.create(course=self.course, question="First", answer="Option1")
+        self.q2 = Question.objects.create(course=self.course, question="Second", answer="Option1")
+        self.session = ExamSession.objects.create(student=student, course=self.course)
+
+    def _post(self, events):
+        return self.client.post(
+            reverse("timeline-events-htmx"),
+            {"session_id": self.session.id, "events": json.dumps(events)},
+        )
+
+    def test_batches_append_packed_deltas_and_yield_dwell_times(self):
+        self.client.force_login(self.user)
+        base = 1_700_000_000_000
+
+        first = self._post([
+            {"t": base, "q": self.q1.id, "k": "enter"},
+            {"t": base + 12_000, "q": self.q1.id, "k": "answer"},
+        ])
+        second = self._post([
+            {"t": base + 15_000, "q": self.q2.id, "k": "enter"},
+            {"t": base + 45_000, "q": self.q2.id, "k": "answer"},
+        ])
+
+        self.assertEqual(first.status_code, 204)
+        self.assertEqual(second.status_code, 204)
+        timeline = SessionTimeline.objects.get(session=self.session)
+        self.assertEqual(timeline.event_count, 4)
+        self.assertEqual(len(bytes(timeline.events)), 4 * EVENT_FORMAT.size)
+
+        decoded = decode_events(timeline)
+        self.assertEqual(decoded[-1], (base + 45_000, self.q2.id, "answer"))
+        self.assertEqual(dwell_times(decoded), {self.q1.id: 15_000, self.q2.id: 30_000})
+        self.assertEqual(course_dwell_stats(self.course)[self.q2.id]["mean_seconds"], 30.0)
+
+    def test_question_page_reads_cached_dwell_stats_until_a_session_is_graded(self):
+        cache.clear()
+        base = 1_700_000_000_000
+        append_events(self.session, [(base, self.q1.id, 0), (base + 8_000, self.q2.id, 0)])
+        admin = User.objects.create_user(username="dwell_admin", password="pass12345", is_staff=True)
+        self.client.force_login(admin)
+        url = reverse("view-question", args=[self.course.id])
+
+        with mock.patch("exam.timeline.course_dwell_stats", wraps=course_dwell_stats) as scan:
+            first = self.client.get(url)
+            self.client.get(url)
+            self.assertEqual(scan.call_count, 1)
+
+            grade_session(self.session)
+            self.client.get(url)
+            self.assertEqual(scan.call_count, 2)
+
+        self.assertEqual(first.context["questions"][0].dwell["mean_seconds"], 8.0)
+
+    def test_malformed_batch_is_rejected(self):
+        self.client.force_login(self.user)
+
+        response = self._post([{"t": "soon", "q": self.q1.id, "k": "enter"}])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(SessionTimeline.objects.exists())
+
+    def test_out_of_range_or_foreign_questions_are_rejected(self):
+        self.client.force_login(self.user)
+        other = Question.objects.create(course=Course.objects.create(course_name="Dynamics"), question="Other")
+
+        for question_id in (-1, 2 ** 32, other.id):
+            with self.subTest(question_id=question_id):
+                response = self._post([{"t": 1_700_000_000_000, "q": question_id, "k": "enter"}])
+                self.assertEqual(response.status_code, 400)
+        self.assertEqual(self._post([{"t": -5, "q": self.q1.id, "k": "enter"}]).status_code, 400)
+        self.assertFalse(SessionTimeline.objects.exists())
+
+    def test_completed_sessions_take_no_more_events(self):
+        self.client.force_login(self.user)
+        ExamSession.objects.filter(pk=self.session.pk).update(is_completed=True)
+
+        response = self._post([{"t": 1_700_000_000_000, "q": self.q1.id, "k": "enter"}])
+
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(SessionTimeline.objects.exists())
+
+
+class ProctoringPipelineTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="proctored_student", password="pass12345")
+        Group.objects.get_or_create(name="STUDENT")[0].user_set.add(self.user)
+        self.student = Student.objects.create(
+            user=self.user,
+            matric_number="UNN/2025/60001",
+            institutional_email="proctored@unn.edu.ng",
+            mobile="08031234567",
+        )
+        self.course = Course.objects.create(course_name="Ethics", enable_proctoring=True)
+        Question.objects.create(course=self.course, question="Is honesty required?", answer="Option1")
+        self.session = ExamSession.objects.create(student=self.student, course=self.course)
+        self.client.force_login(self.user)
+
+    def _post_batch(self, *event_types):
+        now_ms = int(self.session.started_at.timestamp() * 1000) + 1000
+        events = [{"e": event_type, "t": now_ms} for event_type in event_types]
+        return self.client.post(
+            reverse("proctor-event-htmx"),
+            {"session_id": self.session.id, "events": json.dumps(events)},
+        )
+
+    def test_batch_appends_events_and_bumps_session_counters(self):
+        response = self._post_batch("tab-switch", "tab-switch", "paste")
+        single = self.client.post(reverse("proctor-event-htmx"), {"session_id": self.session.id, "event": "tab-switch"})
+
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(single.status_code, 204)
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.tab_switch_count, 3)
+        self.assertEqual(self.session.suspicious_event_count, 1)
+        self.assertEqual(ProctorEvent.objects.filter(session=self.session).count(), 4)
+
+    @override_settings(PROCTOR_RATE_LIMIT_EVENTS=2)
+    def test_events_beyond_rate_limit_are_dropped(self):
+        self._post_batch("tab-switch", "copy", "paste")
+        self._post_batch("tab-switch")
+
+        self.session.refresh_from_db()
+        self.assertEqual(ProctorEvent.objects.filter(session=self.session).count(), 2)
+        self.assertEqual(self.session.tab_switch_count, 1)
+
+    def test_events_for_a_completed_session_are_refused(self):
+        ExamSession.objects.filter(pk=self.session.pk).update(is_completed=True)
+
+        response = self._post_batch("tab-switch", "copy")
+
+        self.assertEqual(response.status_code, 409)
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.tab_switch_count, 0)
+        self.assertFalse(ProctorEvent.objects.exists())
+
+    def test_events_racing_the_grader_are_not_stored(self):
+        events = parse_proctor_events([{"e": "tab-switch", "t": 0}], self.session)
+        ExamSession.objects.filter(pk=self.session.pk).update(is_completed=True)
+
+        self.assertEqual(record_events(self.session, events), 0)
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.tab_switch_count, 0)
+        self.assertFalse(ProctorEvent.objects.exists())
+
+    def test_unknown_event_is_rejected(self):
+        response = self._post_batch("screenshot")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(ProctorEvent.objects.exists())
+
+    def test_event_type_that_is_not_a_string_is_rejected(self):
+        response = self._post_batch("tab-switch", ["copy"], {"e": "paste"})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(ProctorEvent.objects.exists())
+
+    def test_grading_copies_finalized_counts_into_result(self):
+        self._post_batch("tab-switch", "tab-switch", "copy")
+
+        self.client.post(reverse("calculate-marks"), {"course_id": self.course.id})
+
+        result = Result.objects.get(student=self.student, exam=self.course)
+        self.assertEqual(result.tab_switches, 2)
+        self.assertEqual(result.suspicious_activity_count, 1)
+
+
+# The shared-cache deployment; without it the monitor counts answers in the database.
+@override_settings(LIVE_MONITOR_CACHE=True)
+class LiveMonitorTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin_user = User.objects.create_user(username="invigilator", password="pass12345", is_staff=True)
+        self.user = User.objects.create_user(
+            username="live_student", first_name="Ngozi", last_name="Eze", password="pass12345"
+        )
+        Group.objects.get_or_create(name="STUDENT")[0].user_set.add(self.user)
+        student = Student.objects.create(
+            user=self.user,
+            matric_number="UNN/2025/70001",
+            institutional_email="live@unn.edu.ng",
+            mobile="08031234567",
+        )
+        self.course = Course.objects.create(course_name="Circuits", duration_minutes=30)
+        self.questions = [
+            Question.objects.create(course=self.course, question=f"Q{index}", answer="Option1") for index in range(3)
+        ]
+        self.session = ExamSession.objects.create(student=student, course=self.course)
+
+    def test_answers_are_counted_once_per_question_in_cache(self):
+        self.client.force_login(self.user)
+        for option in ("1", "2"):
+            self.client.post(
+                reverse("submit-answer-htmx"),
+                {"session_id": self.session.id, "question_id": self.questions[0].id, "option": option},
+            )
+        self.client.post(
+            reverse("submit-answer-htmx"),
+            {"session_id": self.session.id, "question_id": self.questions[1].id, "option": "1"},
+        )
+
+        with self.assertNumQueries(1):
+            snapshot = course_snapshot(self.course)
+
+        self.assertEqual(snapshot["active"], 1)
+        self.assertEqual(snapshot["candidates"][0]["answered"], 2)
+        self.assertEqual(snapshot["candidates"][0]["name"], "Ngozi Eze")
+
+    def test_missing_counters_are_seeded_from_database(self):
+        StudentAnswer.objects.create(session=self.session, question=self.questions[2], selected_option="1")
+
+        snapshot = course_snapshot(self.course)
+
+        self.assertEqual(snapshot["candidates"][0]["answered"], 1)
+
+    @override_settings(LIVE_MONITOR_CACHE=False)
+    def test_without_a_shared_cache_counts_come_from_the_database(self):
+        StudentAnswer.objects.create(session=self.session, question=self.questions[0], selected_option="1")
+        # Another worker's stale counter must not be shown.
+        cache.set(f"live:answered:{self.session.id}", 3)
+
+        snapshot = course_snapshot(self.course)
+
+        self.assertEqual(snapshot["candidates"][0]["answered"], 1)
+
+    @override_settings(LIVE_MONITOR_INTERVAL=0, LIVE_MONITOR_MAX_TICKS=2)
+    async def test_admin_stream_emits_server_sent_snapshots(self):
+        await sync_to_async(self.async_client.force_login)(self.admin_user)
+
+        page = await self.async_client.get(reverse("admin-live-monitor", args=[self.course.id]))
+        response = await self.async_client.get(reverse("admin-live-monitor-stream", args=[self.course.id]))
+        body = b"".join([chunk async for chunk in response.streaming_content]).decode("utf-8")
+
+        self.assertContains(page, reverse("admin-live-monitor-stream", args=[self.course.id]))
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        self.assertEqual(body.count("event: snapshot"), 2)
+        payload = json.loads(body.split("data: ", 1)[1].split("\n", 1)[0])
+        self.assertEqual(payload["candidates"][0]["session"], self.session.id)
+
+    @override_settings(LIVE_MONITOR_INTERVAL=3600, LIVE_MONITOR_MAX_TICKS=2)
+    def test_wsgi_stream_sends_the_first_snapshot_without_waiting(self):
+        self.client.force_login(self.admin_user)
+
+        response = self.client.get(reverse("admin-live-monitor-stream", args=[self.course.id]))
+        chunks = iter(response.streaming_content)
+
+        self.assertFalse(response.is_async)
+        self.assertEqual(next(chunks), b"retry: 3600000\n\n")
+        self.assertIn(f'"session": {self.session.id}'.encode(), next(chunks))
+
+    async def test_autosave_runs_as_async_view(self):
+        await sync_to_async(self.async_client.force_login)(self.user)
+
+        response = await self.async_client.post(
+            reverse("submit-answer-htmx"),
+            {"session_id": self.session.id, "question_id": self.questions[0].id, "option": "1"},
+        )
+        missing = await self.async_client.post(
+            reverse("submit-answer-htmx"),
+            {"session_id": self.session.id + 100, "question_id": self.questions[0].id, "option": "1"},
+        )
+
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(missing.status_code, 404)
+        answer = await StudentAnswer.objects.aget(session=self.session, question=self.questions[0])
+        self.assertTrue(answer.is_correct)
+        self.assertEqual(await cache.aget(f"live:answered:{self.session.id}"), 1)
+
+    async def test_async_views_redirect_anonymous_users_to_login(self):
+        response = await self.async_client.post(reverse("proctor-event-htmx"), {"session_id": self.session.id})
+
+        self.assertEqual(response.status_code, 302)
+        self.assertIn("login", response.url)
+
+
+class AsgiEntrypointTests(TestCase):
+    def test_asgi_middleware_stack_is_fully_async_capable(self):
+        for path in settings.MIDDLEWARE:
+            with self.subTest(middleware=path):
+                self.assertTrue(getattr(import_string(path), "async_capable", False))
+
+    async def test_static_files_are_served_under_asgi(self):
+        response = await self.async_client.get("/static/css/app.css")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/css; charset=\"utf-8\"")
+
+
+def _attempt_fixture(username, matric_number, max_attempts=2):
+    user = User.objects.create_user(username=username, password="pass12345")
+    Group.objects.get_or_create(name="STUDENT")[0].user_set.add(user)
+    student = Student.objects.create(
+        user=user,
+        matric_number=matric_number,
+        institutional_email=f"{username}@unn.edu.ng",
+        mobile="08031234567",
+    )
+    course = Course.objects.create(course_name="Statics", max_attempts=max_attempts, question_number=2, total_marks=10)
+    questions = [
+        Question.objects.create(course=course, question=f"Q{index}", marks=5, answer="Option1") for index in range(2)
+    ]
+    return user, student, course, questions
+
+
+class AttemptAllocationTests(TestCase):
+    def setUp(self):
+        self.user, self.student, self.course, self.questions = _attempt_fixture("attempt_student", "UNN/2025/80001")
+
+    def test_open_session_resumes_until_graded_then_issues_next_attempt(self):
+        first, created = open_session(self.student, self.course)
+        resumed, resumed_created = open_session(self.student, self.course)
+        grade_session(first)
+        second, _ = open_session(self.student, self.course)
+        grade_session(second)
+
+        self.assertTrue(created)
+        self.assertFalse(resumed_created)
+        self.assertEqual(resumed.pk, first.pk)
+        self.assertEqual(second.attempt_number, 2)
+        self.assertEqual(ExamSession.objects.filter(student=self.student, is_completed=True).count(), 2)
+        with self.assertRaises(AttemptLimitReached):
+            open_session(self.student, self.course)
+
+    def test_counter_starts_after_legacy_results(self):
+        Result.objects.create(student=self.student, exam=self.course, marks=0, attempt_number=1)
+
+        session, _ = open_session(self.student, self.course)
+
+        self.assertEqual(session.attempt_number, 2)
+        self.assertEqual(AttemptCounter.objects.get(student=self.student, course=self.course).issued, 2)
+
+    def test_migration_numbers_open_legacy_sessions_after_existing_results(self):
+        number_existing_sessions = import_string("exam.migrations.0016_attempt_allocator.number_existing_sessions")
+        for attempt_number in (1, 2):
+            Result.objects.create(student=self.student, exam=self.course, marks=0, attempt_number=attempt_number)
+        session = ExamSession.objects.create(student=self.student, course=self.course)
+
+        number_existing_sessions(django_apps, None)
+
+        session.refresh_from_db()
+        self.assertEqual(session.attempt_number, 3)
+        self.assertTrue(grade_session(session)[1])
+
+    def test_repeated_grading_returns_the_same_result(self):
+        session, _ = open_session(self.student, self.course)
+        StudentAnswer.objects.create(session=session, question=self.questions[0], selected_option="1", is_correct=True)
+
+        first, first_created = grade_session(session)
+        again, again_created = grade_session(session)
+
+        self.assertTrue(first_created)
+        self.assertFalse(again_created)
+        self.assertEqual(first.pk, again.pk)
+        self.assertEqual(first.marks, Decimal("5.00"))
+        self.assertEqual(first.percentage, Decimal("50.00"))
+
+    def test_double_submit_through_view_creates_one_result(self):
+        open_session(self.student, self.course)
+        self.client.force_login(self.user)
+
+        for _ in range(2):
+            response = self.client.post(reverse("calculate-marks", args=[self.course.id]))
+
+        self.assertRedirects(response, reverse("check-marks", args=[self.course.id]), fetch_redirect_response=False)
+        self.assertEqual(Result.objects.filter(student=self.student, exam=self.course).count(), 1)
+
+    def test_deleted_result_is_not_recreated_by_resubmitting(self):
+        session, _ = open_session(self.student, self.course)
+        result, _ = grade_session(session)
+        result.delete()
+        self.client.force_login(self.user)
+
+        response = self.client.get(reverse("calculate-marks", args=[self.course.id]))
+
+        self.assertRedirects(response, reverse("check-marks", args=[self.course.id]), fetch_redirect_response=False)
+        self.assertEqual(grade_session(session), (None, False))
+        self.assertFalse(Result.objects.filter(student=self.student, exam=self.course).exists())
+
+    def test_exam_engine_page_renders_with_submit_url(self):
+        self.client.force_login(self.user)
+
+        response = self.client.get(reverse("take-exam", args=[self.course.id]))
+
+        self.assertContains(response, reverse("calculate-marks", args=[self.course.id]))
+        self.assertEqual(ExamSession.objects.get(student=self.student).attempt_number, 1)
+
+
+class AttemptConcurrencyTests(TransactionTestCase):
+    def _run_in_threads(self, target, count=8):
+        barrier = threading.Barrier(count)
+        errors = []
+
+        def worker():
+            try:
+                barrier.wait()
+                target()
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return errors
+
+    def test_concurrent_starts_share_one_session(self):
+        _, student, course, _ = _attempt_fixture("racing_student", "UNN/2025/80002")
+
+        errors = self._run_in_threads(lambda: open_session(student, course))
+
+        self.assertEqual(errors, [])
+        self.assertEqual(ExamSession.objects.filter(student=student, course=course).count(), 1)
+
+    def test_concurrent_submits_write_one_result(self):
+        _, student, course, _ = _attempt_fixture("double_submit", "UNN/2025/80003")
+        session, _ = open_session(student, course)
+
+        errors = self._run_in_threads(lambda: grade_session(session))
+
+        self.assertEqual(errors, [])
+        self.assertEqual(Result.objects.filter(student=student, exam=course).count(), 1)
+
+
+# Batch select, tally, graded check, result insert, outbox insert, close, the
+# atomic savepoint pair, and five for a rollup bucket created on first use.
+QUERIES_PER_SWEEP = 13
+
+
+class ExpiredSessionSweepTests(TestCase):
+    def setUp(self):
+        _, self.student, self.course, self.questions = _attempt_fixture("sweep_student", "UNN/2025/80010")
+        self.expired, _ = open_session(self.student, self.course)
+        ExamSession.objects.filter(pk=self.expired.pk).update(end_time=timezone.now() - timezone.timedelta(minutes=1))
+        StudentAnswer.objects.create(session=self.expired, question=self.questions[0], selected_option="1", is_correct=True)
+        StudentAnswer.objects.create(session=self.expired, question=self.questions[1], selected_option="2", is_correct=False)
+
+        _, other, _, _ = _attempt_fixture("sweep_active", "UNN/2025/80011")
+        self.active = ExamSession.objects.create(student=other, course=self.course)
+
+    def test_sweep_grades_only_expired_sessions(self):
+        swept = sweep_expired_sessions()
+
+        self.expired.refresh_from_db()
+        self.active.refresh_from_db()
+        result = Result.objects.get(student=self.student, exam=self.course)
+        self.assertEqual(swept, 1)
+        self.assertTrue(self.expired.is_completed)
+        self.assertFalse(self.active.is_completed)
+        self.assertEqual((result.correct_answers, result.wrong_answers), (1, 1))
+        self.assertEqual(result.marks, Decimal("5.00"))
+        self.assertEqual(ResultRollup.objects.get(course=self.course).attempts, 1)
+
+    def test_sweep_does_not_duplicate_existing_result(self):
+        grade_session(self.expired)
+        ExamSession.objects.filter(pk=self.expired.pk).update(is_completed=False)
+
+        sweep_expired_sessions()
+
+        self.assertEqual(Result.objects.filter(student=self.student, exam=self.course).count(), 1)
+
+    def test_batch_query_count_does_not_grow_with_batch(self):
+        for index in range(5):
+            _, student, _, _ = _attempt_fixture(f"sweep_bulk_{index}", f"UNN/2025/8002{index}")
+            session = ExamSession.objects.create(student=student, course=self.course)
+            ExamSession.objects.filter(pk=session.pk).update(end_time=timezone.now() - timezone.timedelta(minutes=1))
+
+        with self.assertNumQueries(QUERIES_PER_SWEEP):
+            swept = sweep_expired_sessions()
+
+        self.assertEqual(swept, 6)
+        self.assertEqual(ResultRollup.objects.get(course=self.course).attempts, 6)
+
+    def test_command_drains_backlog_in_batches(self):
+        output = io.StringIO()
+
+        call_command("sweep_expired_sessions", "--batch-size", "1", "--pause", "0", stdout=output)
+
+        self.assertIn("Swept 1 expired sessions.", output.getvalue())
+        self.assertFalse(ExamSession.objects.filter(pk=self.expired.pk, is_completed=False).exists())
+
+
+# The shared-cache deployment; without it the clock reads the session row.
+@override_settings(EXAM_CLOCK_CACHE=True)
+class ExamClockTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user, self.student, self.course, self.questions = _attempt_fixture("clock_student", "UNN/2025/80030")
+        self.client.force_login(self.user)
+        self.client.get(reverse("take-exam", args=[self.course.id]))
+        self.session = ExamSession.objects.get(student=self.student, course=self.course)
+
+    def _autosave(self):
+        return self.client.post(
+            reverse("submit-answer-htmx"),
+            {"session_id": self.session.id, "question_id": self.questions[0].id, "option": "1"},
+        )
+
+    def test_clock_reads_deadline_from_cache(self):
+        # Only the request's session row is read; the clock record comes from the cache.
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("exam-clock", args=[self.session.id]))
+
+        clock = response.json()
+        self.assertEqual(clock["ends_at"], int(self.session.end_time.timestamp() * 1000))
+        self.assertGreater(clock["remaining"], 0)
+        self.assertFalse(clock["completed"])
+        self.assertEqual(response["Cache-Control"], "no-store")
+
+    def test_clock_is_private_to_the_session_owner(self):
+        _, other, _, _ = _attempt_fixture("clock_other", "UNN/2025/80031")
+        self.client.force_login(other.user)
+
+        response = self.client.get(reverse("exam-clock", args=[self.session.id]))
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_autosave_is_refused_after_the_deadline(self):
+        ExamSession.objects.filter(pk=self.session.pk).update(end_time=timezone.now() - timezone.timedelta(minutes=1))
+        cache.clear()
+
+        response = self._autosave()
+
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(StudentAnswer.objects.filter(session=self.session).exists())
+
+    def test_autosave_is_refused_once_the_session_is_graded(self):
+        self.assertEqual(self._autosave().status_code, 204)
+
+        grade_session(self.session)
+
+        self.assertEqual(self._autosave().status_code, 409)
+        self.assertTrue(self.client.get(reverse("exam-clock", args=[self.session.id])).json()["completed"])
+
+    @override_settings(EXAM_CLOCK_CACHE=False)
+    def test_without_a_shared_cache_the_clock_reads_only_the_session_row(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse("exam-clock", args=[self.session.id]))
+
+        self.assertEqual(response.status_code, 200)
+        # The login session, then the exam session by primary key.
+        self.assertEqual(len(context.captured_queries), 2)
+        self.assertNotIn("JOIN", context.captured_queries[-1]["sql"])
+
+    def test_a_login_without_the_student_id_looks_it_up_once(self):
+        login = self.client.session
+        del login[STUDENT_SESSION_KEY]
+        login.save()
+
+        self.assertEqual(self.client.get(reverse("exam-clock", args=[self.session.id])).status_code, 200)
+        self.assertEqual(self.client.session[STUDENT_SESSION_KEY], self.student.pk)
+        with self.assertNumQueries(1):
+            self.client.get(reverse("exam-clock", args=[self.session.id]))
+
+    @override_settings(EXAM_CLOCK_CACHE=False)
+    def test_without_a_shared_cache_autosave_sees_grading_by_another_worker(self):
+        self.assertEqual(self._autosave().status_code, 204)
+        # Another worker graded the session and cleared only its own cache.
+        cache.set(CLOCK_KEY.format(session_id=self.session.pk), {"end": 4e9, "done": False, "owner": self.student.pk})
+        ExamSession.objects.filter(pk=self.session.pk).update(is_completed=True)
+
+        self.assertEqual(self._autosave().status_code, 409)
+
+
+class _FlakyConnection:
+    """Email connection that fails for chosen recipients."""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.opened = 0
+        self.sent = []
+
+    def open(self):
+        self.opened += 1
+
+    def close(self):
+        pass
+
+    def send_messages(self, messages):
+        for message in messages:
+            if set(message.to) & self.failing:
+                raise OSError("mailbox unavailable")
+            self.sent.append(message)
+        return len(messages)
+
+
+class OutboxTests(TestCase):
+    def test_batch_is_sent_over_one_connection_one_message_per_recipient(self):
+        enqueue(["a@unn.edu.ng", "b@unn.edu.ng", "a@unn.edu.ng", ""], "New exam", "Body", kind="new-exam")
+
+        report = deliver_batch()
+
+        self.assertEqual(report.sent, 2)
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), ["a@unn.edu.ng", "b@unn.edu.ng"])
+        self.assertFalse(OutboundEmail.objects.filter(status="pending").exists())
+
+    def test_failed_message_backs_off_then_gives_up(self):
+        enqueue(["ok@unn.edu.ng", "bad@unn.edu.ng"], "New exam", "Body", kind="new-exam")
+        connection = _FlakyConnection(failing={"bad@unn.edu.ng"})
+
+        report = deliver_batch(connection)
+
+        bad = OutboundEmail.objects.get(recipient="bad@unn.edu.ng")
+        self.assertEqual((report.sent, report.retried), (1, 1))
+        self.assertEqual(connection.opened, 1)
+        self.assertEqual(bad.status, "pending")
+        self.assertGreater(bad.next_attempt_at, timezone.now())
+
+        OutboundEmail.objects.filter(pk=bad.pk).update(attempts=MAX_ATTEMPTS - 1, next_attempt_at=timezone.now())
+        deliver_batch(connection)
+        bad.refresh_from_db()
+        self.assertEqual(bad.status, "failed")
+        self.assertIn("mailbox unavailable", bad.last_error)
+
+    def test_messages_are_sent_outside_a_transaction(self):
+        enqueue(["a@unn.edu.ng"], "New exam", "Body", kind="new-exam")
+        depth_while_sending = []
+
+        class _WatchingConnection(_FlakyConnection):
+            def send_messages(self, messages):
+                depth_while_sending.append(len(connection.savepoint_ids))
+                return super().send_messages(messages)
+
+        # TestCase's own atomic blocks are the baseline depth.
+        deliver_batch(_WatchingConnection())
+
+        self.assertEqual(depth_while_sending, [len(connection.savepoint_ids)])
+        self.assertEqual(OutboundEmail.objects.get().status, "sent")
+
+    def test_leased_messages_wait_for_the_lease_to_run_out(self):
+        enqueue(["a@unn.edu.ng"], "New exam", "Body", kind="new-exam")
+        # A worker claimed the message and died before recording the outcome.
+        OutboundEmail.objects.update(status="sending", next_attempt_at=timezone.now() + timezone.timedelta(minutes=5))
+
+        self.assertEqual(deliver_batch().sent, 0)
+
+        OutboundEmail.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(deliver_batch().sent, 1)
+        self.assertEqual(OutboundEmail.objects.get().status, "sent")
+
+    def test_digest_merges_messages_for_the_same_recipient(self):
+        enqueue(["a@unn.edu.ng"], "New exam: Physics", "Physics body", kind="new-exam")
+        enqueue(["a@unn.edu.ng"], "New exam: Chemistry", "Chemistry body", kind="new-exam")
+
+        deliver_batch(digest=True)
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn("Physics body", mail.outbox[0].body)
+        self.assertIn("Chemistry body", mail.outbox[0].body)
+        self.assertEqual(OutboundEmail.objects.filter(status="sent").count(), 2)
+
+    def test_grading_queues_result_email_instead_of_sending(self):
+        _, student, course, _ = _attempt_fixture("mailed_student", "UNN/2025/80040")
+        session, _ = open_session(student, course)
+
+        grade_session(session)
+        grade_session(session)
+
+        self.assertEqual(len(mail.outbox), 0)
+        queued = OutboundEmail.objects.get(kind="result")
+        self.assertEqual(queued.recipient, "mailed_student@unn.edu.ng")
+        self.assertIn("attempt #1", queued.body)
+
+        call_command("send_outbox", stdout=io.StringIO())
+        self.assertEqual(len(mail.outbox), 1)
+
+
+class ConnectionManagementTests(TestCase):
+    def setUp(self):
+        reset_stats()
+
+    def test_new_connections_are_timed(self):
+        extra = connections.create_connection("default")
+        try:
+            extra.ensure_connection()
+        finally:
+            extra.close()
+
+        self.assertEqual(dbconnections.stats.connects, 1)
+        self.assertGreater(dbconnections.stats.connect_seconds, 0)
+
+    def test_metrics_endpoint_reports_reuse_for_this_worker(self):
+        admin = User.objects.create_user(username="metrics_admin", password="pass12345", is_staff=True)
+        self.client.force_login(admin)
+
+        self.client.get(reverse("admin-connection-metrics"))
+        metrics = self.client.get(reverse("admin-connection-metrics")).json()
+
+        self.assertEqual(metrics["mode"], settings.DATABASE_CONNECTION_MODE)
+        self.assertEqual(metrics["requests"], 2)
+        # The test case holds one connection open, so every request reuses it.
+        self.assertEqual(metrics["reuse_rate"], 1.0)
+
+    def test_metrics_endpoint_requires_admin(self):
+        response = self.client.get(reverse("admin-connection-metrics"))
+
+        self.assertEqual(response.status_code, 302)
+
+    def test_benchmark_compares_persistent_and_serverless_connections(self):
+        output = io.StringIO()
+        # SQLite never closes the in-memory test database, so benchmark a file.
+        with tempfile.TemporaryDirectory() as directory:
+            url = f"sqlite:///{os.path.join(directory, 'bench.sqlite3')}"
+            call_command("benchmark_connections", requests=5, workers=2, database_url=url, stdout=output)
+
+        rows = {line.split()[0]: line.split() for line in output.getvalue().splitlines()[1:3]}
+        self.assertEqual(rows["persistent"][1:3], ["10", "2"])
+        self.assertEqual(rows["persistent"][4], "80%")
+        self.assertEqual(rows["serverless"][1:3], ["10", "10"])
+        self.assertEqual(rows["serverless"][4], "0%")
+
+
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        request_metrics.registry.reset()
+        reset_stats()
+        self.admin = User.objects.create_user(username="prometheus_admin", password="pass12345", is_staff=True)
+
+    def _scrape(self, **headers):
+        response = self.client.get(reverse("metrics"), headers=headers)
+        self.assertEqual(response["Content-Type"], "text/plain; version=0.0.4; charset=utf-8")
+        return response.content.decode()
+
+    def test_requests_are_counted_per_route_with_latency_and_queries(self):
+        self.client.force_login(self.admin)
+        self.client.get(reverse("health"))
+        self.client.get(reverse("health"))
+        self.client.get(reverse("admin-view-student"))
+        self.client.get("/no-such-page")
+
+        body = self._scrape()
+
+        self.assertIn('http_requests_total{route="health",method="GET",status="200"} 2', body)
+        self.assertIn('http_requests_total{route="<unmatched>",method="GET",status="404"} 1', body)
+        self.assertIn('http_request_duration_seconds_bucket{route="health",method="GET",le="+Inf"} 2', body)
+        self.assertIn('http_request_duration_seconds_count{route="health",method="GET"} 2', body)
+        self.assertIn('http_response_size_bytes_total{route="health",method="GET"} 34', body)
+        queries = re.search(r'http_request_db_queries_total\{route="admin-view-student",method="GET"\} (\d+)', body)
+        self.assertGreater(int(queries.group(1)), 0)
+        self.assertIn("# TYPE http_request_duration_seconds histogram", body)
+        self.assertIn("db_connection_requests_total ", body)
+
+    def test_endpoint_needs_staff_or_the_scrape_token(self):
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 403)
+
+        with override_settings(METRICS_TOKEN="scrape-secret"):
+            self.assertEqual(self.client.get(reverse("metrics")).status_code, 401)
+            self.client.force_login(self.admin)
+            self.assertEqual(self.client.get(reverse("metrics")).status_code, 401)
+            self.client.logout()
+            self.assertIn("http_requests_total", self._scrape(Authorization="Bearer scrape-secret"))
+
+    def test_multiprocess_mode_merges_every_worker_file(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS_MULTIPROCESS_DIR=directory):
+            other_worker = request_metrics.MetricsRegistry()
+            other_worker.observe("health", "GET", 200, 0.002, size=17)
+            other_worker.observe("health", "GET", 500, 12.0)
+            with open(os.path.join(directory, "metrics-999999.json"), "w", encoding="utf-8") as handle:
+                json.dump(other_worker.dump(), handle)
+
+            self.client.get(reverse("health"))
+            self.client.force_login(self.admin)
+            body = self._scrape()
+
+            self.assertTrue(os.path.exists(os.path.join(directory, f"metrics-{os.getpid()}.json")))
+
+        self.assertIn('http_requests_total{route="health",method="GET",status="200"} 2', body)
+        self.assertIn('http_requests_total{route="health",method="GET",status="500"} 1', body)
+        self.assertIn('http_request_duration_seconds_bucket{route="health",method="GET",le="10.0"} 2', body)
+        self.assertIn('http_request_duration_seconds_bucket{route="health",method="GET",le="+Inf"} 3', body)
+
+
+class SlowQueryLogTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.log_path = os.path.join(directory.name, "slow_queries.log")
+        # Every query counts as slow, so the log fills deterministically.
+        settings_override = override_settings(SLOW_QUERY_MS=0.0001, SLOW_QUERY_LOG=self.log_path)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.admin = User.objects.create_user(username="slow_admin", password="pass12345", is_staff=True)
+        course = Course.objects.create(course_name="Query Tuning")
+        student_user = User.objects.create_user(username="slow_student", password="pass12345")
+        student = Student.objects.create(user=student_user, mobile="08030000000")
+        Result.objects.create(student=student, exam=course, marks=3)
+
+    @override_settings(SLOW_QUERY_EXPLAIN_SAMPLE=1.0)
+    def test_slow_queries_record_view_location_and_plan(self):
+        self.client.force_login(self.admin)
+        self.client.get(reverse("admin-results"))
+
+        entries = [entry for entry in slowqueries.read_entries() if entry["view"] == "admin-results"]
+        self.assertTrue(entries)
+        self.assertTrue(any(entry["location"].startswith("exam/views.py:") for entry in entries))
+        selects = [entry for entry in entries if entry["sql"].startswith("SELECT")]
+        self.assertTrue(selects)
+        self.assertTrue(all(entry["explain"] and "EXPLAIN failed" not in entry["explain"] for entry in selects))
+
+        response = self.client.get(reverse("admin-slow-queries"))
+        self.assertContains(response, "admin-results")
+        self.assertContains(response, "<summary class=\"text-muted\">EXPLAIN</summary>", html=False)
+
+    @override_settings(SLOW_QUERY_EXPLAIN_SAMPLE=0.0, SLOW_QUERY_LOG_MAX_BYTES=4000, SLOW_QUERY_LOG_BACKUPS=2)
+    def test_log_rotates_and_queries_outside_requests_are_labelled(self):
+        for _ in range(40):
+            list(Result.objects.select_related("student__user", "exam"))
+
+        self.assertTrue(os.path.exists(f"{self.log_path}.1"))
+        self.assertFalse(os.path.exists(f"{self.log_path}.3"))
+        entries = slowqueries.read_entries()
+        self.assertGreater(len(entries), 0)
+        self.assertTrue(all(entry["view"] == slowqueries.NO_REQUEST for entry in entries))
+        self.assertFalse(any("explain" in entry for entry in entries))
+
+        (offender,) = slowqueries.top_offenders(entries, limit=1)
+        self.assertEqual(offender["count"], len(entries))
+        (location,) = offender["locations"]
+        self.assertTrue(location.startswith("exam/tests.py:"))
+        self.assertTrue(location.endswith(f"in {self._testMethodName}"))
+
+    def test_failed_explain_is_recorded_without_breaking_the_transaction(self):
+        with transaction.atomic():
+            plan = slowqueries._explain(connection, "SELECT * FROM no_such_table WHERE id = %s", [1])
+            self.assertEqual(Course.objects.filter(course_name="Query Tuning").count(), 1)
+
+        self.assertTrue(plan.startswith("EXPLAIN failed: no such table"))
+
+    def test_top_offenders_rank_by_total_time(self):
+        entries = [
+            {"at": "2026-01-01T10:00:00", "ms": 900.0, "view": "admin-dashboard", "sql": "SELECT 1", "location": "a.py:1 in f"},
+            {"at": "2026-01-01T10:00:01", "ms": 300.0, "view": "admin-results", "sql": "SELECT 2", "location": "b.py:2 in g"},
+            {"at": "2026-01-01T10:00:02", "ms": 700.0, "view": "admin-results", "sql": "SELECT 2", "location": "b.py:2 in g",
+             "explain": "SCAN exam_result"},
+        ]
+
+        ranked = slowqueries.top_offenders(entries)
+
+        self.assertEqual([(row["view"], row["count"], row["total_ms"]) for row in ranked],
+                         [("admin-results", 2, 1000.0), ("admin-dashboard", 1, 900.0)])
+        self.assertEqual(ranked[0]["mean_ms"], 500.0)
+        self.assertEqual(ranked[0]["max_ms"], 700.0)
+        self.assertEqual(ranked[0]["explain"], "SCAN exam_result")
+        self.assertEqual(ranked[0]["last_seen"], "2026-01-01T10:00:02")
+
+
+class RequestProfilingTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.profile_dir = directory.name
+        settings_override = override_settings(PROFILE_DIR=self.profile_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.admin = User.objects.create_user(username="profiling_admin", password="pass12345", is_staff=True)
+        self.client.force_login(self.admin)
+
+    def test_signed_flag_profiles_one_request_for_download(self):
+        token = profiling.issue_token(self.admin)
+
+        response = self.client.get(reverse("admin-view-student"), {"_profile": token})
+
+        name = response["X-Profile-Id"]
+        self.assertEqual(profiling.profile_path(name, "prof"), os.path.join(self.profile_dir, f"{name}.prof"))
+        self.assertIsNotNone(profiling.profile_path(name, "folded"))
+        stats = pstats.Stats(os.path.join(self.profile_dir, f"{name}.prof"))
+        self.assertIn("__call__", {function for filename, _, function in stats.stats if filename.endswith("middleware.py")})
+
+        listing = self.client.get(reverse("admin-profiles"))
+        self.assertContains(listing, name)
+        self.assertContains(listing, reverse("admin-download-profile", args=[name, "folded"]))
+
+        download = self.client.get(reverse("admin-download-profile", args=[name, "prof"]))
+        self.assertEqual(download["Content-Disposition"], f'attachment; filename="{name}.prof"')
+
+        by_header = self.client.get(reverse("health"), headers={"X-Profile": token})
+        self.assertTrue(by_header["X-Profile-Id"].split("-", 1)[1].startswith("health-"))
+
+    def test_requests_without_a_valid_token_are_not_profiled(self):
+        other_admin = User.objects.create_user(username="other_admin", password="pass12345", is_staff=True)
+        student = User.objects.create_user(username="profiling_student", password="pass12345")
+
+        self.assertNotIn("X-Profile-Id", self.client.get(reverse("health")))
+        self.assertNotIn("X-Profile-Id", self.client.get(reverse("health"), {"_profile": "forged"}))
+        self.assertNotIn(
+            "X-Profile-Id", self.client.get(reverse("health"), {"_profile": profiling.issue_token(other_admin)})
+        )
+        with override_settings(PROFILE_TOKEN_MAX_AGE=-1):
+            self.assertNotIn(
+                "X-Profile-Id", self.client.get(reverse("health"), {"_profile": profiling.issue_token(self.admin)})
+            )
+        self.client.force_login(student)
+        self.assertNotIn(
+            "X-Profile-Id", self.client.get(reverse("health"), {"_profile": profiling.issue_token(student)})
+        )
+        self.assertEqual(os.listdir(self.profile_dir), [])
+
+    def test_profiles_record_only_the_profiled_thread(self):
+        def spin(seconds):
+            deadline = time.perf_counter() + seconds
+            while time.perf_counter() < deadline:
+                pass
+
+        def other_request():
+            spin(0.3)
+
+        request = mock.Mock(resolver_match=None)
+        neighbour = threading.Thread(target=other_request)
+        with profiling.profiled(request, sys._getframe()) as profile:
+            neighbour.start()
+            spin(0.2)
+        neighbour.join()
+
+        stats = pstats.Stats(os.path.join(self.profile_dir, f"{profile.name}.prof"))
+        functions = {function for _, _, function in stats.stats}
+        self.assertIn("spin", functions)
+        self.assertNotIn("other_request", functions)
+        with open(os.path.join(self.profile_dir, f"{profile.name}.folded"), encoding="utf-8") as handle:
+            self.assertTrue(all(line.startswith("test_profiles_record_only_the_profiled_thread ") for line in handle))
+
+    @override_settings(PROFILE_KEEP=2)
+    def test_only_the_newest_profiles_are_kept_and_others_cannot_be_downloaded(self):
+        token = profiling.issue_token(self.admin)
+        for stamp in ("20260101T000000", "20260102T000000"):
+            for extension in profiling.PROFILE_EXTENSIONS:
+                with open(os.path.join(self.profile_dir, f"{stamp}-health-abcdef.{extension}"), "w") as handle:
+                    handle.write("")
+
+        newest = self.client.get(reverse("health"), {"_profile": token})["X-Profile-Id"]
+
+        self.assertEqual(
+            [profile.name for profile in profiling.stored_profiles()], [newest, "20260102T000000-health-abcdef"]
+        )
+        self.assertFalse(os.path.exists(os.path.join(self.profile_dir, "20260101T000000-health-abcdef.folded")))
+        self.assertEqual(self.client.get(reverse("admin-download-profile", args=["settings", "py"])).status_code, 404)
+        self.assertEqual(
+            self.client.get(reverse("admin-download-profile", args=["20260101T000000-health-abcdef", "prof"])).status_code,
+            404,
+        )
+
+
+@override_settings(READ_REPLICA_ENABLED=True)
+class ReadReplicaRoutingTests(TestCase):
+    # The replica is a separate SQLite test database, so rows written to one
+    # alias only are visible through the other and show where a read went.
+    databases = {"default", "replica"}
+
+    def setUp(self):
+        self.admin_user = User.objects.create_user(username="replica_admin", password="pass12345", is_staff=True)
+        self.course = Course.objects.create(course_name="Primary Only Course")
+        Course.objects.using("replica").create(course_name="Replica Copy Course")
+        self.client.force_login(self.admin_user)
+
+    def test_reports_read_from_the_replica(self):
+        response = self.client.get(reverse("admin-results"))
+
+        self.assertContains(response, "Replica Copy Course")
+        self.assertNotContains(response, "Primary Only Course")
+
+    def test_live_exam_views_stay_on_the_primary(self):
+        response = self.client.get(reverse("admin-view-course"))
+
+        self.assertContains(response, "Primary Only Course")
+
+    def test_own_write_pins_reads_to_the_primary(self):
+        response = self.client.post(
+            reverse("update-course", args=[self.course.id]),
+            {
+                "course_name": "Primary Only Course II",
+                "duration_minutes": 60,
+                "pass_mark": 50,
+                "max_attempts": 1,
+                "negative_mark_per_wrong": "0",
+            },
+        )
+        self.assertEqual(response.cookies[PIN_COOKIE]["max-age"], settings.REPLICA_PIN_SECONDS)
+
+        response = self.client.get(reverse("admin-results"))
+
+        self.assertContains(response, "Primary Only Course II")
+        self.assertNotContains(response, "Replica Copy Course")
+
+    def test_submitting_with_a_get_pins_and_marks_read_the_primary(self):
+        user = User.objects.create_user(username="replica_student", password="pass12345")
+        Group.objects.get_or_create(name="STUDENT")[0].user_set.add(user)
+        student = Student.objects.create(user=user, mobile="08030000000")
+        open_session(student, self.course)
+        self.client.force_login(user)
+
+        response = self.client.get(reverse("calculate-marks", args=[self.course.id]))
+
+        self.assertEqual(response.cookies[PIN_COOKIE]["max-age"], settings.REPLICA_PIN_SECONDS)
+        self.client.cookies.pop(PIN_COOKIE)
+        marks = self.client.get(response.url)
+        self.assertContains(marks, "Primary Only Course")
+        self.assertEqual(marks.context["results"].count(), 1)
+
+    def test_unreachable_replica_falls_back_to_the_primary(self):
+        with mock.patch.object(connections["replica"], "ensure_connection", side_effect=OperationalError):
+            with self.assertLogs("onlinexam.routers", "WARNING"):
+                response = self.client.get(reverse("admin-results"))
+
+        self.assertContains(response, "Primary Only Course")
+
+    def test_objects_read_from_the_replica_are_saved_to_the_primary(self):
+        replica_course = Course.objects.using("replica").get(course_name="Replica Copy Course")
+
+        self.assertEqual(ReplicaRouter().db_for_write(Course, instance=replica_course), "default")
+
+
+class SessionArchiveTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        media_root = override_settings(MEDIA_ROOT=media.name)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+
+        self.course = Course.objects.create(course_name="Hydraulics")
+        self.questions = [
+            Question.objects.create(course=self.course, question=f"Q{index}", answer="Option1") for index in range(3)
+        ]
+        self.long_ago = timezone.now() - timezone.timedelta(days=400)
+        self.old_sessions = [self._completed_session(index, ["2", "3", "4"]) for index in range(2)]
+        self.recent_session = self._completed_session(2, ["1", "1", "1"])
+        ExamSession.objects.filter(id__in=[session.id for session in self.old_sessions]).update(
+            started_at=self.long_ago, end_time=self.long_ago + timezone.timedelta(hours=1)
+        )
+
+    def _completed_session(self, index, options):
+        user = User.objects.create_user(username=f"archived_candidate_{index}", password="pass12345")
+        student = Student.objects.create(
+            user=user,
+            matric_number=f"UNN/2025/7100{index}",
+            institutional_email=f"archived{index}@unn.edu.ng",
+            mobile="08031234567",
+        )
+        session = ExamSession.objects.create(student=student, course=self.course, is_completed=True)
+        for question, option in zip(self.questions, options):
+            StudentAnswer.objects.create(
+                session=session, question=question, selected_option=option, is_correct=option == "1"
+            )
+        ProctorEvent.objects.create(session=session, event_type="tab-switch", occurred_at=timezone.now())
+        base = 1_700_000_000_000
+        append_events(session, [(base, self.questions[0].id, 0), (base + 20_000, self.questions[1].id, 0)])
+        return session
+
+    def test_old_completed_sessions_move_to_a_course_semester_file(self):
+        report = archive_sessions(older_than_days=180)
+
+        self.assertEqual((report.sessions, report.answers, report.files), (2, 6, 1))
+        self.assertEqual(list(ExamSession.objects.values_list("id", flat=True)), [self.recent_session.id])
+        self.assertEqual(StudentAnswer.objects.count(), 3)
+        self.assertEqual(ProctorEvent.objects.count(), 1)
+
+        archive = SessionArchive.objects.get(course=self.course)
+        self.assertEqual(archive.semester, semester_of(self.long_ago))
+        self.assertTrue(archive.path.endswith(".jsonl.gz"))
+        self.assertEqual((archive.session_count, archive.answer_count), (2, 6))
+
+        archived = list(iter_archived_sessions(self.course))
+        self.assertEqual([session.session_id for session in archived], [session.id for session in self.old_sessions])
+        self.assertEqual(archived[0].answers[0], (self.questions[0].id, "2", False))
+        self.assertEqual(archived[0].proctor_events[0][0], "tab-switch")
+        self.assertEqual(dwell_times(decode_events(archived[0].timeline)), {self.questions[0].id: 20_000})
+
+    def test_later_runs_add_a_part_without_rewriting_earlier_ones(self):
+        archive_sessions(older_than_days=180)
+        first_path = SessionArchive.objects.get().path
+        ExamSession.objects.filter(id=self.recent_session.id).update(
+            started_at=self.long_ago, end_time=self.long_ago + timezone.timedelta(hours=2)
+        )
+
+        with mock.patch("exam.archive._iter_records", side_effect=AssertionError("read an earlier part")):
+            report = archive_sessions(older_than_days=180)
+
+        self.assertEqual((report.sessions, report.files), (1, 1))
+        parts = list(SessionArchive.objects.values_list("part", "session_count", "path"))
+        self.assertEqual([(part, count) for part, count, _ in parts], [(1, 2), (2, 1)])
+        self.assertEqual(parts[0][2], first_path)
+        self.assertTrue(default_storage.exists(first_path))
+        archived = [session.session_id for session in iter_archived_sessions(self.course)]
+        self.assertEqual(archived, [*(session.id for session in self.old_sessions), self.recent_session.id])
+        self.assertFalse(ExamSession.objects.exists())
+
+    def test_analytics_still_read_archived_sessions(self):
+        archive_sessions(older_than_days=180)
+
+        pairs = detect_collusion(self.course, min_shared=3, min_similarity=0.6)
+
+        self.assertEqual(len(pairs), 1)
+        self.assertEqual({pairs[0].first.session_id, pairs[0].second.session_id}, {s.id for s in self.old_sessions})
+        self.assertEqual(course_dwell_stats(self.course)[self.questions[0].id]["sessions"], 3)
+
+    def test_open_sessions_are_never_archived(self):
+        ExamSession.objects.update(is_completed=False)
+
+        call_command("archive_sessions", older_than_days=180, stdout=io.StringIO())
+
+        self.assertEqual(ExamSession.objects.count(), 3)
+        self.assertFalse(SessionArchive.objects.exists())
+
+
+class CatalogFragmentCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.course = Course.objects.create(course_name="Geomatics", is_published=True)
+        self.user = User.objects.create_user(username="catalog_student", password="pass12345")
+        Group.objects.get_or_create(name="STUDENT")[0].user_set.add(self.user)
+        Student.objects.create(
+            user=self.user,
+            matric_number="UNN/2025/72001",
+            institutional_email="catalog@unn.edu.ng",
+            mobile="08031234567",
+        )
+        self.client.force_login(self.user)
+
+    def _course_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        return response, [query["sql"] for query in context.captured_queries if '"exam_course"' in query["sql"]]
+
+    def test_repeat_visits_render_the_course_list_from_cache(self):
+        url = reverse("student-exam")
+
+        first, first_queries = self._course_queries(url)
+        second, second_queries = self._course_queries(url)
+
+        self.assertContains(first, "Geomatics")
+        self.assertContains(second, "Geomatics")
+        self.assertEqual(len(first_queries), 1)
+        self.assertEqual(second_queries, [])
+
+    def test_course_and_question_changes_invalidate_the_list(self):
+        url = reverse("student-exam")
+        self.client.get(url)
+
+        self.course.course_name = "Geomatics II"
+        self.course.save()
+        self.assertContains(self.client.get(url), "Geomatics II")
+
+        version = catalog_version()
+        Question.objects.create(course=self.course, question="Datum?", answer="Option1")
+        self.assertGreater(catalog_version(), version)
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.course.delete()
+        self.assertTrue(callbacks)
+        self.assertNotContains(self.client.get(url), "Geomatics II")
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user, self.student, self.course, _ = _attempt_fixture("conditional_student", "UNN/2025/73001")
+        self.client.force_login(self.user)
+
+    def _revalidate(self, url, response):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+
+    def test_unchanged_course_list_returns_304_without_rendering(self):
+        url = reverse("view-result")
+        first = self.client.get(url)
+
+        self.assertEqual(first.status_code, 200)
+        self.assertIn("no-cache", first["Cache-Control"])
+        self.assertIn("private", first["Cache-Control"])
+
+        second = self._revalidate(url, first)
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second.content, b"")
+        self.assertTemplateNotUsed(second, "student/view_result.html")
+
+        Course.objects.create(course_name="Dynamics")
+        self.assertEqual(self._revalidate(url, first).status_code, 200)
+
+    def test_check_marks_revalidates_until_a_new_result_arrives(self):
+        url = reverse("check-marks", args=[self.course.id])
+        first = self.client.get(url)
+        self.assertEqual(self._revalidate(url, first).status_code, 304)
+
+        grade_session(open_session(self.student, self.course)[0])
+
+        self.assertEqual(self._revalidate(url, first).status_code, 200)
+
+    def test_result_pdf_honours_if_modified_since_for_its_owner_only(self):
+        grade_session(open_session(self.student, self.course)[0])
+        result = Result.objects.get(student=self.student)
+        url = reverse("export-result-pdf", args=[result.pk])
+
+        first = self.client.get(url)
+        self.assertEqual(first["Content-Type"], "application/pdf")
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=first["Last-Modified"]).status_code, 304)
+
+        intruder, _, _, _ = _attempt_fixture("conditional_intruder", "UNN/2025/73002")
+        self.client.force_login(intruder)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"], HTTP_IF_MODIFIED_SINCE=first["Last-Modified"])
+        self.assertEqual(response.status_code, 302)
+
+    def test_pending_messages_disable_the_304(self):
+        url = reverse("view-result")
+        first = self.client.get(url)
+        open_session(self.student, self.course)
+        self.client.post(reverse("calculate-marks"), {"course_id": self.course.id})
+
+        self.assertEqual(self._revalidate(url, first).status_code, 200)
+
+
+# Tables small enough that a full scan is the right plan: the course catalogue,
+# its categories and the student dropdown on the admin results page.
+FULL_SCAN_ALLOWED = {"exam_course", "exam_category", "student_student"}
+_SQLITE_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)")
+_POSTGRES_SCAN = re.compile(r"Seq Scan on (\w+)")
+
+
+def _full_scans(sql, params):
+    """Tables the database would read end to end to answer ``sql``."""
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            # Tiny test tables make a seq scan cheapest; ask whether an index exists at all.
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute("EXPLAIN " + sql, params)
+            plan = [row[0] for row in cursor.fetchall()]
+            cursor.execute("RESET enable_seqscan")
+            return {table for line in plan for table in _POSTGRES_SCAN.findall(line)}
+        cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+        details = [row[-1] for row in cursor.fetchall()]
+    # Walking a covering index (e.g. for COUNT(*)) never touches the table rows.
+    details = [detail for detail in details if "USING COVERING INDEX" not in detail]
+    return {match.group(1) for match in map(_SQLITE_SCAN.match, details) if match}
+
+
+# A TransactionTestCase: the backfill command closes every connection before
+# forking its workers, which would end a TestCase's wrapping transaction.
+class ProfileThumbnailTests(TransactionTestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        media_root = override_settings(MEDIA_ROOT=media.name)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+
+        user = User.objects.create_user(username="avatar_student", password="pass12345", first_name="Ada")
+        self.student = Student.objects.create(
+            user=user,
+            matric_number="UNN/2025/73001",
+            institutional_email="avatar@unn.edu.ng",
+            mobile="08031234567",
+        )
+
+    def _upload(self, size=(300, 200), name="ada.png"):
+        buffer = io.BytesIO()
+        Image.new("RGBA", size, (200, 30, 30, 128)).save(buffer, "PNG")
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/png")
+
+    def test_upload_builds_square_webp_and_jpeg_thumbnails(self):
+        self.student.profile_pic = self._upload()
+        self.student.save()
+
+        variants = Student.objects.get(pk=self.student.pk).profile_pic_variants
+        self.assertEqual(variants["source"], self.student.profile_pic.name)
+        self.assertEqual(sorted(key for key in variants if key != "source"), ["192", "48", "96"])
+        for size in ("48", "96"):
+            self.assertEqual(set(variants[size]), {"webp", "jpeg"})
+            with default_storage.open(variants[size]["webp"]) as handle:
+                thumbnail = Image.open(handle)
+                self.assertEqual((thumbnail.format, thumbnail.size), ("WEBP", (int(size), int(size))))
+        with default_storage.open(variants["48"]["jpeg"]) as handle:
+            self.assertEqual(Image.open(handle).mode, "RGB")
+
+        old_paths = [path for key, paths in variants.items() if key != "source" for path in paths.values()]
+        self.student.profile_pic = self._upload(name="ada-new.png")
+        self.student.save()
+        self.assertNotEqual(self.student.profile_pic_variants["source"], variants["source"])
+        self.assertFalse(any(default_storage.exists(path) for path in old_paths))
+
+    def test_small_pictures_are_not_upscaled_and_broken_ones_fall_back(self):
+        self.student.profile_pic = self._upload(size=(60, 60))
+        self.student.save()
+        self.assertEqual(sorted(key for key in self.student.profile_pic_variants if key != "source"), ["48"])
+
+        self.student.profile_pic = SimpleUploadedFile("broken.png", b"not an image")
+        with self.assertLogs("exam.images", "WARNING"):
+            self.student.save()
+        self.assertEqual(self.student.profile_pic_variants, {"source": self.student.profile_pic.name})
+        html = Template("{% load thumbnails %}{% avatar student 44 %}").render(Context({"student": self.student}))
+        self.assertIn(f'src="{self.student.profile_pic.url}"', html)
+
+    def test_avatar_tag_picks_the_smallest_thumbnail_covering_each_density(self):
+        self.student.profile_pic = self._upload()
+        self.student.save()
+        variants = self.student.profile_pic_variants
+
+        html = Template("{% load thumbnails %}{% avatar student 44 %}").render(Context({"student": self.student}))
+
+        self.assertIn(
+            f'srcset="{default_storage.url(variants["48"]["webp"])} 1x, {default_storage.url(variants["96"]["webp"])} 2x"',
+            html,
+        )
+        self.assertIn(f'src="{default_storage.url(variants["48"]["jpeg"])}"', html)
+        self.assertIn('width="44"', html)
+        self.assertEqual(
+            Template("{% load thumbnails %}{% thumbnail_url student 500 'jpeg' %}").render(Context({"student": self.student})),
+            default_storage.url(variants["192"]["jpeg"]),
+        )
+
+    def test_backfill_command_builds_missing_thumbnails_in_worker_processes(self):
+        teacher_user = User.objects.create_user(username="avatar_teacher", password="pass12345")
+        teacher = Teacher.objects.create(user=teacher_user, staff_id="UNN/STAFF/7301", mobile="08031234567")
+        for profile in (self.student, teacher):
+            name = default_storage.save(f"profile_pic/legacy-{profile.pk}.png", self._upload())
+            # Rows written before the pipeline existed never went through the signal.
+            type(profile).objects.filter(pk=profile.pk).update(profile_pic=name)
+
+        output = io.StringIO()
+        call_command("build_profile_thumbnails", "--workers", "2", stdout=output)
+
+        self.assertIn("Built thumbnails for 2 picture(s)", output.getvalue())
+        for profile in (Student.objects.get(pk=self.student.pk), Teacher.objects.get(pk=teacher.pk)):
+            self.assertEqual(profile.profile_pic_variants["source"], profile.profile_pic.name)
+            self.assertTrue(default_storage.exists(profile.profile_pic_variants["96"]["webp"]))
+
+        output = io.StringIO()
+        call_command("build_profile_thumbnails", stdout=output)
+        self.assertIn("up to date", output.getvalue())
+
+
+class QuestionImageDeliveryTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        media_root = override_settings(MEDIA_ROOT=media.name)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+        self.course = Course.objects.create(course_name="Structural Analysis")
+
+    def _question(self, size, index=0):
+        buffer = io.BytesIO()
+        Image.new("RGB", size, (20, 120, 200)).save(buffer, "PNG")
+        return Question.objects.create(
+            course=self.course,
+            question=f"Which member is in tension? {index}",
+            answer="Option1",
+            image=SimpleUploadedFile(f"truss-{index}.png", buffer.getvalue(), content_type="image/png"),
+        )
+
+    def test_saving_a_question_builds_width_variants_without_upscaling(self):
+        large = self._question((2000, 1000))
+        variants = Question.objects.get(pk=large.pk).image_variants
+
+        self.assertEqual(sorted(key for key in variants if key.isdigit()), ["1440", "480", "960"])
+        self.assertEqual((variants["width"], variants["height"]), (1440, 720))
+        with default_storage.open(variants["480"]["webp"]) as handle:
+            self.assertEqual(Image.open(handle).size, (480, 240))
+
+        small = self._question((300, 120), index=1)
+        self.assertEqual(sorted(key for key in small.image_variants if key.isdigit()), ["300"])
+
+        large.delete()
+        self.assertFalse(default_storage.exists(variants["960"]["jpeg"]))
+
+    def test_exam_engine_loads_only_the_first_image_eagerly(self):
+        first, second = self._question((1200, 800)), self._question((1200, 800), index=1)
+        user = User.objects.create_user(username="image_candidate", password="pass12345")
+        Group.objects.get_or_create(name="STUDENT")[0].user_set.add(user)
+        Student.objects.create(
+            user=user,
+            matric_number="UNN/2025/74001",
+            institutional_email="images@unn.edu.ng",
+            mobile="08031234567",
+        )
+        self.client.force_login(user)
+
+        page = self.client.get(reverse("take-exam", args=[self.course.id])).content.decode()
+
+        first_webp = default_storage.url(first.image_variants["480"]["webp"])
+        head = page[: page.index("</head>")]
+        self.assertIn('<link rel="preload" as="image" type="image/webp" imagesrcset="' + first_webp, head)
+        self.assertEqual(page.count('loading="eager" fetchpriority="high"'), 1)
+        self.assertLess(page.index(first_webp + " 480w"), page.index('loading="eager"'))
+        self.assertIn(default_storage.url(second.image_variants["1200"]["webp"]) + " 1200w", page)
+        self.assertEqual(page.count('loading="lazy" fetchpriority="auto"'), 1)
+        self.assertNotIn(first.image.url, page)
+
+
+class LoadTestHarnessTests(TransactionTestCase):
+    def test_loadtest_walks_a_candidate_through_the_exam_and_writes_a_report(self):
+        # One candidate: SQLite serialises writers, so several would only
+        # measure lock waits; AttemptConcurrencyTests covers racing starts.
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "report.json")
+            output = io.StringIO()
+            call_command(
+                "loadtest", "--students", "1", "--questions", "3", "--think-time", "0", "--output", path, stdout=output
+            )
+            with open(path, encoding="utf-8") as handle:
+                report = json.load(handle)
+
+        self.assertEqual((report["students"], report["questions"]), (1, 3))
+        endpoints = report["endpoints"]
+        self.assertEqual(
+            {name: (row["requests"], row["errors"]) for name, row in endpoints.items()},
+            {"start-exam": (1, 0), "submit-answer": (3, 0), "calculate-marks": (1, 0)},
+        )
+        for row in endpoints.values():
+            self.assertGreater(row["mean_queries"], 0)
+            self.assertLessEqual(row["p50_ms"], row["p95_ms"])
+            self.assertLessEqual(row["p95_ms"], row["p99_ms"])
+        self.assertIn("submit-answer", output.getvalue())
+        # The seeded course and candidate are removed after the run.
+        self.assertFalse(Course.objects.filter(course_name__startswith="Load test").exists())
+        self.assertFalse(User.objects.filter(username__startswith="loadtest-").exists())
+
+
+def _routes(patterns=None, prefix=""):
+    """``(route, name)`` for every URL pattern of the project, without the Django admin."""
+    for pattern in get_resolver().url_patterns if patterns is None else patterns:
+        if isinstance(pattern, URLResolver):
+            if pattern.app_name != "admin":
+                yield from _routes(pattern.url_patterns, prefix + str(pattern.pattern))
+        else:
+            yield prefix + str(pattern.pattern), pattern.name
+
+
+def _budget(role, budget, args=(), method="get", data=None):
+    return {"role": role, "budget": budget, "args": args, "method": method, "data": data}
+
+
+@override_settings(EXAM_CLOCK_CACHE=True)
+class QueryBudgetTests(TestCase):
+    """Query budgets for every page, checked on a small and a large data set.
+
+    Each view is requested once against a few rows and again after the data
+    has grown several times over; the count must not change between the two
+    and must stay within the budget. A route added without a budget fails
+    test_every_route_has_a_budget.
+    """
+
+    # Routes left out, with the reason. Their writes are covered by behaviour
+    # tests, and grading by HotPathQueryPlanTests.test_grade_session.
+    UNMEASURED = {
+        "logout": "ends the test client's session",
+        "admin-live-monitor-stream/<int:pk>": "streams until the client disconnects",
+        "delete-result/<int:pk>": "deletes a row",
+        "delete-teacher/<int:pk>": "deletes a row",
+        "approve-teacher/<int:pk>": "changes the teacher's status",
+        "reject-teacher/<int:pk>": "changes the teacher's status",
+        "delete-student/<int:pk>": "deletes a row",
+        "delete-course/<int:pk>": "deletes a row",
+        "delete-question/<int:pk>": "deletes a row",
+        "teacher/delete-exam/<int:pk>": "deletes a row",
+        "teacher/remove-question/<int:pk>": "deletes a row",
+        "student/calculate-marks": "grades the open session",
+        "student/calculate-marks/<int:pk>": "grades the open session",
+        "admin-profile/<str:name>.<str:extension>": "serves a file from PROFILE_DIR; see RequestProfilingTests",
+        # See test_teacher_can_bulk_upload_questions_from_csv.
+        "teacher/teacher-upload-questions": "fails: teacher.forms has no QuestionUploadForm",
+    }
+
+    @classmethod
+    def budgets(cls):
+        course = lambda: [cls.course.id]
+        return {
+            "health": _budget(None, 0),
+            "metrics": _budget("admin", 2),
+            "": _budget(None, 0),
+            "contactus": _budget(None, 0),
+            "afterlogin": _budget("student", 3),
+            "adminclick": _budget(None, 0),
+            "adminlogin": _budget(None, 0),
+            "admin-dashboard": _budget("admin", 13),
+            "admin-results": _budget("admin", 6),
+            "admin-analytics": _budget("admin", 7),
+            "admin-collusion-report": _budget("admin", 4),
+            "admin-live-monitor/<int:pk>": _budget("admin", 3, course),
+            "admin-connection-metrics": _budget("admin", 2),
+            "admin-slow-queries": _budget("admin", 2),
+            "admin-profiles": _budget("admin", 2),
+            "admin-export-results-csv": _budget("admin", 3),
+            "admin-export-results-excel": _budget("admin", 3),
+            "admin-export-students-csv": _budget("admin", 3),
+            "admin-export-teachers-csv": _budget("admin", 3),
+            "admin-export-courses-csv": _budget("admin", 3),
+            "admin-export-analytics-csv": _budget("admin", 3),
+            "admin-teacher": _budget("admin", 4),
+            "admin-view-teacher": _budget("admin", 3),
+            "update-teacher/<int:pk>": _budget("admin", 4, lambda: [cls.teacher.id]),
+            "admin-view-pending-teacher": _budget("admin", 3),
+            "admin-student": _budget("admin", 3),
+            "admin-view-student": _budget("admin", 3),
+            "admin-view-student-marks": _budget("admin", 3),
+            "admin-view-marks/<int:student_id>": _budget("admin", 3, lambda: [cls.student.id]),
+            "admin-check-marks/<int:student_id>/<int:course_id>": _budget(
+                "admin", 7, lambda: [cls.student.id, cls.course.id]
+            ),
+            "update-student/<int:pk>": _budget("admin", 4, lambda: [cls.student.id]),
+            "admin-course": _budget("admin", 2),
+            "admin-add-course": _budget("admin", 2),
+            "admin-view-course": _budget("admin", 3),
+            "update-course/<int:pk>": _budget("admin", 3, course),
+            "admin-question": _budget("admin", 2),
+            "admin-add-question": _budget("admin", 3),
+            "admin-view-question": _budget("admin", 3),
+            "view-question/<int:pk>": _budget("admin", 6, course),
+            "update-question/<int:pk>": _budget("admin", 4, lambda: [cls.question.id]),
+            "export-result-pdf/<int:pk>": _budget("admin", 7, lambda: [cls.result.id]),
+            # One of these reads back the answers saved so far.
+            "take-exam/<int:pk>": _budget("student", 8, course),
+            "submit-answer-htmx": _budget(
+                "student", 8, method="post",
+                data=lambda: {"session_id": cls.session.id, "question_id": cls.question.id, "option": "2"},
+            ),
+            "exam-clock/<int:session_id>": _budget("student", 1, lambda: [cls.session.id]),
+            # The events and the counter bump are written in one transaction (its savepoint pair).
+            "proctor-event-htmx": _budget(
+                "student", 8, method="post", data=lambda: {"session_id": cls.session.id, "event": "copy"}
+            ),
+            # One query more than autosave: events are checked against the course's question ids.
+            "timeline-events-htmx": _budget(
+                "student", 9, method="post",
+                data=lambda: {
+                    "session_id": cls.session.id,
+                    "events": json.dumps([{"t": 1700000000000, "q": cls.question.id, "k": "enter"}]),
+                },
+            ),
+            "teacher/teacherclick": _budget(None, 0),
+            "teacher/teacherlogin": _budget(None, 0),
+            "teacher/teachersignup": _budget(None, 0),
+            "teacher/teacher-dashboard": _budget("teacher", 9),
+            "teacher/teacher-exam": _budget("teacher", 3),
+            "teacher/teacher-add-exam": _budget("teacher", 3),
+            "teacher/teacher-view-exam": _budget("teacher", 4),
+            "teacher/teacher-question": _budget("teacher", 3),
+            "teacher/teacher-add-question": _budget("teacher", 4),
+            "teacher/teacher-view-question": _budget("teacher", 4),
+            "teacher/see-question/<int:pk>": _budget("teacher", 4, course),
+            "student/studentclick": _budget(None, 0),
+            "student/studentlogin": _budget(None, 0),
+            "student/studentsignup": _budget(None, 0),
+            "student/student-dashboard": _budget("student", 8),
+            "student/student-exam": _budget("student", 4),
+            "student/take-exam/<int:pk>": _budget("student", 7, course),
+            "student/start-exam/<int:pk>": _budget("student", 9, course),
+            "student/admission-status/<int:pk>": _budget(
+                None, 0, course, data=lambda: {"ticket": issue_ticket(cls.course, cls.student.user)}
+            ),
+            # The open attempt, the question, and update_or_create's savepoint pair,
+            # locking read and update; the answer lands on the attempt, not the session row.
+            "student/ajax-save-answer": _budget(
+                "student", 9, method="post",
+                data=lambda: json.dumps({"course_id": cls.course.id, "question_id": cls.question.id, "option": "1"}),
+            ),
+            "student/view-result": _budget("student", 4),
+            "student/check-marks/<int:pk>": _budget("student", 7, course),
+            "student/student-marks": _budget("student", 4),
+        }
+
+    @classmethod
+    def _populate(cls, tag, courses, questions, students, teachers):
+        student_group, _ = Group.objects.get_or_create(name="STUDENT")
+        teacher_group, _ = Group.objects.get_or_create(name="TEACHER")
+        created_courses = []
+        for index in range(courses):
+            course = Course.objects.create(course_name=f"{tag} course {index}", is_published=True)
+            for number in range(questions):
+                Question.objects.create(
+                    course=course, question=f"{tag} question {number}", option1="A", option2="B", answer="Option1"
+                )
+            created_courses.append(course)
+        for index in range(teachers):
+            user = User.objects.create_user(username=f"{tag}_teacher_{index}", first_name="Lecturer", last_name=tag)
+            teacher_group.user_set.add(user)
+            approved = index % 2 == 0
+            Teacher.objects.create(
+                user=user,
+                staff_id=f"{tag}/STAFF/{index}",
+                official_email=f"{tag}.teacher{index}@unn.edu.ng",
+                mobile="08031234567",
+                status=approved,
+                verification_status="APPROVED" if approved else "PENDING",
+            )
+        created_students = []
+        for index in range(students):
+            user = User.objects.create_user(username=f"{tag}_student_{index}", first_name="Candidate", last_name=tag)
+            student_group.user_set.add(user)
+            created_students.append(Student.objects.create(
+                user=user,
+                matric_number=f"{tag}/2025/{index:05d}",
+                institutional_email=f"{tag}.student{index}@unn.edu.ng",
+                mobile="08031234567",
+            ))
+        return created_courses, created_students
+
+    @classmethod
+    def _sit(cls, student, course):
+        session, _ = open_session(student, course)
+        for question in course.question_set.all():
+            StudentAnswer.objects.create(
+                session=session, question=question, selected_option=str(question.id % 2 + 1),
+                is_correct=question.id % 2 == 0,
+            )
+        ProctorEvent.objects.create(session=session, event_type="tab-switch", occurred_at=timezone.now())
+        return grade_session(session)[0]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_user(username="budget_admin", is_staff=True, is_superuser=True)
+        courses, students = cls._populate("small", courses=2, questions=3, students=2, teachers=2)
+        for student in students:
+            for course in courses:
+                cls._sit(student, course)
+        cls.course, cls.student = courses[0], students[0]
+        cls.question = cls.course.question_set.first()
+        cls.teacher = Teacher.objects.filter(status=True).first()
+        cls.result = Result.objects.filter(student=cls.student, exam=cls.course).first()
+        cls.session, _ = open_session(cls.student, cls.course)
+        cls.timings = {}
+
+    @classmethod
+    def tearDownClass(cls):
+        if cls.timings:
+            rows = [f"{'route':<52}{'small':>7}{'large':>7}{'ms':>9}"]
+            for route, (small, large, elapsed_ms) in sorted(cls.timings.items()):
+                rows.append(f"{route or '/':<52}{small:>7}{large:>7}{elapsed_ms:>9.1f}")
+            print("\n" + "\n".join(rows))
+        super().tearDownClass()
+
+    def _grow(self):
+        courses, students = self._populate("large", courses=6, questions=10, students=12, teachers=8)
+        for number in range(10):
+            Question.objects.create(course=self.course, question=f"large extra {number}", answer="Option1")
+        for student in students:
+            for course in [self.course, *courses[:3]]:
+                self._sit(student, course)
+        for course in courses:
+            self._sit(self.student, course)
+
+    def _measure(self, route, case):
+        users = {"admin": self.admin_user, "teacher": self.teacher.user, "student": self.student.user}
+        self.client.logout()
+        if case["role"]:
+            self.client.force_login(users[case["role"]])
+        args = iter(case["args"]() if callable(case["args"]) else case["args"])
+        path = "/" + re.sub(r"<[^>]+>", lambda match: str(next(args)), route)
+        data = case["data"]() if case["data"] else {}
+        kwargs = {"content_type": "application/json"} if isinstance(data, str) else {}
+        # The first autosave or timeline post creates the row that later ones update.
+        getattr(self.client, case["method"])(path, data, **kwargs)
+        cache.clear()
+        remember_session(self.session, self.student.pk)
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            response = getattr(self.client, case["method"])(path, data, **kwargs)
+            if response.streaming:
+                b"".join(response.streaming_content)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+        self.assertLess(response.status_code, 400, f"{path} answered {response.status_code}")
+        return [query["sql"] for query in context.captured_queries], elapsed_ms
+
+    # Budgets for the routes that read the exam clock, without EXAM_CLOCK_CACHE:
+    # one primary-key read of the session row instead of the cache.
+    UNCACHED_CLOCK_BUDGETS = {"submit-answer-htmx": 9, "exam-clock/<int:session_id>": 2}
+
+    @override_settings(EXAM_CLOCK_CACHE=False)
+    def test_clock_routes_stay_within_budget_without_the_clock_cache(self):
+        budgets = self.budgets()
+        for route, budget in self.UNCACHED_CLOCK_BUDGETS.items():
+            queries, _ = self._measure(route, budgets[route])
+            with self.subTest(route=route):
+                self.assertLessEqual(len(queries), budget, "\n".join(queries))
+
+    def test_every_route_has_a_budget(self):
+        routes = {route for route, _ in _routes()}
+        self.assertEqual(routes - set(self.budgets()) - set(self.UNMEASURED), set())
+        self.assertEqual(set(self.budgets()) - routes, set())
+
+    def test_query_counts_stay_within_budget_as_data_grows(self):
+        budgets = self.budgets()
+        small = {route: self._measure(route, case)[0] for route, case in budgets.items()}
+        self._grow()
+        for route, case in budgets.items():
+            queries, elapsed_ms = self._measure(route, case)
+            type(self).timings[route] = (len(small[route]), len(queries), elapsed_ms)
+            with self.subTest(route=route):
+                self.assertEqual(len(queries), len(small[route]), "\n".join(queries))
+                self.assertLessEqual(len(queries), case["budget"], "\n".join(queries))
+
+
+@override_settings(EXAM_CLOCK_CACHE=True)
+class HotPathQueryPlanTests(TestCase):
+    """Query-count budgets and index coverage for the pages hit during an exam.
+
+    Raising a budget or allowing another full scan should be a deliberate
+    change in review, not something a new filter slips in unnoticed.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        student_group, _ = Group.objects.get_or_create(name="STUDENT")
+        cls.admin_user = User.objects.create_user(username="plan_admin", password="pass12345", is_staff=True)
+        cls.course = Course.objects.create(course_name="Thermodynamics", question_number=3, total_marks=15)
+        cls.questions = [
+            Question.objects.create(course=cls.course, question=f"Q{index}", marks=5, answer="Option1")
+            for index in range(3)
+        ]
+        cls.students = []
+        for index in range(3):
+            user = User.objects.create_user(username=f"plan_student_{index}", password="pass12345")
+            student_group.user_set.add(user)
+            student = Student.objects.create(
+                user=user,
+                matric_number=f"UNN/2025/9{index:04d}",
+                institutional_email=f"plan_student_{index}@unn.edu.ng",
+                mobile="08031234567",
+            )
+            graded, _ = open_session(student, cls.course)
+            for question in cls.questions:
+                StudentAnswer.objects.create(session=graded, question=question, selected_option="1", is_correct=True)
+            grade_session(graded)
+            cls.students.append((user, open_session(student, cls.course)[0]))
+        cls.user, cls.session = cls.students[0]
+
+    def setUp(self):
+        cache.clear()
+        # take-exam records the clock and the candidate's student id as the session
+        # opens; autosave and the clock poll read them.
+        remember_session(self.session, self.session.student_id)
+        self.client.force_login(self.user)
+        login = self.client.session
+        login[STUDENT_SESSION_KEY] = self.session.student_id
+        login.save()
+
+    @contextmanager
+    def assertHotPath(self, budget, full_scans=()):
+        allowed = FULL_SCAN_ALLOWED.union(full_scans)
+        with CaptureQueriesContext(connection) as context:
+            yield
+        queries = context.captured_queries
+        self.assertLessEqual(
+            len(queries), budget, "\n".join(query["sql"] for query in queries)
+        )
+        for query in queries:
+            if not query["sql"].startswith("SELECT"):
+                continue
+            scanned = _full_scans(query["sql"], query.get("params") or ())
+            self.assertFalse(scanned - allowed, f"Full table scan for: {query['sql']}")
+
+    def test_student_dashboard(self):
+        with self.assertHotPath(10):
+            self.client.get(reverse("student-dashboard"))
+
+    def test_check_marks(self):
+        # One of these is the aggregate behind the page's ETag.
+        with self.assertHotPath(7):
+            self.client.get(reverse("check-marks", args=[self.course.id]))
+
+    def test_take_exam_resumes_open_session(self):
+        # One of these reads back the answers saved so far.
+        with self.assertHotPath(8):
+            self.client.get(reverse("take-exam", args=[self.course.id]))
+
+    def test_autosave(self):
+        payload = {"session_id": self.session.id, "question_id": self.questions[0].id, "option": "1"}
+        with self.assertHotPath(11):
+            self.client.post(reverse("submit-answer-htmx"), payload)
+
+    def test_exam_clock(self):
+        with self.assertHotPath(1):
+            self.client.get(reverse("exam-clock", args=[self.session.id]))
+
+    # Without EXAM_CLOCK_CACHE, the default without Redis, the clock record is one
+    # primary-key read of the session row.
+    @override_settings(EXAM_CLOCK_CACHE=False)
+    def test_autosave_without_the_clock_cache(self):
+        payload = {"session_id": self.session.id, "question_id": self.questions[0].id, "option": "1"}
+        with self.assertHotPath(11):
+            self.client.post(reverse("submit-answer-htmx"), payload)
+
+    @override_settings(EXAM_CLOCK_CACHE=False)
+    def test_exam_clock_without_the_clock_cache(self):
+        with self.assertHotPath(2):
+            self.client.get(reverse("exam-clock", args=[self.session.id]))
+
+    def test_proctor_event(self):
+        # Two of these are the savepoint around the events and the counter bump.
+        with self.assertHotPath(8):
+            self.client.post(reverse("proctor-event-htmx"), {"session_id": self.session.id, "event": "copy"})
+
+    def test_live_monitor_snapshot(self):
+        with self.assertHotPath(2):
+            course_snapshot(self.course)
+
+    def test_grade_session(self):
+        with self.assertHotPath(14):
+            grade_session(self.session)
+
+    def test_admin_results(self):
+        self.client.force_login(self.admin_user)
+        # The unfiltered page lists every result, so reading the whole table is expected.
+        with self.assertHotPath(6, full_scans={"exam_result"}):
+            self.client.get(reverse("admin-results"))
+
+    def test_admin_results_filtered_by_course_and_status(self):
+        self.client.force_login(self.admin_user)
+        with self.assertHotPath(6):
+            self.client.get(reverse("admin-results"), {"course": self.course.id, "status": "passed"})
@@ -0,0 +1,145 @@
+import statistics
+import struct
+from collections import defaultdict
+from itertools import chain
+from typing import Dict, Iterable, List, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .archive import iter_archived_sessions
+from .models import SessionTimeline
+
+
+# Each event is packed as (ms since previous event, question id, kind).
+EVENT_FORMAT = struct.Struct("<IIB")
+EVENT_KINDS = {"enter": 0, "answer": 1}
+EVENT_NAMES = {code: name for name, code in EVENT_KINDS.items()}
+MAX_EVENTS_PER_BATCH = 200
+_MAX_DELTA_MS = 2 ** 32 - 1
+_MAX_QUESTION_ID = 2 ** 32 - 1
+# Largest integer a browser's Date.now() can represent exactly.
+_MAX_EPOCH_MS = 2 ** 53 - 1
+DWELL_STATS_KEY = "exam:dwell:{course_id}"
+
+
+class TimelineError(Exception):
+    pass
+
+
+def parse_client_events(raw_events, question_ids=None) -> List[Tuple[int, int, int]]:
+    """Validate a client batch of ``{"t": epoch_ms, "q": question_id, "k": kind}`` dicts.
+
+    Every value must fit the packed event format; when ``question_ids`` is
+    given, every event must also name one of those questions.
+    """
+    if not isinstance(raw_events, list):
+        raise TimelineError("Events must be a list.")
+    if len(raw_events) > MAX_EVENTS_PER_BATCH:
+        raise TimelineError(f"At most {MAX_EVENTS_PER_BATCH} events can be sent at once.")
+
+    events = []
+    for raw in raw_events:
+        try:
+            kind = EVENT_KINDS[raw["k"]]
+            timestamp_ms, question_id = int(raw["t"]), int(raw["q"])
+        except (KeyError, TypeError, ValueError) as exc:
+            raise TimelineError(f"Malformed timeline event: {raw!r}") from exc
+        if not 0 <= timestamp_ms <= _MAX_EPOCH_MS or not 0 < question_id <= _MAX_QUESTION_ID:
+            raise TimelineError(f"Timeline event out of range: {raw!r}")
+        if question_ids is not None and question_id not in question_ids:
+            raise TimelineError(f"Timeline event for a question outside the exam: {raw!r}")
+        events.append((timestamp_ms, question_id, kind))
+    events.sort(key=lambda event: event[0])
+    return events
+
+
+def encode_events(events: Iterable[Tuple[int, int, int]], previous_ms: int) -> Tuple[bytes, int]:
+    """Pack absolute-time events as deltas from ``previous_ms``.
+
+    Events older than ``previous_ms`` (client retries, clock jumps) are
+    clamped to a zero delta so the stream stays monotonic.
+    """
+    packed = bytearray()
+    for timestamp_ms, question_id, kind in events:
+        delta = min(max(timestamp_ms - previous_ms, 0), _MAX_DELTA_MS)
+        packed += EVENT_FORMAT.pack(delta, question_id, kind)
+        previous_ms = max(previous_ms, timestamp_ms)
+    return bytes(packed), previous_ms
+
+
+def decode_events(timeline: SessionTimeline) -> List[Tuple[int, int, str]]:
+    """Unpack a timeline into ``(epoch_ms, question_id, kind)`` tuples."""
+    current_ms = timeline.anchor_ms
+    decoded = []
+    for delta, question_id, kind in EVENT_FORMAT.iter_unpack(bytes(timeline.events)):
+        current_ms += delta
+        decoded.append((current_ms, question_id, EVENT_NAMES.get(kind, "enter")))
+    return decoded
+
+
+def append_events(session, events: List[Tuple[int, int, int]]) -> int:
+    """Append one client batch to the session timeline with a single row update."""
+    if not events:
+        return 0
+
+    with transaction.atomic():
+        timeline, created = SessionTimeline.objects.select_for_update().get_or_create(
+            session=session,
+            defaults={"anchor_ms": events[0][0], "last_event_ms": events[0][0]},
+        )
+        packed, last_ms = encode_events(events, timeline.last_event_ms)
+        timeline.events = bytes(timeline.events) + packed
+        timeline.last_event_ms = last_ms
+        timeline.event_count += len(events)
+        timeline.save(update_fields=["events", "last_event_ms", "event_count"])
+    return len(events)
+
+
+def dwell_times(decoded_events) -> Dict[int, int]:
+    """Milliseconds spent on each question, attributing each gap to the question on screen."""
+    dwell = defaultdict(int)
+    current_question = None
+    previous_ms = None
+    for timestamp_ms, question_id, _kind in decoded_events:
+        if current_question is not None:
+            dwell[current_question] += timestamp_ms - previous_ms
+        current_question = question_id
+        previous_ms = timestamp_ms
+    return dict(dwell)
+
+
+def course_dwell_stats(course, include_archived=True) -> Dict[int, Dict[str, float]]:
+    """Per-question dwell statistics (in seconds) across every session of ``course``."""
+    samples = defaultdict(list)
+    timelines = SessionTimeline.objects.filter(session__course=course).only("anchor_ms", "events").iterator(chunk_size=500)
+    if include_archived:
+        archived = (session.timeline for session in iter_archived_sessions(course) if session.timeline)
+        timelines = chain(timelines, archived)
+    for timeline in timelines:
+        for question_id, dwell_ms in dwell_times(decode_events(timeline)).items():
+            samples[question_id].append(dwell_ms / 1000)
+
+    return {
+        question_id: {
+            "sessions": len(values),
+            "mean_seconds": round(statistics.fmean(values), 1),
+            "median_seconds": round(statistics.median(values), 1),
+        }
+        for question_id, values in samples.items()
+    }
+
+
+def cached_dwell_stats(course) -> Dict[int, Dict[str, float]]:
+    """``course_dwell_stats`` from the cache; the full scan runs at most once per DWELL_STATS_TIMEOUT."""
+    key = DWELL_STATS_KEY.format(course_id=course.pk)
+    stats = cache.get(key)
+    if stats is None:
+        stats = course_dwell_stats(course)
+        cache.set(key, stats, settings.DWELL_STATS_TIMEOUT)
+    return stats
+
+
+def forget_dwell_stats(course_ids):
+    cache.delete_many([DWELL_STATS_KEY.format(course_id=course_id) for course_id in course_ids])
@@ -2,9 +2,13 @@
 ASGI config for onlinexam project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it with an ASGI server so the async exam endpoints (autosave, proctor
+events, live monitor) do not hold a worker per open tab:
+
+    gunicorn onlinexam.asgi:application -k uvicorn.workers.UvicornWorker
 
 For more information on this file, see
-https://docs.djangoproject.com/en/3.0/howto/deployment/asgi/
+https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 """
 
 import os
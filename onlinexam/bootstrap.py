@@ -83,16 +83,24 @@ def _ensure_admin_user():
         user.save()
 
 
+def bootstrap_pending():
+    """True while ensure_runtime_bootstrap still has work to do; never touches the database."""
+    if _bootstrap_done:
+        return False
+    admin_username, admin_password, _ = _admin_credentials()
+    return getattr(settings, "RUNNING_ON_VERCEL", False) or bool(admin_username and admin_password)
+
+
 def ensure_runtime_bootstrap():
     global _bootstrap_done
 
+    if not bootstrap_pending():
+        return
+
     running_on_vercel = getattr(settings, "RUNNING_ON_VERCEL", False)
     admin_username, admin_password, _ = _admin_credentials()
     needs_admin = bool(admin_username and admin_password)
 
-    if not running_on_vercel and not needs_admin:
-        return
-
     with _bootstrap_lock:
         if _bootstrap_done:
             return
@@ -0,0 +1,84 @@
+import threading
+import time
+from dataclasses import dataclass
+from functools import wraps
+
+from django.core.signals import request_started
+from django.db import connections
+
+
+@dataclass
+class ConnectionStats:
+    requests: int = 0
+    reused: int = 0
+    connects: int = 0
+    connect_seconds: float = 0.0
+
+    @property
+    def reuse_rate(self):
+        return self.reused / self.requests if self.requests else 0.0
+
+    @property
+    def mean_connect_ms(self):
+        return self.connect_seconds * 1000 / self.connects if self.connects else 0.0
+
+    def as_dict(self):
+        return {
+            "requests": self.requests,
+            "reused": self.reused,
+            "connects": self.connects,
+            "mean_connect_ms": round(self.mean_connect_ms, 3),
+            "reuse_rate": round(self.reuse_rate, 4),
+        }
+
+
+# Counters for this process; each worker reports its own.
+stats = ConnectionStats()
+_lock = threading.Lock()
+_timed_backends = set()
+
+
+def record_connect(seconds):
+    with _lock:
+        stats.connects += 1
+        stats.connect_seconds += seconds
+
+
+def record_request(reused):
+    with _lock:
+        stats.requests += 1
+        stats.reused += int(reused)
+
+
+def reset_stats():
+    with _lock:
+        stats.requests = stats.reused = stats.connects = 0
+        stats.connect_seconds = 0.0
+
+
+def _timed(get_new_connection):
+    @wraps(get_new_connection)
+    def wrapper(self, conn_params):
+        started = time.perf_counter()
+        try:
+            return get_new_connection(self, conn_params)
+        finally:
+            record_connect(time.perf_counter() - started)
+
+    return wrapper
+
+
+def _note_request(**kwargs):
+    # Django's own request_started receiver runs first and has already closed
+    # connections past CONN_MAX_AGE or failing their health check.
+    record_request(connections["default"].connection is not None)
+
+
+def instrument_connections():
+    """Time every new database connection and track reuse across requests."""
+    for alias in connections:
+        backend = type(connections[alias])
+        if backend not in _timed_backends:
+            backend.get_new_connection = _timed(backend.get_new_connection)
+            _timed_backends.add(backend)
+    request_started.connect(_note_request, dispatch_uid="onlinexam.dbconnections")
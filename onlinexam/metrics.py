@@ -0,0 +1,241 @@
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+
+from . import dbconnections
+
+
+# Upper bounds, in seconds, of the latency histogram buckets; +Inf is implied.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Requests that matched no URL pattern share one label, so scanners probing
+# random paths cannot create unbounded series.
+UNMATCHED_ROUTE = "<unmatched>"
+
+# [queries, seconds] for the request in progress; None outside requests.
+_request_queries = ContextVar("request_queries", default=None)
+
+
+@dataclass
+class RouteStats:
+    requests: int = 0
+    duration_seconds: float = 0.0
+    # Per-bucket (not cumulative) counts; the last slot is above the top bound.
+    buckets: list = field(default_factory=lambda: [0] * (len(LATENCY_BUCKETS) + 1))
+    queries: int = 0
+    query_seconds: float = 0.0
+    response_bytes: int = 0
+    statuses: dict = field(default_factory=dict)
+
+    def observe(self, status, seconds, queries, query_seconds, size):
+        self.requests += 1
+        self.duration_seconds += seconds
+        self.buckets[next((i for i, bound in enumerate(LATENCY_BUCKETS) if seconds <= bound), -1)] += 1
+        self.queries += queries
+        self.query_seconds += query_seconds
+        self.response_bytes += size
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    def merge(self, other):
+        self.requests += other.requests
+        self.duration_seconds += other.duration_seconds
+        self.buckets = [mine + theirs for mine, theirs in zip(self.buckets, other.buckets)]
+        self.queries += other.queries
+        self.query_seconds += other.query_seconds
+        self.response_bytes += other.response_bytes
+        for status, count in other.statuses.items():
+            self.statuses[status] = self.statuses.get(status, 0) + count
+
+
+class MetricsRegistry:
+    """Counters for this process, keyed by (route, method)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._flushed_at = 0.0
+        self.routes = {}
+
+    def _check_fork(self):
+        # A forked worker must not report the counters it inherited from its parent.
+        if os.getpid() != self._pid:
+            self._pid = os.getpid()
+            self._flushed_at = 0.0
+            self.routes = {}
+
+    def observe(self, route, method, status, seconds, queries=0, query_seconds=0.0, size=0):
+        with self._lock:
+            self._check_fork()
+            stats = self.routes.get((route, method))
+            if stats is None:
+                stats = self.routes[(route, method)] = RouteStats()
+            stats.observe(str(status), seconds, queries, query_seconds, size)
+
+    def reset(self):
+        with self._lock:
+            self.routes = {}
+
+    def dump(self):
+        with self._lock:
+            self._check_fork()
+            return {
+                "routes": [
+                    {"route": route, "method": method, **asdict(stats)} for (route, method), stats in self.routes.items()
+                ],
+                "connections": asdict(dbconnections.stats),
+            }
+
+    def flush(self, directory, force=False):
+        """Write this worker's counters to ``directory`` at most every METRICS_FLUSH_SECONDS."""
+        now = time.monotonic()
+        if not force and now - self._flushed_at < settings.METRICS_FLUSH_SECONDS:
+            return
+        self._flushed_at = now
+        path = os.path.join(directory, f"metrics-{os.getpid()}.json")
+        temporary = f"{path}.{threading.get_ident()}.tmp"
+        with open(temporary, "w", encoding="utf-8") as handle:
+            json.dump(self.dump(), handle)
+        # Readers only ever see a complete file.
+        os.replace(temporary, path)
+
+
+registry = MetricsRegistry()
+
+
+def _count_query(execute, sql, params, many, context):
+    tally = _request_queries.get()
+    if tally is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        tally[0] += 1
+        tally[1] += time.perf_counter() - started
+
+
+def _install_query_counter(sender, connection, **kwargs):
+    if _count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_count_query)
+
+
+def instrument_queries():
+    """Count the queries, and their time, of every request on every database alias."""
+    connection_created.connect(_install_query_counter, dispatch_uid="onlinexam.metrics")
+
+
+def start_request():
+    tally = [0, 0.0]
+    return tally, _request_queries.set(tally)
+
+
+def finish_request(request, response, seconds, tally, token):
+    _request_queries.reset(token)
+    match = getattr(request, "resolver_match", None)
+    if response.streaming:
+        size = int(response.get("Content-Length", 0))
+    else:
+        size = len(response.content)
+    registry.observe(
+        match.route if match else UNMATCHED_ROUTE,
+        request.method,
+        response.status_code,
+        seconds,
+        queries=tally[0],
+        query_seconds=tally[1],
+        size=size,
+    )
+    if settings.METRICS_MULTIPROCESS_DIR:
+        registry.flush(settings.METRICS_MULTIPROCESS_DIR)
+
+
+def _flush_on_exit():
+    if settings.METRICS_MULTIPROCESS_DIR:
+        registry.flush(settings.METRICS_MULTIPROCESS_DIR, force=True)
+
+
+atexit.register(_flush_on_exit)
+
+
+def collect():
+    """Merged counters of every worker in multi-process mode, else of this one."""
+    directory = settings.METRICS_MULTIPROCESS_DIR
+    if not directory:
+        dumps = [registry.dump()]
+    else:
+        registry.flush(directory, force=True)
+        dumps = []
+        for path in glob.glob(os.path.join(directory, "metrics-*.json")):
+            with open(path, encoding="utf-8") as handle:
+                dumps.append(json.load(handle))
+
+    routes = {}
+    connections = dbconnections.ConnectionStats()
+    for dump in dumps:
+        for record in dump["routes"]:
+            key = (record.pop("route"), record.pop("method"))
+            routes.setdefault(key, RouteStats()).merge(RouteStats(**record))
+        for name, value in dump["connections"].items():
+            setattr(connections, name, getattr(connections, name) + value)
+    return routes, connections
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def render_prometheus(routes, connections):
+    """Prometheus text exposition format, version 0.0.4."""
+    lines = []
+
+    def family(name, kind, help_text):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+
+    ordered = sorted(routes.items())
+    family("http_requests_total", "counter", "Requests by route, method and status code.")
+    for (route, method), stats in ordered:
+        for status, count in sorted(stats.statuses.items()):
+            lines.append(f"http_requests_total{_labels(route=route, method=method, status=status)} {count}")
+
+    family("http_request_duration_seconds", "histogram", "Time spent in the middleware stack and view.")
+    for (route, method), stats in ordered:
+        cumulative = 0
+        for bound, count in zip((*LATENCY_BUCKETS, "+Inf"), stats.buckets):
+            cumulative += count
+            lines.append(
+                f"http_request_duration_seconds_bucket{_labels(route=route, method=method, le=bound)} {cumulative}"
+            )
+        lines.append(f"http_request_duration_seconds_sum{_labels(route=route, method=method)} {stats.duration_seconds}")
+        lines.append(f"http_request_duration_seconds_count{_labels(route=route, method=method)} {stats.requests}")
+
+    for name, attribute, help_text in (
+        ("http_request_db_queries_total", "queries", "Database queries run while serving requests."),
+        ("http_request_db_query_seconds_total", "query_seconds", "Time spent in database queries."),
+        ("http_response_size_bytes_total", "response_bytes", "Response body bytes, without streamed bodies."),
+    ):
+        family(name, "counter", help_text)
+        for (route, method), stats in ordered:
+            lines.append(f"{name}{_labels(route=route, method=method)} {getattr(stats, attribute)}")
+
+    for name, value, help_text in (
+        ("db_connection_requests_total", connections.requests, "Requests seen by the connection tracker."),
+        ("db_connections_reused_total", connections.reused, "Requests that reused an open database connection."),
+        ("db_connections_opened_total", connections.connects, "New database connections."),
+        ("db_connect_seconds_total", connections.connect_seconds, "Time spent opening database connections."),
+    ):
+        family(name, "counter", help_text)
+        lines.append(f"{name} {value}")
+
+    return "\n".join(lines) + "\n"
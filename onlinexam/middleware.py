@@ -1,10 +1,201 @@
-from .bootstrap import ensure_runtime_bootstrap
+import sys
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from . import metrics, profiling, slowqueries
+from .bootstrap import bootstrap_pending, ensure_runtime_bootstrap
+from .routers import PIN_COOKIE, replica_enabled, stop_tracking_writes, track_writes
 
 
 class EnsureSchemaMiddleware:
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
         ensure_runtime_bootstrap()
         return self.get_response(request)
+
+    async def __acall__(self, request):
+        # Only hop to a thread while there is bootstrap work left.
+        if bootstrap_pending():
+            await sync_to_async(ensure_runtime_bootstrap)()
+        return await self.get_response(request)
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """WhiteNoise that passes async requests on without a thread hop.
+
+    Only a request for a static file, which reads from disk, goes to a thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
+
+
+class PinPrimaryMiddleware:
+    """Pin a browser's reads to the primary for a short while after it writes."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        flag, token = track_writes()
+        try:
+            response = self.get_response(request)
+        finally:
+            stop_tracking_writes(token)
+        return self._pin(request, response, flag)
+
+    async def __acall__(self, request):
+        flag, token = track_writes()
+        try:
+            response = await self.get_response(request)
+        finally:
+            stop_tracking_writes(token)
+        return self._pin(request, response, flag)
+
+    def _pin(self, request, response, flag):
+        if replica_enabled() and (request.method not in ("GET", "HEAD", "OPTIONS") or flag["wrote"]):
+            response.set_cookie(
+                PIN_COOKIE,
+                "1",
+                max_age=settings.REPLICA_PIN_SECONDS,
+                secure=settings.SESSION_COOKIE_SECURE,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
+
+
+class RequestMetricsMiddleware:
+    """Per-route latency, query count and time, response size and status, served on /metrics."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        tally, token = metrics.start_request()
+        started = time.perf_counter()
+        response = self.get_response(request)
+        metrics.finish_request(request, response, time.perf_counter() - started, tally, token)
+        return response
+
+    async def __acall__(self, request):
+        tally, token = metrics.start_request()
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        metrics.finish_request(request, response, time.perf_counter() - started, tally, token)
+        return response
+
+
+class SlowQueryLogMiddleware:
+    """Make the current request visible to the slow query log, which names its view."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if settings.SLOW_QUERY_MS <= 0:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = slowqueries.start_request(request)
+        try:
+            return self.get_response(request)
+        finally:
+            slowqueries.finish_request(token)
+
+    async def __acall__(self, request):
+        token = slowqueries.start_request(request)
+        try:
+            return await self.get_response(request)
+        finally:
+            slowqueries.finish_request(token)
+
+
+class RequestProfilingMiddleware:
+    """Profile a single request for a staff user who sends a signed profiling token.
+
+    Requests without the token only pay for two ``META`` lookups.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = profiling.requested_token(request)
+        if token is None or not profiling.token_allows(request, token):
+            return self.get_response(request)
+        with profiling.profiled(request, sys._getframe()) as profile:
+            response = self.get_response(request)
+        return self._label(response, profile)
+
+    async def __acall__(self, request):
+        token = profiling.requested_token(request)
+        if token is None or not await sync_to_async(profiling.token_allows)(request, token):
+            return await self.get_response(request)
+        with profiling.profiled(request, sys._getframe()) as profile:
+            response = await self.get_response(request)
+        return self._label(response, profile)
+
+    def _label(self, response, profile):
+        response["X-Profile-Id"] = profile.name if profile else "busy"
+        return response
@@ -0,0 +1,246 @@
+import marshal
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core import signing
+from django.utils import timezone
+
+
+# ``?_profile=<token>`` or ``X-Profile: <token>`` asks for a profile.
+QUERY_FLAG = "_profile"
+HEADER = "HTTP_X_PROFILE"
+_SALT = "onlinexam.profiling"
+
+# Profiles are named <UTC timestamp>-<view>-<random>; anything else is not ours.
+PROFILE_NAME = re.compile(r"^\d{8}T\d{6}-[\w.-]+-[0-9a-f]{6}$")
+PROFILE_EXTENSIONS = ("prof", "folded")
+
+# One profiled request per worker at a time, which bounds the sampling cost.
+_busy = threading.Lock()
+
+
+def issue_token(user):
+    """Signed token that lets ``user`` profile their own requests until it expires."""
+    return signing.dumps(user.pk, salt=_SALT)
+
+
+def requested_token(request):
+    """The token of a profiling request, or ``None``; cheap enough to run on every request."""
+    token = request.META.get(HEADER)
+    if token:
+        return token
+    query = request.META.get("QUERY_STRING", "")
+    if f"{QUERY_FLAG}=" not in query:
+        return None
+    return request.GET.get(QUERY_FLAG)
+
+
+def token_allows(request, token):
+    """Whether ``token`` is unexpired, signed for the staff user making the request."""
+    user = request.user
+    if not (user.is_active and (user.is_staff or user.is_superuser)):
+        return False
+    try:
+        user_id = signing.loads(token, salt=_SALT, max_age=settings.PROFILE_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return False
+    return user_id == user.pk
+
+
+def _frame_key(frame):
+    code = frame.f_code
+    return code.co_filename, code.co_firstlineno, code.co_name
+
+
+class StackSampler(threading.Thread):
+    """Sample one thread's Python stack every ``interval`` seconds.
+
+    Only stacks that pass through ``anchor``, the frame that started the
+    profile, are kept, cut so they begin at it. On an event loop this drops
+    the samples taken while other requests' coroutines were running.
+    """
+
+    def __init__(self, thread_id, anchor, interval):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.anchor = anchor
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            keys = []
+            while frame is not None and frame is not self.anchor:
+                keys.append(_frame_key(frame))
+                frame = frame.f_back
+            if frame is self.anchor:
+                keys.append(_frame_key(frame))
+                self.stacks[tuple(reversed(keys))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def pstats_from_samples(stacks, interval, root):
+    """``pstats``-compatible stats for sampled ``stacks`` of frame keys, root first.
+
+    Times are sample counts times ``interval``; call counts are the number
+    of samples a function appeared in, not real calls.
+    """
+    stats = {root: [0, 0, 0.0, 0.0, {}]}
+    for stack, count in stacks.items():
+        seconds = count * interval
+        seen = set()
+        for depth, key in enumerate(stack):
+            entry = stats.setdefault(key, [0, 0, 0.0, 0.0, {}])
+            entry[1] += count
+            if key not in seen:
+                # Recursive frames count once towards cumulative time.
+                seen.add(key)
+                entry[0] += count
+                entry[3] += seconds
+            if depth == len(stack) - 1:
+                entry[2] += seconds
+            if depth:
+                caller = entry[4].setdefault(stack[depth - 1], [0, 0, 0.0, 0.0])
+                caller[0] += count
+                caller[1] += count
+                caller[2] += seconds if depth == len(stack) - 1 else 0.0
+                caller[3] += seconds
+    return {
+        key: (cc, nc, tt, ct, {caller: tuple(values) for caller, values in callers.items()})
+        for key, (cc, nc, tt, ct, callers) in stats.items()
+    }
+
+
+def folded_stacks(stacks):
+    """Collapsed-stack lines (``root;child;leaf count``) for flame graph tools."""
+    for stack, count in stacks.most_common():
+        frames = ";".join(f"{name} ({os.path.basename(filename)}:{line})" for filename, line, name in stack)
+        yield f"{frames} {count}\n"
+
+
+class RequestProfile:
+    """Stack samples of one request, taken on its own thread only.
+
+    cProfile is not used: on Python 3.12 it can record every thread of the
+    process, so concurrent requests of a threaded or ASGI worker would end
+    up in the profile. The ``.prof`` is built from the samples instead.
+    """
+
+    def __init__(self, anchor):
+        self.anchor_key = _frame_key(anchor)
+        self.sampler = StackSampler(threading.get_ident(), anchor, settings.PROFILE_SAMPLE_INTERVAL)
+        self.started = 0.0
+        self.seconds = 0.0
+        self.name = ""
+
+    def start(self):
+        self.started = time.perf_counter()
+        self.sampler.start()
+
+    def stop(self):
+        self.sampler.stop()
+        self.seconds = time.perf_counter() - self.started
+
+    def save(self, request):
+        """Write ``<name>.prof`` and ``<name>.folded`` to PROFILE_DIR and return the name."""
+        directory = settings.PROFILE_DIR
+        os.makedirs(directory, exist_ok=True)
+        match = getattr(request, "resolver_match", None)
+        view = re.sub(r"[^\w.-]", "_", match.view_name if match and match.view_name else "unmatched")
+        name = f"{timezone.now():%Y%m%dT%H%M%S}-{view}-{os.urandom(3).hex()}"
+        stacks = self.sampler.stacks
+        with open(os.path.join(directory, f"{name}.prof"), "wb") as handle:
+            marshal.dump(pstats_from_samples(stacks, self.sampler.interval, self.anchor_key), handle)
+        with open(os.path.join(directory, f"{name}.folded"), "w", encoding="utf-8") as handle:
+            handle.writelines(folded_stacks(stacks))
+        _prune()
+        return name
+
+
+@contextmanager
+def profiled(request, anchor):
+    """Profile the body of the ``with`` block and save it under ``profile.name``.
+
+    ``anchor`` is the caller's own frame; only work running beneath it is
+    recorded. Yields ``None``, and profiles nothing, while another request
+    of this worker is being profiled. Under ASGI, sync views run in the
+    thread pool, away from the anchor, and are not covered.
+    """
+    if not _busy.acquire(blocking=False):
+        yield None
+        return
+    try:
+        profile = RequestProfile(anchor)
+        profile.start()
+        try:
+            yield profile
+        finally:
+            profile.stop()
+        profile.name = profile.save(request)
+    finally:
+        _busy.release()
+
+
+@dataclass
+class StoredProfile:
+    name: str
+    view: str
+    created_at: datetime
+    size: int
+    has_folded: bool
+
+
+def stored_profiles():
+    """Saved profiles, newest first."""
+    directory = settings.PROFILE_DIR
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    profiles = []
+    for filename in names:
+        name, _, extension = filename.rpartition(".")
+        if extension != "prof" or not PROFILE_NAME.match(name):
+            continue
+        stamp, rest = name.split("-", 1)
+        profiles.append(
+            StoredProfile(
+                name=name,
+                view=rest.rsplit("-", 1)[0],
+                created_at=datetime.strptime(stamp, "%Y%m%dT%H%M%S").replace(tzinfo=dt_timezone.utc),
+                size=os.path.getsize(os.path.join(directory, filename)),
+                has_folded=os.path.exists(os.path.join(directory, f"{name}.folded")),
+            )
+        )
+    return sorted(profiles, key=lambda profile: profile.name, reverse=True)
+
+
+def profile_path(name, extension):
+    """Path of a stored profile file, or ``None`` for names this module did not write."""
+    if extension not in PROFILE_EXTENSIONS or not PROFILE_NAME.match(name):
+        return None
+    path = os.path.join(settings.PROFILE_DIR, f"{name}.{extension}")
+    return path if os.path.exists(path) else None
+
+
+def _prune():
+    # Keep the newest PROFILE_KEEP profiles; names sort by time.
+    for stale in stored_profiles()[settings.PROFILE_KEEP:]:
+        for extension in PROFILE_EXTENSIONS:
+            try:
+                os.remove(os.path.join(settings.PROFILE_DIR, f"{stale.name}.{extension}"))
+            except FileNotFoundError:
+                pass
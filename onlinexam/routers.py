@@ -0,0 +1,99 @@
+import logging
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+
+logger = logging.getLogger(__name__)
+
+REPLICA_ALIAS = "replica"
+# Set on a response after a POST, or a GET that wrote, so the same browser keeps
+# reading from the primary until the replica has caught up with its own writes.
+PIN_COOKIE = "pin_primary"
+
+_read_from_replica = ContextVar("read_from_replica", default=False)
+# Per-request flag set by PinPrimaryMiddleware. It is a mutable dict rather
+# than a bool so a write noted inside sync_to_async, which runs in a copy of
+# the context, is still seen by the middleware.
+_request_writes = ContextVar("request_writes", default=None)
+
+
+def replica_enabled():
+    return settings.READ_REPLICA_ENABLED and REPLICA_ALIAS in settings.DATABASES
+
+
+def track_writes():
+    """Start noting writes for the current request; returns ``(flag, token)``."""
+    flag = {"wrote": False}
+    return flag, _request_writes.set(flag)
+
+
+def stop_tracking_writes(token):
+    _request_writes.reset(token)
+
+
+def note_write():
+    """Pin the browser to the primary even though the current request is a GET.
+
+    For views that write on a safe method, e.g. submitting an exam with a GET
+    to calculate-marks; the page they redirect to must see the write.
+    """
+    flag = _request_writes.get()
+    if flag is not None:
+        flag["wrote"] = True
+
+
+def _replica_reachable():
+    try:
+        connections[REPLICA_ALIAS].ensure_connection()
+    except DatabaseError:
+        logger.warning("Read replica unavailable; serving reads from the primary.", exc_info=True)
+        return False
+    return True
+
+
+def use_replica(view_func):
+    """Serve the view's reads from the replica unless the browser is pinned to the primary."""
+
+    @wraps(view_func)
+    def _wrapped_view(request, *args, **kwargs):
+        if (
+            not replica_enabled()
+            or request.method != "GET"
+            or request.COOKIES.get(PIN_COOKIE)
+            or not _replica_reachable()
+        ):
+            return view_func(request, *args, **kwargs)
+        token = _read_from_replica.set(True)
+        try:
+            return view_func(request, *args, **kwargs)
+        finally:
+            _read_from_replica.reset(token)
+
+    return _wrapped_view
+
+
+class ReplicaRouter:
+    """Writes and migrations always use the primary; reads only move inside ``use_replica`` views."""
+
+    def db_for_read(self, model, **hints):
+        if _read_from_replica.get():
+            return REPLICA_ALIAS
+        return None
+
+    def db_for_write(self, model, **hints):
+        # Explicit, so saving an object that was loaded from the replica still
+        # writes to the primary.
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica is never migrated directly in production (``migrate`` only
+        # targets the default alias), but the test replica needs the schema.
+        return True
+
@@ -68,15 +68,20 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "onlinexam.middleware.RequestMetricsMiddleware",
+    "onlinexam.middleware.SlowQueryLogMiddleware",
     "django.middleware.security.SecurityMiddleware",
-    "whitenoise.middleware.WhiteNoiseMiddleware",
+    # WhiteNoise, made async-capable so ASGI requests stay off threads.
+    "onlinexam.middleware.StaticFilesMiddleware",
     "onlinexam.middleware.EnsureSchemaMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "onlinexam.middleware.RequestProfilingMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "onlinexam.middleware.PinPrimaryMiddleware",
 ]
 
 CSRF_COOKIE_SECURE = not DEBUG
@@ -118,6 +123,19 @@ def _get_database_url():
     return None
 
 
+# Database connections. A serverless function is frozen between invocations, so
+# a persistent connection only idles on the server until it times out. There each
+# request opens a short-lived connection, normally through the provider's
+# transaction pooler (PgBouncer), which cannot keep server-side cursors open
+# across transactions. Long-lived gunicorn/uvicorn workers keep their connection
+# and ping it before reuse.
+DATABASE_CONNECTION_MODE = os.getenv(
+    "DATABASE_CONNECTION_MODE", "serverless" if RUNNING_ON_VERCEL else "persistent"
+)
+if DATABASE_CONNECTION_MODE not in ("serverless", "persistent"):
+    raise ImproperlyConfigured("DATABASE_CONNECTION_MODE must be 'serverless' or 'persistent'.")
+SERVERLESS_DATABASE = DATABASE_CONNECTION_MODE == "serverless"
+
 # Database
 database_url = _get_database_url()
 if database_url:
@@ -125,7 +143,9 @@ if database_url:
     DATABASES = {
         "default": dj_database_url.parse(
             database_url,
-            conn_max_age=600,
+            conn_max_age=0 if SERVERLESS_DATABASE else int(os.getenv("DATABASE_CONN_MAX_AGE", 600)),
+            conn_health_checks=not SERVERLESS_DATABASE,
+            disable_server_side_cursors=SERVERLESS_DATABASE,
             ssl_require=ssl_required,
         )
     }
@@ -137,15 +157,127 @@ else:
         "default": {
             "ENGINE": "django.db.backends.sqlite3",
             "NAME": os.path.join(BASE_DIR, "db.sqlite3"),
+            # A file rather than the shared-cache in-memory default, so tests
+            # that start several threads get SQLite's file locking, which waits
+            # for the writer, instead of failing with "table is locked".
+            "TEST": {"NAME": os.path.join(BASE_DIR, "test_db.sqlite3")},
         }
     }
 
+# Read replica for dashboards, results, exports and reports (onlinexam.routers).
+# Live exam traffic always uses the primary, and without DATABASE_REPLICA_URL
+# every read does too. With SQLite a second database file is declared so the
+# routing tests have a replica to read from.
+replica_url = os.getenv("DATABASE_REPLICA_URL")
+if replica_url:
+    DATABASES["replica"] = dj_database_url.parse(
+        replica_url,
+        conn_max_age=0 if SERVERLESS_DATABASE else int(os.getenv("DATABASE_CONN_MAX_AGE", 600)),
+        conn_health_checks=not SERVERLESS_DATABASE,
+        disable_server_side_cursors=SERVERLESS_DATABASE,
+        ssl_require=not DEBUG and replica_url.startswith(("postgres://", "postgresql://")),
+    )
+elif DATABASES["default"]["ENGINE"] == "django.db.backends.sqlite3":
+    DATABASES["replica"] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": os.path.join(BASE_DIR, "db_replica.sqlite3"),
+    }
+READ_REPLICA_ENABLED = bool(replica_url)
+
+DATABASE_ROUTERS = ["onlinexam.routers.ReplicaRouter"]
+# How long a browser keeps reading from the primary after it submits a form.
+REPLICA_PIN_SECONDS = int(os.getenv("REPLICA_PIN_SECONDS", 15))
+
 if RUNNING_ON_VERCEL and not database_url:
     raise ImproperlyConfigured(
         "A PostgreSQL connection string is required on Vercel. "
         "Set DATABASE_URL or POSTGRES_URL in the Production environment."
     )
 
+# Cache: shared counters for live monitoring and proctoring rate limits.
+# Multi-worker deployments should point REDIS_URL at a shared Redis instance.
+REDIS_URL = os.getenv("REDIS_URL", "")
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# Course-list fragments are keyed by a catalogue version bumped on every Course
+# or Question change. A per-process LocMem cache only sees its own bumps, so
+# without a shared cache fragments expire quickly instead.
+CATALOG_FRAGMENT_TIMEOUT = int(os.getenv("CATALOG_FRAGMENT_TIMEOUT", 60 * 60 * 24 if REDIS_URL else 60))
+
+# Per-question dwell statistics decode every timeline of a course, archived ones
+# included, so they are cached; grading a session clears its course's entry.
+# Without a shared cache other workers only see that after the timeout.
+DWELL_STATS_TIMEOUT = int(os.getenv("DWELL_STATS_TIMEOUT", 60 * 60 if REDIS_URL else 5 * 60))
+
+# Sessions: with a shared cache, reads come from Redis and only writes reach the
+# database. A per-process LocMem cache could serve stale sessions across
+# workers, so plain database sessions stay the default without REDIS_URL.
+SESSION_ENGINE = os.getenv(
+    "SESSION_ENGINE",
+    "django.contrib.sessions.backends.cached_db" if REDIS_URL else "django.contrib.sessions.backends.db",
+)
+
+# Answered-question counters for the live monitor live in the cache. With a
+# per-process LocMem cache each worker would show its own counts, so without
+# a shared cache the monitor counts the answers in the database instead.
+LIVE_MONITOR_CACHE = os.getenv("LIVE_MONITOR_CACHE", str(bool(REDIS_URL))).lower() == "true"
+LIVE_MONITOR_INTERVAL = int(os.getenv("LIVE_MONITOR_INTERVAL", 5))
+LIVE_MONITOR_MAX_TICKS = int(os.getenv("LIVE_MONITOR_MAX_TICKS", 120))
+# Autosave and the exam clock read a session's deadline and completion from the
+# cache. Grading clears that record only in the grading worker's cache, so a
+# per-process LocMem cache would let other workers keep accepting answers;
+# without a shared cache they read the session row instead.
+EXAM_CLOCK_CACHE = os.getenv("EXAM_CLOCK_CACHE", str(bool(REDIS_URL))).lower() == "true"
+# Seconds an autosave may arrive after a session's end_time before it is refused.
+EXAM_DEADLINE_GRACE_SECONDS = int(os.getenv("EXAM_DEADLINE_GRACE_SECONDS", 5))
+# Completed sessions older than this move to compressed archive files (archive_sessions).
+EXAM_ARCHIVE_AFTER_DAYS = int(os.getenv("EXAM_ARCHIVE_AFTER_DAYS", 180))
+
+# Request metrics, scraped from /metrics in Prometheus text format. Each worker
+# counts in memory; with several gunicorn workers, point METRICS_MULTIPROCESS_DIR
+# at a directory they share and the endpoint merges every worker's counters.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "True").lower() == "true"
+METRICS_MULTIPROCESS_DIR = os.getenv("METRICS_MULTIPROCESS_DIR", "")
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", 5))
+# Scrapers send "Authorization: Bearer <token>"; without a token only staff may read.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# Queries slower than SLOW_QUERY_MS are written, one JSON object per line, to a
+# rotating log read by the admin slow query page; 0 turns the log off. A sample
+# of slow SELECTs also records the EXPLAIN plan. Each gunicorn worker rotates on
+# its own, so give workers separate files if they share a disk.
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", 200))
+SLOW_QUERY_EXPLAIN_SAMPLE = float(os.getenv("SLOW_QUERY_EXPLAIN_SAMPLE", 0.1))
+SLOW_QUERY_LOG = os.getenv(
+    "SLOW_QUERY_LOG",
+    "/tmp/onlinexam/slow_queries.log" if RUNNING_ON_VERCEL else os.path.join(BASE_DIR, "logs", "slow_queries.log"),
+)
+SLOW_QUERY_LOG_MAX_BYTES = int(os.getenv("SLOW_QUERY_LOG_MAX_BYTES", 5 * 1024 * 1024))
+SLOW_QUERY_LOG_BACKUPS = int(os.getenv("SLOW_QUERY_LOG_BACKUPS", 3))
+
+# Staff can profile one request by adding ?_profile=<token> or an X-Profile
+# header with a signed token from the admin profiling page. The newest
+# PROFILE_KEEP profiles are kept as .prof (pstats) and .folded files, both built
+# from stack samples of the request's own thread.
+PROFILE_DIR = os.getenv(
+    "PROFILE_DIR", "/tmp/onlinexam/profiles" if RUNNING_ON_VERCEL else os.path.join(BASE_DIR, "profiles")
+)
+PROFILE_TOKEN_MAX_AGE = int(os.getenv("PROFILE_TOKEN_MAX_AGE", 60 * 60))
+PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", 0.001))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", 50))
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -206,3 +338,9 @@ if EMAIL_HOST_USER and EMAIL_HOST_PASSWORD:
     EMAIL_PORT = 587
 else:
     EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
+
+# Outgoing mail is queued in the outbox and delivered by `manage.py send_outbox`.
+# For local runs, EMAIL_BACKEND=django.core.mail.backends.filebased.EmailBackend
+# writes each message to EMAIL_FILE_PATH instead.
+EMAIL_BACKEND = os.getenv("EMAIL_BACKEND", EMAIL_BACKEND)
+EMAIL_FILE_PATH = os.getenv("EMAIL_FILE_PATH", os.path.join(BASE_DIR, "sent_emails"))
@@ -0,0 +1,201 @@
+import glob
+import json
+import logging
+import os
+import random
+import threading
+import time
+import traceback
+from contextlib import closing
+from contextvars import ContextVar
+from logging.handlers import RotatingFileHandler
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.db.backends.signals import connection_created
+from django.utils import timezone
+
+
+logger = logging.getLogger(__name__)
+
+# Label for queries run outside a request: management commands, workers, shells.
+NO_REQUEST = "<no request>"
+
+_current_request = ContextVar("slow_query_request", default=None)
+_handler_lock = threading.Lock()
+_handler = None
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Execute wrappers sit between the caller and the driver; they are never the origin.
+_INSTRUMENTATION = {
+    os.path.abspath(__file__),
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "metrics.py"),
+}
+
+
+def _log_handler():
+    """The rotating file handler for SLOW_QUERY_LOG, reopened if its settings change."""
+    global _handler
+    path = os.path.abspath(settings.SLOW_QUERY_LOG)
+    max_bytes, backups = settings.SLOW_QUERY_LOG_MAX_BYTES, settings.SLOW_QUERY_LOG_BACKUPS
+    with _handler_lock:
+        if _handler is None or (_handler.baseFilename, _handler.maxBytes, _handler.backupCount) != (
+            path,
+            max_bytes,
+            backups,
+        ):
+            if _handler is not None:
+                _handler.close()
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            _handler = RotatingFileHandler(
+                path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8", delay=True
+            )
+            _handler.setFormatter(logging.Formatter("%(message)s"))
+        return _handler
+
+
+def _origin():
+    request = _current_request.get()
+    if request is None:
+        return NO_REQUEST
+    match = getattr(request, "resolver_match", None)
+    # Session and auth middleware query before URL resolution.
+    return (match.view_name or match.route) if match else f"{request.method} {request.path}"
+
+
+def _location():
+    """``file:line in function`` of the innermost project frame that ran the query."""
+    for frame in reversed(traceback.extract_stack()):
+        filename = os.path.abspath(frame.filename)
+        if filename in _INSTRUMENTATION or not filename.startswith(_PROJECT_ROOT) or "site-packages" in filename:
+            continue
+        return f"{os.path.relpath(filename, _PROJECT_ROOT)}:{frame.lineno} in {frame.name}"
+    return ""
+
+
+def _explain(connection, sql, params):
+    # A fresh backend cursor bypasses the execute wrappers, so EXPLAIN is
+    # neither timed nor logged itself and the caller's cursor keeps its rows.
+    # Driver cursors raise the driver's own errors, not Django's; the
+    # savepoint keeps a failed EXPLAIN from aborting the caller's transaction.
+    savepoint = connection.savepoint()
+    try:
+        with closing(connection.create_cursor()) as cursor:
+            cursor.execute(f"{connection.ops.explain_query_prefix()} {sql}", params)
+            plan = "\n".join(" ".join(str(column) for column in row) for row in cursor.fetchall())
+    except (connection.Database.Error, DatabaseError) as exc:
+        if savepoint:
+            connection.savepoint_rollback(savepoint)
+        return f"EXPLAIN failed: {exc}"
+    if savepoint:
+        connection.savepoint_commit(savepoint)
+    return plan
+
+
+def _record(connection, sql, params, elapsed_ms):
+    entry = {
+        "at": timezone.now().isoformat(),
+        "ms": round(elapsed_ms, 2),
+        "database": connection.alias,
+        "view": _origin(),
+        "location": _location(),
+        "sql": sql,
+    }
+    # EXPLAIN only ever reads, and only SELECTs are worth a plan.
+    if (
+        sql.lstrip()[:6].upper() == "SELECT"
+        and not connection.needs_rollback
+        and random.random() < settings.SLOW_QUERY_EXPLAIN_SAMPLE
+    ):
+        entry["explain"] = _explain(connection, sql, params)
+    handler = _log_handler()
+    handler.handle(logger.makeRecord(logger.name, logging.INFO, __file__, 0, json.dumps(entry), None, None))
+
+
+def _log_slow_query(execute, sql, params, many, context):
+    started = time.perf_counter()
+    result = execute(sql, params, many, context)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if elapsed_ms >= settings.SLOW_QUERY_MS and not many:
+        try:
+            _record(context["connection"], sql, params, elapsed_ms)
+        except OSError:
+            # A full disk must not fail the request that ran the query.
+            logger.warning("Could not write the slow query log.", exc_info=True)
+    return result
+
+
+def _install_slow_query_log(sender, connection, **kwargs):
+    if _log_slow_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_log_slow_query)
+
+
+def instrument_slow_queries():
+    """Log queries slower than SLOW_QUERY_MS on every database alias; 0 turns it off."""
+    if settings.SLOW_QUERY_MS > 0:
+        connection_created.connect(_install_slow_query_log, dispatch_uid="onlinexam.slowqueries")
+
+
+def start_request(request):
+    return _current_request.set(request)
+
+
+def finish_request(token):
+    _current_request.reset(token)
+
+
+def read_entries():
+    """Every entry in the slow query log and its rotated backups, oldest file first."""
+    path = settings.SLOW_QUERY_LOG
+    entries = []
+    for name in sorted(glob.glob(f"{glob.escape(path)}*"), key=lambda name: (len(name), name), reverse=True):
+        try:
+            with open(name, encoding="utf-8") as handle:
+                for line in handle:
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        # A line cut short by a crash or a concurrent rotation.
+                        continue
+        except OSError:
+            continue
+    return entries
+
+
+def top_offenders(entries, limit=50):
+    """Queries grouped by SQL and view, most total time first.
+
+    Parameters are not part of the SQL Django logs, so every call of one
+    query shape lands in the same group.
+    """
+    groups = {}
+    for entry in entries:
+        key = (entry["sql"], entry["view"])
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = {
+                "sql": entry["sql"],
+                "view": entry["view"],
+                "database": entry.get("database", ""),
+                "count": 0,
+                "total_ms": 0.0,
+                "max_ms": 0.0,
+                "locations": set(),
+                "last_seen": "",
+                "explain": "",
+            }
+        group["count"] += 1
+        group["total_ms"] += entry["ms"]
+        group["max_ms"] = max(group["max_ms"], entry["ms"])
+        if entry.get("location"):
+            group["locations"].add(entry["location"])
+        # Entries are read in the order they were written, so the latest wins.
+        group["last_seen"] = entry["at"]
+        group["explain"] = entry.get("explain") or group["explain"]
+
+    ranked = sorted(groups.values(), key=lambda group: group["total_ms"], reverse=True)[:limit]
+    for group in ranked:
+        group["total_ms"] = round(group["total_ms"], 2)
+        group["mean_ms"] = round(group["total_ms"] / group["count"], 2)
+        group["locations"] = sorted(group["locations"])
+    return ranked
@@ -6,6 +6,7 @@ from exam import views
 
 urlpatterns = [
     path("health", views.health_check_view, name="health"),
+    path("metrics", views.metrics_view, name="metrics"),
     path('admin/', admin.site.urls),
     path('teacher/', include('teacher.urls')),
     path('student/', include('student.urls')),
@@ -20,12 +21,21 @@ urlpatterns = [
     path('admin-dashboard', views.admin_dashboard_view, name='admin-dashboard'),
     path('admin-results', views.admin_results_view, name='admin-results'),
     path('delete-result/<int:pk>', views.delete_result_view, name='delete-result'),
+    path('admin-analytics', views.admin_analytics_view, name='admin-analytics'),
+    path('admin-collusion-report', views.admin_collusion_report_view, name='admin-collusion-report'),
+    path('admin-live-monitor/<int:pk>', views.admin_live_monitor_view, name='admin-live-monitor'),
+    path('admin-live-monitor-stream/<int:pk>', views.admin_live_monitor_stream_view, name='admin-live-monitor-stream'),
+    path('admin-connection-metrics', views.admin_connection_metrics_view, name='admin-connection-metrics'),
+    path('admin-slow-queries', views.admin_slow_queries_view, name='admin-slow-queries'),
+    path('admin-profiles', views.admin_profiles_view, name='admin-profiles'),
+    path('admin-profile/<str:name>.<str:extension>', views.admin_download_profile_view, name='admin-download-profile'),
 
     path('admin-export-results-csv', views.admin_export_results_csv_view, name='admin-export-results-csv'),
     path('admin-export-results-excel', views.admin_export_results_excel_view, name='admin-export-results-excel'),
     path('admin-export-students-csv', views.admin_export_students_csv_view, name='admin-export-students-csv'),
     path('admin-export-teachers-csv', views.admin_export_teachers_csv_view, name='admin-export-teachers-csv'),
     path('admin-export-courses-csv', views.admin_export_courses_csv_view, name='admin-export-courses-csv'),
+    path('admin-export-analytics-csv', views.admin_export_analytics_csv_view, name='admin-export-analytics-csv'),
 
     path('admin-teacher', views.admin_teacher_view, name='admin-teacher'),
     path('admin-view-teacher', views.admin_view_teacher_view, name='admin-view-teacher'),
@@ -60,5 +70,7 @@ urlpatterns = [
     # V2.0 Exam Engine
     path('take-exam/<int:pk>', views.take_exam_view, name='take-exam'),
     path('submit-answer-htmx', views.submit_answer_htmx_view, name='submit-answer-htmx'),
+    path('exam-clock/<int:session_id>', views.exam_clock_view, name='exam-clock'),
     path('proctor-event-htmx', views.proctor_event_htmx_view, name='proctor-event-htmx'),
+    path('timeline-events-htmx', views.timeline_events_htmx_view, name='timeline-events-htmx'),
 ]
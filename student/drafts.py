@@ -0,0 +1,28 @@
+"""Autosaved answers, kept as one StudentAnswer row per question of the open attempt.
+
+A save writes one row of the attempt's ExamSession instead of re-serialising
+``request.session`` with every earlier answer, and the rows outlive any cache.
+"""
+from exam.live import note_answer
+from exam.models import StudentAnswer
+
+
+def save_draft(session, question, option):
+    _, created = StudentAnswer.objects.update_or_create(
+        session=session,
+        question=question,
+        defaults={"selected_option": option, "is_correct": question.is_correct_answer(option)},
+    )
+    if created:
+        note_answer(session.pk)
+
+
+def load_drafts(session):
+    """``{question_id: option}`` for the answers saved so far, as the exam engine posts them."""
+    drafts = {}
+    for question_id, option in session.answers.values_list("question_id", "selected_option"):
+        # The classic page posts "Option2"; the engine page uses bare numbers.
+        if option and option.startswith("Option") and option[6:].isdigit():
+            option = option[6:]
+        drafts[str(question_id)] = option
+    return drafts
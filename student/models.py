@@ -1,6 +1,10 @@
 from django.contrib.auth.models import User
 from django.core.validators import MaxValueValidator, MinValueValidator, RegexValidator
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from exam.images import delete_thumbnails, refresh_profile_thumbnails
 
 nigerian_phone_validator = RegexValidator(
     regex=r"^(\+234|0)[789][01]\d{8}$",
@@ -41,6 +45,8 @@ class Student(models.Model):
     registration_status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="ACTIVE")
     bio = models.TextField(max_length=500, blank=True)
     profile_pic = models.ImageField(upload_to="profile_pic/Student/", null=True, blank=True)
+    # Thumbnail paths by size and format, see exam.images.render_square_thumbnails().
+    profile_pic_variants = models.JSONField(default=dict, blank=True, editable=False)
     address = models.CharField(max_length=160, blank=True)
     mobile = models.CharField(max_length=20, validators=[nigerian_phone_validator], null=False)
     
@@ -53,3 +59,13 @@ class Student(models.Model):
 
     def __str__(self):
         return f"{self.user.username} ({self.matric_number})"
+
+
+@receiver(post_save, sender=Student)
+def build_student_thumbnails(sender, instance, **kwargs):
+    refresh_profile_thumbnails(instance)
+
+
+@receiver(post_delete, sender=Student)
+def delete_student_thumbnails(sender, instance, **kwargs):
+    delete_thumbnails(instance.profile_pic_variants)
@@ -1,11 +1,20 @@
 import json
+from datetime import timedelta
 from decimal import Decimal
+from unittest import mock
 
 from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 
-from exam.models import Course, Question, Result
+from exam.admission import AdmissionTicket, issue_ticket, read_ticket, reserve_slot
+from exam.attempts import ExamWindowClosed, open_session
+from exam.models import Course, ExamSession, Question, Result
+from student.drafts import load_drafts
 from student.forms import StudentForm
 from student.models import Student
 
@@ -182,7 +191,8 @@ class ExamScoringTests(TestCase):
         self.assertEqual(response.status_code, 302)
         self.assertEqual(response.url, reverse("student-exam"))
 
-    def test_ajax_save_answer_persists_in_session(self):
+    def test_ajax_save_answer_persists_to_the_open_attempt(self):
+        session, _ = open_session(self.student, self.course)
         self.client.force_login(self.user)
 
         response = self.client.post(
@@ -197,6 +207,122 @@ class ExamScoringTests(TestCase):
 
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.json()["status"], "success")
+        self.assertEqual(load_drafts(session), {str(self.question_1.id): "3"})
+        self.assertNotIn(f"exam_{self.course.id}_saved_answers", self.client.session)
 
-        session_key = f"exam_{self.course.id}_saved_answers"
-        self.assertEqual(self.client.session[session_key][str(self.question_1.id)], "Option3")
+        # Drafts survive a cold cache and come back with the exam page.
+        cache.clear()
+        page = self.client.get(reverse("take-exam", args=[self.course.id]))
+        self.assertEqual(page.context["saved_answers"], {str(self.question_1.id): "3"})
+
+    def test_ajax_save_answer_needs_an_open_attempt(self):
+        self.client.force_login(self.user)
+
+        response = self.client.post(
+            reverse("ajax-save-answer"),
+            data=json.dumps({"course_id": self.course.id, "question_id": self.question_1.id, "option": "Option1"}),
+            content_type="application/json",
+        )
+
+        self.assertEqual(response.status_code, 409)
+
+    def test_ajax_save_answer_does_not_rewrite_the_session(self):
+        open_session(self.student, self.course)
+        self.client.force_login(self.user)
+        session_key = self.client.session.session_key
+
+        with CaptureQueriesContext(connection) as context:
+            for question in (self.question_1, self.question_2):
+                self.client.post(
+                    reverse("ajax-save-answer"),
+                    data=json.dumps({"course_id": self.course.id, "question_id": question.id, "option": "Option1"}),
+                    content_type="application/json",
+                )
+
+        self.assertFalse([query for query in context.captured_queries if "UPDATE \"django_session\"" in query["sql"]])
+        self.assertEqual(self.client.session.session_key, session_key)
+
+
+class AdmissionControlTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="queued_student", password="pass12345")
+        Group.objects.get_or_create(name="STUDENT")[0].user_set.add(self.user)
+        Student.objects.create(
+            user=self.user,
+            matric_number="UNN/2025/80001",
+            institutional_email="queued@unn.edu.ng",
+            mobile="08031234567",
+        )
+        self.opens_at = (timezone.now() + timedelta(minutes=5)).replace(microsecond=0)
+        self.course = Course.objects.create(
+            course_name="Engineering Drawing",
+            window_opens_at=self.opens_at,
+            admission_rate=2,
+            is_published=True,
+        )
+        self.client.force_login(self.user)
+
+    def test_slots_are_staggered_at_the_admission_rate_from_window_opening(self):
+        admit_times = [reserve_slot(self.course) for _ in range(5)]
+
+        offsets = [(admit_at - self.opens_at).total_seconds() for admit_at in admit_times]
+        self.assertEqual(offsets, sorted(offsets))
+        self.assertTrue(all(offset >= 0 for offset in offsets))
+        self.assertGreaterEqual(offsets[-1], 1.5)
+        self.assertLess(offsets[-1], 3)
+
+    def test_early_candidate_gets_ticket_and_waiting_room_without_session(self):
+        response = self.client.get(reverse("start-exam", args=[self.course.id]))
+
+        self.assertEqual(response.status_code, 302)
+        self.assertIn("ticket=", response.url)
+
+        waiting = self.client.get(response.url)
+
+        self.assertEqual(waiting.status_code, 200)
+        self.assertTemplateUsed(waiting, "student/exam_waiting_room.html")
+        self.assertFalse(ExamSession.objects.filter(course=self.course).exists())
+
+    def test_status_poll_reads_only_the_signed_ticket(self):
+        token = issue_ticket(self.course, self.user)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("admission-status", args=[self.course.id]), {"ticket": token})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.json()["ready"])
+        self.assertGreater(response.json()["seconds_to_wait"], 0)
+
+    def test_ticket_is_bound_to_course_and_user(self):
+        token = issue_ticket(self.course, self.user)
+
+        self.assertIsNotNone(read_ticket(token, self.course.id, self.user.id))
+        self.assertIsNone(read_ticket(token, self.course.id + 1, self.user.id))
+        self.assertIsNone(read_ticket(token, self.course.id, self.user.id + 1))
+        self.assertIsNone(read_ticket(token + "x", self.course.id, self.user.id))
+
+    def test_closed_window_blocks_new_sessions(self):
+        self.course.window_opens_at = timezone.now() - timedelta(hours=2)
+        self.course.window_closes_at = timezone.now() - timedelta(hours=1)
+        self.course.save()
+
+        response = self.client.get(reverse("start-exam", args=[self.course.id]))
+
+        self.assertRedirects(response, reverse("student-exam"), fetch_redirect_response=False)
+        engine = self.client.get(reverse("take-exam", args=[self.course.id]))
+        self.assertRedirects(engine, reverse("student-exam"), fetch_redirect_response=False)
+        self.assertFalse(ExamSession.objects.filter(course=self.course).exists())
+
+    def test_engine_route_applies_the_admission_queue(self):
+        response = self.client.get(reverse("take-exam", args=[self.course.id]))
+
+        self.assertEqual(response.status_code, 302)
+        self.assertIn("ticket=", response.url)
+        self.assertTemplateUsed(self.client.get(response.url), "student/exam_waiting_room.html")
+        # A ticket that is ready early still cannot open a session before the window.
+        with mock.patch("exam.views.read_ticket", return_value=AdmissionTicket(self.course.id, self.user.id, timezone.now())):
+            self.client.get(reverse("take-exam", args=[self.course.id]), {"ticket": "forged"})
+        self.assertFalse(ExamSession.objects.filter(course=self.course).exists())
+        with self.assertRaises(ExamWindowClosed):
+            open_session(Student.objects.get(user=self.user), self.course)
@@ -10,8 +10,10 @@ path('student-dashboard', views.student_dashboard_view,name='student-dashboard')
 path('student-exam', views.student_exam_view,name='student-exam'),
 path('take-exam/<int:pk>', views.take_exam_view,name='take-exam'),
 path('start-exam/<int:pk>', views.start_exam_view,name='start-exam'),
+path('admission-status/<int:pk>', views.admission_status_view,name='admission-status'),
 
     path("calculate-marks", views.calculate_marks_view, name="calculate-marks"),
+    path("calculate-marks/<int:pk>", views.calculate_marks_view, name="calculate-marks"),
     path("ajax-save-answer", views.ajax_save_answer_view, name="ajax-save-answer"),
     path("view-result", views.view_result_view, name="view-result"),
 path('check-marks/<int:pk>', views.check_marks_view,name='check-marks'),
@@ -1,18 +1,24 @@
 import json
 import random
-from datetime import timedelta
-from decimal import Decimal, ROUND_HALF_UP
+from decimal import Decimal
 
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth.models import Group
-from django.http import HttpResponseRedirect, JsonResponse
+from django.db.models import Avg
+from django.http import Http404, HttpResponseRedirect, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.utils import timezone
 
 from exam import models as QMODEL
+from exam.admission import read_ticket
+from exam.catalog import catalog_context
+from exam.conditional import catalog_etag, conditional_page, student_marks_etag
+from exam.grading import grade_session
+from onlinexam.routers import use_replica
 
 from . import forms, models
+from .drafts import save_draft
 
 
 def is_student(user):
@@ -30,11 +36,13 @@ def ajax_save_answer_view(request):
             selected_ans = data.get("option")
 
             if course_id and question_id:
-                session_key = _exam_session_key(course_id, "saved_answers")
-                saved_answers = request.session.get(session_key, {})
-                saved_answers[str(question_id)] = selected_ans
-                request.session[session_key] = saved_answers
-                request.session.modified = True
+                session = QMODEL.ExamSession.objects.filter(
+                    student__user_id=request.user.id, course_id=course_id, is_completed=False
+                ).first()
+                if session is None or timezone.now() > session.end_time:
+                    return JsonResponse({"status": "error", "message": "No open exam attempt"}, status=409)
+                question = get_object_or_404(QMODEL.Question, id=question_id, course_id=course_id)
+                save_draft(session, question, selected_ans)
                 return JsonResponse({"status": "success"})
             return JsonResponse({"status": "error", "message": "Missing course_id or question_id"}, status=400)
         except json.JSONDecodeError:
@@ -79,23 +87,12 @@ def student_signup_view(request):
     )
 
 
-def _exam_session_key(course_id, field):
-    return f"exam_{course_id}_{field}"
-
-
-def _clear_exam_session(request, course_id):
-    request.session.pop(_exam_session_key(course_id, "question_ids"), None)
-    request.session.pop(_exam_session_key(course_id, "started_at"), None)
-    request.session.pop(_exam_session_key(course_id, "saved_answers"), None)
-
-
-
-
 @login_required(login_url="studentlogin")
 @user_passes_test(is_student, login_url="studentlogin")
+@use_replica
 def student_dashboard_view(request):
     student = get_object_or_404(models.Student, user_id=request.user.id)
-    recent_results = QMODEL.Result.objects.filter(student=student).order_by("-date")[:10]
+    recent_results = QMODEL.Result.objects.filter(student=student).select_related("exam").order_by("-date")[:10]
 
     # Prepare data for performance chart (ordered by date ascending for the chart)
     perf_results = list(reversed(recent_results))
@@ -103,11 +100,10 @@ def student_dashboard_view(request):
     chart_data = [float(r.percentage) for r in perf_results]
 
     # Calculate average performance for the new tile
-    all_results = QMODEL.Result.objects.filter(student=student)
+    average = QMODEL.Result.objects.filter(student=student).aggregate(average=Avg("percentage"))["average"]
     avg_perf = 0
-    if all_results.exists():
-        avg_perf = sum(r.percentage for r in all_results) / all_results.count()
-        avg_perf = float(avg_perf.quantize(Decimal("0.1")))
+    if average is not None:
+        avg_perf = float(Decimal(average).quantize(Decimal("0.1")))
 
     context = {
         "total_course": QMODEL.Course.objects.filter(is_published=True).count(),
@@ -121,9 +117,10 @@ def student_dashboard_view(request):
 
 @login_required(login_url="studentlogin")
 @user_passes_test(is_student, login_url="studentlogin")
+@conditional_page(catalog_etag)
 def student_exam_view(request):
     courses = QMODEL.Course.objects.filter(is_published=True)
-    return render(request, "student/student_exam.html", {"courses": courses})
+    return render(request, "student/student_exam.html", catalog_context(courses))
 
 @login_required(login_url="studentlogin")
 @user_passes_test(is_student, login_url="studentlogin")
@@ -151,10 +148,28 @@ def take_exam_view(request, pk):
 @login_required(login_url="studentlogin")
 @user_passes_test(is_student, login_url="studentlogin")
 def start_exam_view(request, pk):
-    """V2.0 Start/Resume: Redirects to the HTMX Engine"""
+    """V2.0 Start/Resume: Redirects to the HTMX Engine, which applies the exam window and admission queue"""
     from exam.views import take_exam_view as v2_engine
+
     return v2_engine(request, pk)
 
+
+def admission_status_view(request, pk):
+    """Polled by the waiting room; answers from the signed ticket alone, without touching the database."""
+    ticket = read_ticket(request.GET.get("ticket"), pk)
+    if ticket is None:
+        return JsonResponse({"status": "error", "message": "Invalid admission ticket"}, status=400)
+
+    seconds_to_wait = ticket.seconds_to_wait()
+    return JsonResponse(
+        {
+            "status": "success",
+            "ready": seconds_to_wait <= 0,
+            "seconds_to_wait": round(seconds_to_wait, 1),
+            "server_time": timezone.now().isoformat(),
+        }
+    )
+
 @login_required(login_url="studentlogin")
 @user_passes_test(is_student, login_url="studentlogin")
 def calculate_marks_view(request, pk=None):
@@ -162,202 +177,40 @@ def calculate_marks_view(request, pk=None):
     course_id = pk or request.POST.get("course_id")
     course = get_object_or_404(QMODEL.Course, id=course_id)
     student = get_object_or_404(models.Student, user_id=request.user.id)
-    
-    session = get_object_or_404(QMODEL.ExamSession, student=student, course=course, is_completed=False)
-    
-    # Logic to aggregate StudentAnswer instances into a Result
-    answers = QMODEL.StudentAnswer.objects.filter(session=session)
-    questions = QMODEL.Question.objects.filter(course=course)
-    
-    correct_count = answers.filter(is_correct=True).count()
-    total_q = questions.count()
-    
-    # Simple calculation for now (expandable with weighting/negative marks)
-    raw_marks = Decimal(sum(a.question.marks for a in answers.filter(is_correct=True)))
-    
-    # Handle negative marking
-    wrong_count = answers.filter(is_correct=False).count()
-    unanswered_count = total_q - (correct_count + wrong_count)
-    
-    negative_deduction = Decimal(wrong_count) * course.negative_mark_per_wrong
-    final_marks = max(raw_marks - negative_deduction, Decimal("0.00"))
-    
-    total_possible = sum(q.marks for q in questions)
-    percentage = (final_marks / Decimal(total_possible) * 100) if total_possible > 0 else 0
-    
-    attempt_num = QMODEL.Result.objects.filter(student=student, exam=course).count() + 1
-    
-    result = QMODEL.Result.objects.create(
-        student=student,
-        exam=course,
-        attempt_number=attempt_num,
-        marks=final_marks,
-        total_possible_marks=total_possible,
-        total_questions=total_q,
-        correct_answers=correct_count,
-        wrong_answers=wrong_count,
-        unanswered=unanswered_count,
-        percentage=percentage,
-        passed=(percentage >= course.pass_mark),
-        tab_switches=session.current_question_index, # We'll reuse fields for now or expand session
-    )
-    
-    session.is_completed = True
-    session.save()
-    
-    messages.success(request, f"Exam submitted! You scored {percentage}%")
-    return redirect("check-marks", pk=course.id)
-    if request.method != "POST":
-        return redirect("student-exam")
-
-    course_id = request.POST.get("course_id")
-    if not course_id:
-        messages.error(request, "Invalid submission. Course was not provided.")
-        return redirect("student-exam")
-
-    course = get_object_or_404(QMODEL.Course, id=course_id)
-    student = get_object_or_404(models.Student, user_id=request.user.id)
-
-    attempts_taken = QMODEL.Result.objects.filter(student=student, exam=course).count()
-    if attempts_taken >= course.max_attempts:
-        messages.error(
-            request,
-            f"Maximum attempts reached for {course.course_name}.",
-        )
-        return redirect("take-exam", pk=course.id)
-
-    session_question_ids = request.session.get(_exam_session_key(course.id, "question_ids"))
-    if session_question_ids:
-        questions = list(QMODEL.Question.objects.filter(course=course, id__in=session_question_ids))
-    else:
-        # Fallback keeps compatibility if session data is unavailable.
-        questions = list(QMODEL.Question.objects.filter(course=course))
-
-    if not questions:
-        messages.error(request, "No valid exam questions found for scoring.")
-        return redirect("student-exam")
-
-    started_at_raw = request.session.get(_exam_session_key(course.id, "started_at"))
-    timed_out = False
-    if started_at_raw:
-        try:
-            started_at = timezone.datetime.fromisoformat(started_at_raw)
-            if timezone.is_naive(started_at):
-                started_at = timezone.make_aware(started_at, timezone.get_current_timezone())
-            timed_out = timezone.now() > (started_at + timedelta(minutes=course.duration_minutes))
-        except ValueError:
-            timed_out = False
-
-    raw_marks = Decimal("0.00")
-    correct_answers = 0
-    wrong_answers = 0
-    unanswered = 0
-
-    for question in questions:
-        selected_ans = request.POST.get(f"question_{question.id}", "").strip()
-
-        if not selected_ans:
-            unanswered += 1
-            continue
-
-        is_correct = False
-        if question.question_type in ["MCQ", "TRUE_FALSE"]:
-            # Standard MCQ/TF handles answers as Option1, Option2, etc.
-            if selected_ans == question.answer:
-                is_correct = True
-        elif question.question_type == "SHORT_ANSWER":
-            # Case-insensitive comparison for short answers
-            if selected_ans.lower() == question.answer.lower():
-                is_correct = True
-
-        if is_correct:
-            correct_answers += 1
-            raw_marks += Decimal(question.marks)
-        else:
-            wrong_answers += 1
-
-    negative_marks = Decimal(wrong_answers) * course.negative_mark_per_wrong
-    final_marks = raw_marks - negative_marks
-    if final_marks < 0:
-        final_marks = Decimal("0.00")
-
-    final_marks = final_marks.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-    total_possible_marks = sum(question.marks for question in questions)
-
-    percentage = Decimal("0.00")
-    if total_possible_marks > 0:
-        percentage = (final_marks / Decimal(total_possible_marks)) * Decimal("100")
-        percentage = percentage.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-
-    tab_switches = int(request.POST.get("tab_switches", 0))
-    attempt_number = attempts_taken + 1
-    passed = percentage >= Decimal(course.pass_mark)
-
-    result = QMODEL.Result.objects.create(
-        student=student,
-        exam=course,
-        attempt_number=attempt_number,
-        marks=final_marks,
-        total_possible_marks=total_possible_marks,
-        total_questions=len(questions),
-        correct_answers=correct_answers,
-        wrong_answers=wrong_answers,
-        unanswered=unanswered,
-        percentage=percentage,
-        passed=passed,
-        tab_switches=tab_switches,
-    )
 
-    # Send Notification Email
-    try:
-        subject = f"Exam Result: {course.course_name}"
-        message = (
-            f"Hello {student.user.first_name},\n\n"
-            f"You have completed your attempt #{attempt_number} for {course.course_name}.\n\n"
-            f"Summary:\n"
-            f"- Score: {final_marks}/{total_possible_marks}\n"
-            f"- Percentage: {percentage}%\n"
-            f"- Status: {'PASSED' if passed else 'FAILED'}\n"
-            f"- Tab Switches: {tab_switches}\n\n"
-            f"Login to the portal to view the full report.\n"
-            f"Regards,\nExam System"
-        )
-        send_mail(
-            subject,
-            message,
-            settings.DEFAULT_FROM_EMAIL,
-            [student.institutional_email],
-            fail_silently=True,
-        )
-    except Exception:
-        pass
-
-    _clear_exam_session(request, course.id)
-
-    if timed_out:
-        messages.warning(request, "Exam was submitted after the official duration limit.")
-
-    result_status = "passed" if passed else "did not pass"
-    messages.success(
-        request,
-        (
-            f"Attempt {attempt_number} submitted. Score: {final_marks}/{total_possible_marks} "
-            f"({percentage}%). You {result_status}."
-        ),
+    # The open session if there is one; otherwise the latest closed one, so a
+    # repeated submit (double click, retry) lands on the same marks page.
+    session = (
+        QMODEL.ExamSession.objects.select_related("course")
+        .filter(student=student, course=course)
+        .order_by("is_completed", "-attempt_number")
+        .first()
     )
+    if session is None:
+        raise Http404("No exam session found.")
+    if session.is_completed:
+        # Already graded: show the marks, never write a Result again (an admin
+        # may have deleted it on purpose).
+        return redirect("check-marks", pk=course.id)
+
+    result, created = grade_session(session)
+    if created:
+        messages.success(request, f"Exam submitted! You scored {result.percentage}%")
     return redirect("check-marks", pk=course.id)
 
-
 @login_required(login_url="studentlogin")
 @user_passes_test(is_student, login_url="studentlogin")
+@conditional_page(catalog_etag)
 def view_result_view(request):
     courses = QMODEL.Course.objects.all()
-    return render(request, "student/view_result.html", {"courses": courses})
+    return render(request, "student/view_result.html", catalog_context(courses))
 
 
 @login_required(login_url="studentlogin")
 @user_passes_test(is_student, login_url="studentlogin")
+@conditional_page(student_marks_etag)
 def check_marks_view(request, pk):
+    # Read from the primary: students land here straight after submitting.
     course = get_object_or_404(QMODEL.Course, id=pk)
     student = get_object_or_404(models.Student, user_id=request.user.id)
     results = QMODEL.Result.objects.filter(exam=course, student=student)
@@ -366,6 +219,8 @@ def check_marks_view(request, pk):
 
 @login_required(login_url="studentlogin")
 @user_passes_test(is_student, login_url="studentlogin")
+@use_replica
+@conditional_page(catalog_etag)
 def student_marks_view(request):
     courses = QMODEL.Course.objects.all()
-    return render(request, "student/student_marks.html", {"courses": courses})
+    return render(request, "student/student_marks.html", catalog_context(courses))
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 10:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teacher', '0005_reconcile_teacher_schema'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='teacher',
+            name='profile_pic_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -1,6 +1,10 @@
 from django.contrib.auth.models import User
 from django.core.validators import RegexValidator
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from exam.images import delete_thumbnails, refresh_profile_thumbnails
 
 nigerian_phone_validator = RegexValidator(
     regex=r"^(\+234|0)[789][01]\d{8}$",
@@ -38,6 +42,8 @@ class Teacher(models.Model):
 
     bio = models.TextField(max_length=500, blank=True)
     profile_pic = models.ImageField(upload_to="profile_pic/Teacher/", null=True, blank=True)
+    # Thumbnail paths by size and format, see exam.images.render_square_thumbnails().
+    profile_pic_variants = models.JSONField(default=dict, blank=True, editable=False)
     address = models.CharField(max_length=160, blank=True)
     mobile = models.CharField(max_length=20, validators=[nigerian_phone_validator], null=False)
     
@@ -53,3 +59,13 @@ class Teacher(models.Model):
 
     def __str__(self):
         return f"{self.user.username} ({self.staff_id})"
+
+
+@receiver(post_save, sender=Teacher)
+def build_teacher_thumbnails(sender, instance, **kwargs):
+    refresh_profile_thumbnails(instance)
+
+
+@receiver(post_delete, sender=Teacher)
+def delete_teacher_thumbnails(sender, instance, **kwargs):
+    delete_thumbnails(instance.profile_pic_variants)
@@ -1,9 +1,11 @@
 from django.contrib.auth.models import Group, User
+from django.core import mail
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import TestCase
 from django.urls import reverse
 
-from exam.models import Course, Question
+from exam.models import Course, OutboundEmail, Question
+from student.models import Student
 from teacher.forms import TeacherForm
 from teacher.models import Teacher
 
@@ -100,3 +102,19 @@ class TeacherPermissionTests(TestCase):
 
         first = Question.objects.filter(course=course).order_by("id").first()
         self.assertEqual(first.answer, "Option1")
+
+    def test_new_course_queues_one_notification_per_student(self):
+        for index, email in enumerate(["ada@unn.edu.ng", "bola@unn.edu.ng"]):
+            user = User.objects.create_user(username=f"notified_{index}", password="pass12345")
+            Student.objects.create(user=user, matric_number=f"UNN/2025/9000{index}", institutional_email=email, mobile="0")
+        self.client.force_login(self.teacher_user)
+
+        response = self.client.post(
+            reverse("teacher-add-exam"),
+            {"course_name": "Geology 101", "duration_minutes": 30, "pass_mark": 50, "max_attempts": 1, "negative_mark_per_wrong": "0"},
+        )
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(len(mail.outbox), 0)
+        queued = OutboundEmail.objects.filter(kind="new-exam", status="pending")
+        self.assertEqual(sorted(queued.values_list("recipient", flat=True)), ["ada@unn.edu.ng", "bola@unn.edu.ng"])
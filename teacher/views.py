@@ -4,13 +4,16 @@ from django.contrib import messages
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth.models import Group
 from django.db import transaction
+from django.db.models import Count, Q
 from django.http import HttpResponseRedirect
 from django.shortcuts import get_object_or_404, redirect, render
-from django.core.mail import send_mail
-from django.conf import settings
 
 from exam import forms as QFORM
 from exam import models as QMODEL
+from exam.catalog import catalog_context
+from exam.conditional import catalog_etag, conditional_page
+from exam.outbox import enqueue
+from onlinexam.routers import use_replica
 from student import models as SMODEL
 
 from . import forms, models
@@ -58,19 +61,21 @@ def is_teacher(user):
 
 @login_required(login_url="teacherlogin")
 @user_passes_test(is_teacher, login_url="teacherlogin")
+@use_replica
 def teacher_dashboard_view(request):
     courses = QMODEL.Course.objects.all()
     categories = QMODEL.Category.objects.all()
     
     # Advanced analytics for teacher
-    total_attempts = QMODEL.Result.objects.count()
+    attempts = QMODEL.Result.objects.aggregate(total=Count("id"), passed=Count("id", filter=Q(passed=True)))
+    total_attempts = attempts["total"]
     overall_pass_rate = 0
     if total_attempts > 0:
-        passed_count = QMODEL.Result.objects.filter(passed=True).count()
-        overall_pass_rate = (passed_count / total_attempts) * 100
+        overall_pass_rate = (attempts["passed"] / total_attempts) * 100
 
-    chart_labels = [c.course_name for c in courses[:10]] # Limit to top 10 for chart
-    chart_data = [QMODEL.Question.objects.filter(course=c).count() for c in courses[:10]]
+    chart_courses = courses.annotate(question_count=Count("question"))[:10] # Limit to top 10 for chart
+    chart_labels = [c.course_name for c in chart_courses]
+    chart_data = [c.question_count for c in chart_courses]
 
     context = {
         "total_course": courses.count(),
@@ -101,19 +106,14 @@ def teacher_add_exam_view(request):
         courseForm = QFORM.CourseForm(request.POST)
         if courseForm.is_valid():
             course = courseForm.save()
-            # Send Notification to students
-            try:
-                emails = list(SMODEL.Student.objects.filter(institutional_email__isnull=False).values_list('institutional_email', flat=True))
-                if emails:
-                    send_mail(
-                        f"New Exam Available: {course.course_name}",
-                        f"A new course '{course.course_name}' has been added. You can now login and start the examination.",
-                        settings.DEFAULT_FROM_EMAIL,
-                        emails,
-                        fail_silently=True
-                    )
-            except Exception:
-                pass
+            # Queue one notification per student; the send_outbox worker delivers them
+            emails = SMODEL.Student.objects.filter(institutional_email__isnull=False).values_list('institutional_email', flat=True)
+            enqueue(
+                emails,
+                f"New Exam Available: {course.course_name}",
+                f"A new course '{course.course_name}' has been added. You can now login and start the examination.",
+                kind="new-exam",
+            )
             messages.success(request, f"Course '{course.course_name}' created successfully.")
             return HttpResponseRedirect("/teacher/teacher-view-exam")
         messages.error(request, "Could not create course. Please fix the highlighted fields.")
@@ -122,9 +122,10 @@ def teacher_add_exam_view(request):
 
 @login_required(login_url="teacherlogin")
 @user_passes_test(is_teacher, login_url="teacherlogin")
+@conditional_page(catalog_etag)
 def teacher_view_exam_view(request):
     courses = QMODEL.Course.objects.all()
-    return render(request, "teacher/teacher_view_exam.html", {"courses": courses})
+    return render(request, "teacher/teacher_view_exam.html", catalog_context(courses))
 
 
 @login_required(login_url="teacherlogin")
@@ -212,6 +213,7 @@ def teacher_upload_questions_view(request):
 
 @login_required(login_url="teacherlogin")
 @user_passes_test(is_teacher, login_url="teacherlogin")
+@conditional_page(catalog_etag)
 def teacher_view_question_view(request):
     courses = QMODEL.Course.objects.all()
     return render(request, "teacher/teacher_view_question.html", {"courses": courses})
@@ -219,6 +221,7 @@ def teacher_view_question_view(request):
 
 @login_required(login_url="teacherlogin")
 @user_passes_test(is_teacher, login_url="teacherlogin")
+@conditional_page(catalog_etag)
 def see_question_view(request, pk):
     questions = QMODEL.Question.objects.filter(course_id=pk)
     return render(request, "teacher/see_question.html", {"questions": questions})